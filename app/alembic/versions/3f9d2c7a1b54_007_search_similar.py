@@ -0,0 +1,37 @@
+"""007_search_similar
+
+Revision ID: 3f9d2c7a1b54
+Revises: 5c73e80f0946
+Create Date: 2026-10-17 10:12:41.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9d2c7a1b54'
+down_revision: Union[str, None] = '5c73e80f0946'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('search_similar',
+    sa.Column('item_type', sqlmodel.sql.sqltypes.AutoString(length=16), nullable=False),
+    sa.Column('item_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('text_hash', sqlmodel.sql.sqltypes.AutoString(length=40), nullable=False),
+    sa.Column('neighbours', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('item_type', 'item_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('search_similar')
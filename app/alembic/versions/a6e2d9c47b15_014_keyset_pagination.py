@@ -0,0 +1,68 @@
+"""014_keyset_pagination
+
+Revision ID: a6e2d9c47b15
+Revises: f3c85a1d29e7
+Create Date: 2026-10-17 23:02:11.527384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6e2d9c47b15'
+down_revision: Union[str, None] = 'f3c85a1d29e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# те же индексы, что в app.models._add_keyset_index: (таблица, префикс, частичный по deleted_at)
+KEYSET_INDEXES = [
+    ("music", (), True),
+    ("music", ("playlist_id",), True),
+    ("playlist", (), True),
+    ("genre", (), True),
+    ("ad", (), True),
+    ("video", (), True),
+    ("video", ("status",), True),
+    ("books", (), True),
+    ("users", (), False),
+    ("statistics", (), False),
+    ("statistics", ("ad_id",), False),
+]
+
+
+def _name(table: str, columns: list[str]) -> str:
+    return f"ix_{table}_{'_'.join(columns)}"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не блокирует запись в большие таблицы, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for table, prefix, soft_delete in KEYSET_INDEXES:
+            columns = [*prefix, "created_at", "id"]
+            op.create_index(
+                _name(table, columns),
+                table,
+                columns,
+                unique=False,
+                postgresql_where=sa.text("deleted_at IS NULL") if soft_delete else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table, prefix, _ in KEYSET_INDEXES:
+            op.drop_index(
+                _name(table, [*prefix, "created_at", "id"]),
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
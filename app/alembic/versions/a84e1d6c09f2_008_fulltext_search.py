@@ -0,0 +1,54 @@
+"""008_fulltext_search
+
+Revision ID: a84e1d6c09f2
+Revises: 3f9d2c7a1b54
+Create Date: 2026-10-17 12:40:05.102377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a84e1d6c09f2'
+down_revision: Union[str, None] = '3f9d2c7a1b54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# те же выражения, что строит app.models._add_search_vector
+FTS_CONFIGS = ("russian", "english")
+SEARCH_COLUMNS = {
+    "books": [("title", "A"), ("author", "A"), ("description", "B")],
+    "video": [("title", "A"), ("description", "B")],
+    "music": [("title", "A"), ("description", "B")],
+    "playlist": [("title", "A"), ("description", "B")],
+}
+
+
+def _tsvector_expr(weighted_columns) -> str:
+    return " || ".join(
+        f"setweight(to_tsvector('{cfg}'::regconfig, coalesce({column}, '')), '{weight}')"
+        for column, weight in weighted_columns
+        for cfg in FTS_CONFIGS
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, columns in SEARCH_COLUMNS.items():
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN search_tsv tsvector "
+            f"GENERATED ALWAYS AS ({_tsvector_expr(columns)}) STORED"
+        )
+        op.create_index(f"ix_{table}_search_tsv", table, ["search_tsv"], unique=False, postgresql_using="gin")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in SEARCH_COLUMNS:
+        op.drop_index(f"ix_{table}_search_tsv", table_name=table, postgresql_using="gin")
+        op.drop_column(table, "search_tsv")
@@ -0,0 +1,48 @@
+"""011_upload_sessions
+
+Revision ID: b4d17e9a2c63
+Revises: e7b3a91c4f28
+Create Date: 2026-10-17 18:04:11.512377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d17e9a2c63'
+down_revision: Union[str, None] = 'e7b3a91c4f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('upload_session',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('kind', sqlmodel.sql.sqltypes.AutoString(length=16), nullable=False),
+    sa.Column('object_key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('s3_upload_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('filename', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('content_type', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('size', sa.BigInteger(), nullable=True),
+    sa.Column('status', sa.Enum('ACTIVE', 'COMPLETED', 'CONSUMED', 'ABORTED', name='upload_session_status_enum'), nullable=False),
+    sa.Column('created_by', sa.Uuid(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_upload_session_status'), 'upload_session', ['status'], unique=False)
+    op.create_index(op.f('ix_upload_session_created_by'), 'upload_session', ['created_by'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_upload_session_created_by'), table_name='upload_session')
+    op.drop_index(op.f('ix_upload_session_status'), table_name='upload_session')
+    op.drop_table('upload_session')
+    sa.Enum(name='upload_session_status_enum').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,63 @@
+"""009_trigram_indexes
+
+Revision ID: c51f7e2a9d03
+Revises: a84e1d6c09f2
+Create Date: 2026-10-17 14:05:31.448210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c51f7e2a9d03'
+down_revision: Union[str, None] = 'a84e1d6c09f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# те же колонки, что в app.models._add_trigram_indexes
+TRIGRAM_COLUMNS = {
+    "books": ["title", "author", "description"],
+    "video": ["title", "description"],
+    "music": ["title", "description"],
+    "playlist": ["title", "description"],
+    "genre": ["name", "description"],
+    "ad": ["title"],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY не блокирует запись в большие таблицы, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for table, columns in TRIGRAM_COLUMNS.items():
+            for column in columns:
+                op.create_index(
+                    f"ix_{table}_{column}_trgm",
+                    table,
+                    [column],
+                    unique=False,
+                    postgresql_using="gin",
+                    postgresql_ops={column: "gin_trgm_ops"},
+                    postgresql_concurrently=True,
+                    if_not_exists=True,
+                )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table, columns in TRIGRAM_COLUMNS.items():
+            for column in columns:
+                op.drop_index(
+                    f"ix_{table}_{column}_trgm",
+                    table_name=table,
+                    postgresql_concurrently=True,
+                    if_exists=True,
+                )
+    # расширение не удаляем: им могут пользоваться другие объекты
@@ -0,0 +1,30 @@
+"""012_direct_uploads
+
+Revision ID: d92a6f3e71b8
+Revises: b4d17e9a2c63
+Create Date: 2026-10-17 19:41:27.206583
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd92a6f3e71b8'
+down_revision: Union[str, None] = 'b4d17e9a2c63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # прямые загрузки по presigned PUT/POST идут без multipart upload_id
+    op.alter_column('upload_session', 's3_upload_id', existing_type=sa.VARCHAR(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM upload_session WHERE s3_upload_id IS NULL")
+    op.alter_column('upload_session', 's3_upload_id', existing_type=sa.VARCHAR(), nullable=False)
@@ -0,0 +1,51 @@
+"""010_transcode_jobs
+
+Revision ID: e7b3a91c4f28
+Revises: c51f7e2a9d03
+Create Date: 2026-10-17 15:22:48.930114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b3a91c4f28'
+down_revision: Union[str, None] = 'c51f7e2a9d03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('transcode_job',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('kind', sqlmodel.sql.sqltypes.AutoString(length=16), nullable=False),
+    sa.Column('item_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('source_key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'RUNNING', 'DONE', 'FAILED', name='transcode_job_status_enum'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('lease_owner', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_transcode_job_kind'), 'transcode_job', ['kind'], unique=False)
+    op.create_index(op.f('ix_transcode_job_item_id'), 'transcode_job', ['item_id'], unique=False)
+    op.create_index('ix_transcode_job_status_run_after', 'transcode_job', ['status', 'run_after'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transcode_job_status_run_after', table_name='transcode_job')
+    op.drop_index(op.f('ix_transcode_job_item_id'), table_name='transcode_job')
+    op.drop_index(op.f('ix_transcode_job_kind'), table_name='transcode_job')
+    op.drop_table('transcode_job')
+    sa.Enum(name='transcode_job_status_enum').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,40 @@
+"""013_media_blobs
+
+Revision ID: f3c85a1d29e7
+Revises: d92a6f3e71b8
+Create Date: 2026-10-17 21:12:40.183524
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c85a1d29e7'
+down_revision: Union[str, None] = 'd92a6f3e71b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('media_blob',
+    sa.Column('bucket', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('sha256', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+    sa.Column('object_key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('content_type', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('hls_kind', sqlmodel.sql.sqltypes.AutoString(length=16), nullable=True),
+    sa.Column('hls_key', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('bucket', 'sha256'),
+    sa.UniqueConstraint('bucket', 'object_key', name='uq_media_blob_object')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('media_blob')
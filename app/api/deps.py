@@ -1,7 +1,58 @@
-from fastapi import Depends
-from typing import Annotated
+from fastapi import Depends, HTTPException, Query
+from typing import Annotated, Optional
 from sqlmodel import Session
-from app.core.db import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.db import (
+    UnitOfWork,
+    get_async_read_session,
+    get_async_session,
+    get_read_session,
+    get_session,
+    get_unit_of_work,
+)
+from app.core.config import settings
+from app.core.export import ExportFormat
+from app.core.pagination import Cursor
+from app.core.s3 import MinioService, get_minio_service
 
 
-SessionDep = Annotated[Session, Depends(get_session)]
\ No newline at end of file
+SessionDep = Annotated[Session, Depends(get_session)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+# Для GET-маршрутов: чтение с реплики (DATABASE_REPLICA_URLS), запись и всё после неё — на primary
+ReadSessionDep = Annotated[Session, Depends(get_read_session)]
+AsyncReadSessionDep = Annotated[AsyncSession, Depends(get_async_read_session)]
+# Одна Session на запрос для модульных репозиториев (через app.core.db.session_scope);
+# роутеры подключают её целиком: APIRouter(dependencies=[Depends(get_unit_of_work)])
+UnitOfWorkDep = Annotated[UnitOfWork, Depends(get_unit_of_work)]
+# Один MinioService (и пул соединений к MinIO) на процесс — см. app.core.s3.get_minio_service
+StorageDep = Annotated[MinioService, Depends(get_minio_service)]
+
+
+def get_cursor(
+    cursor: Optional[str] = Query(None, description="Следующая страница: значение заголовка X-Next-Cursor предыдущего ответа (вместо skip/offset)"),
+) -> Optional[Cursor]:
+    if cursor is None:
+        return None
+    try:
+        return Cursor.decode(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+CursorDep = Annotated[Optional[Cursor], Depends(get_cursor)]
+
+
+def get_limit(
+    limit: int = Query(
+        settings.PAGE_SIZE_DEFAULT,
+        ge=1,
+        le=settings.PAGE_SIZE_MAX,
+        description="Размер страницы; всю таблицу — через /export",
+    ),
+) -> int:
+    return limit
+
+
+# limit списков: по умолчанию PAGE_SIZE_DEFAULT, больше PAGE_SIZE_MAX — 422
+LimitDep = Annotated[int, Depends(get_limit)]
+ExportFormatDep = Annotated[ExportFormat, Query(alias="format", description="ndjson (по строке JSON) или csv")]
@@ -12,6 +12,8 @@ from app.modules.genre.genre_router import genre_router
 from app.modules.videos.video_router import router as video_router
 from app.modules.books.book_router import router as book_router
 from app.modules.search.search_router import router as search_router
+from app.modules.stream.stream_router import stream_router
+from app.modules.uploads.upload_router import router as upload_router
 
 # ── Other ───────────────────────────────
 from app.modules.statistics.statistics_router import statistics_router
@@ -31,6 +33,8 @@ api_router.include_router(genre_router, prefix="/genres", tags=["Genres"])
 api_router.include_router(video_router, prefix="/videos", tags=["Videos"])
 api_router.include_router(book_router, prefix="/books", tags=["Books"])
 api_router.include_router(search_router, prefix="/search", tags=["Search"])
+api_router.include_router(stream_router, prefix="/stream", tags=["Stream"])
+api_router.include_router(upload_router, prefix="/uploads", tags=["Uploads"])
 
 # статистика и реклама
 api_router.include_router(statistics_router, prefix="/statistics", tags=["Statistics"])
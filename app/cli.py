@@ -11,6 +11,34 @@ def _cmd_create_tables(args: argparse.Namespace) -> None:
     print("Tables created from SQLModel metadata (no migrations).")
 
 
+def _cmd_rebuild_search_index(args: argparse.Namespace) -> None:
+    from app.modules.search.search_index import search_index
+
+    search_index.sync(full=True)
+    search_index.save()
+    print(f"Search index rebuilt into {search_index.path}.")
+
+
+def _cmd_refresh_similar(args: argparse.Namespace) -> None:
+    from app.modules.search.search_similar_job import refresh_similar
+
+    written = refresh_similar(full=args.full)
+    print(f"Similar items refreshed: {written} rows written.")
+
+
+def _cmd_transcode_worker(args: argparse.Namespace) -> None:
+    from app.modules.transcoder.transcode_worker import TranscodeWorker
+
+    TranscodeWorker(processes=args.processes).run()
+
+
+def _cmd_abort_stale_uploads(args: argparse.Namespace) -> None:
+    from app.modules.uploads.upload_service import UploadService
+
+    aborted = UploadService().abort_stale()
+    print(f"Stale uploads aborted: {aborted}.")
+
+
 def main(argv: list[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description="Backend management commands")
     subparsers = parser.add_subparsers(dest="command")
@@ -31,6 +59,41 @@ def main(argv: list[str] | None = None) -> int:
     )
     create_parser.set_defaults(func=_cmd_create_tables)
 
+    index_parser = subparsers.add_parser(
+        "rebuild-search-index",
+        help="Rebuild the TF-IDF search index from the database and persist it to SEARCH_INDEX_DIR",
+    )
+    index_parser.set_defaults(func=_cmd_rebuild_search_index)
+
+    similar_parser = subparsers.add_parser(
+        "refresh-similar",
+        help="Recompute the precomputed similar-items table (only changed rows unless --full)",
+    )
+    similar_parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Recompute every row instead of only rows whose text changed",
+    )
+    similar_parser.set_defaults(func=_cmd_refresh_similar)
+
+    worker_parser = subparsers.add_parser(
+        "transcode-worker",
+        help="Run the HLS transcode worker: lease jobs from transcode_job and run ffmpeg in a process pool",
+    )
+    worker_parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Size of the ffmpeg process pool (default: TRANSCODE_WORKERS or the number of CPU cores)",
+    )
+    worker_parser.set_defaults(func=_cmd_transcode_worker)
+
+    uploads_parser = subparsers.add_parser(
+        "abort-stale-uploads",
+        help="Abort uploads left unfinished or unclaimed for UPLOAD_SESSION_TTL_HOURS and drop their objects from MinIO",
+    )
+    uploads_parser.set_defaults(func=_cmd_abort_stale_uploads)
+
     args = parser.parse_args(argv)
     if not getattr(args, "func", None):
         parser.print_help()
@@ -15,6 +15,7 @@ class Settings(BaseSettings):
     # ── API / Environment ───────────────────────────
     API_V1_STR: str = "/api/v1"
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
+    PUBLIC_API_URL: str = ""  # внешний адрес API для ссылок на плейлисты (пусто — относительные ссылки)
 
     # ── Database ────────────────────────────────────
     DATABASE_URL: Optional[PostgresDsn] = None
@@ -41,6 +42,17 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Реплики только для чтения: DSN через запятую (пусто — всё идёт на primary).
+    # Чтение в GET-запросах уходит на них по кругу; недоступная реплика
+    # пропускается DB_REPLICA_RETRY_SECONDS
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_RETRY_SECONDS: float = 30.0
+
+    @computed_field
+    @property
+    def SQLALCHEMY_REPLICA_URLS(self) -> list[str]:
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
     # ── JWT ─────────────────────────────────────────
     JWT_SECRET: str
     JWT_REFRESH_SECRET: str
@@ -58,6 +70,62 @@ class Settings(BaseSettings):
     AWS_S3_BUCKET_NAME: str
     AWS_S3_SECURE: Optional[bool] = None # если не указан — выводим из схемы URL
     AWS_S3_PUBLIC_URL: str
+    PRESIGN_CACHE_SIZE: int = 50000        # подписанных ссылок в памяти процесса
+    PRESIGN_CACHE_SAFETY_SECONDS: int = 300  # не отдавать ссылку, которой осталось жить меньше
+    HLS_PLAYLIST_CACHE_SIZE: int = 2000    # разобранных и подписанных плейлистов в памяти процесса
+    HLS_PLAYLIST_CACHE_SECONDS: int = 600  # сколько держать плейлист в памяти (Redis — до конца окна подписи)
+    S3_UPLOAD_WORKERS: int = 8             # параллельные загрузки в upload_dir (HLS-сегменты)
+    S3_PART_SIZE: int = 16 * 1024 * 1024   # часть multipart при потоковой загрузке (части по одной — в памяти одна часть)
+    S3_ASYNC_WORKERS: int = 16             # пул потоков AsyncMinioService (вызовы S3 из async-маршрутов)
+    S3_UPLOAD_RETRIES: int = 3             # попыток на объект
+    S3_UPLOAD_RETRY_BACKOFF: float = 0.5   # секунд перед 2-й попыткой, дальше удваивается
+    S3_MAX_CONNECTIONS: int = 32           # keep-alive соединений к MinIO на процесс (один пул на все сервисы)
+    S3_POOL_TIMEOUT: float = 30.0          # сколько ждать свободное соединение, когда заняты все
+    S3_CONNECT_TIMEOUT: float = 5.0
+    S3_READ_TIMEOUT: float = 120.0
+    S3_HTTP_RETRIES: int = 3               # повторы запроса к MinIO (обрыв соединения, 5xx)
+    S3_HEAD_CACHE_SIZE: int = 20000        # метаданных объектов (HEAD) в памяти процесса
+    S3_HEAD_CACHE_SECONDS: int = 300       # сколько верить найденному объекту
+    S3_HEAD_MISSING_SECONDS: int = 10      # сколько верить «объекта нет» (HLS может вот-вот появиться)
+    HLS_STREAM_UPLOAD: bool = True         # грузить сегменты, пока ffmpeg ещё кодирует
+    HLS_STREAM_POLL_SECONDS: float = 0.5   # как часто смотреть в каталог вывода ffmpeg
+
+    # ── HLS / ABR ───────────────────────────────────
+    # ступени лестницы: имя:высота:видео kbps:аудио kbps (ступени выше исходника пропускаются)
+    HLS_LADDER: str = "240p:240:400:64,480p:480:1200:96,720p:720:2800:128"
+    HLS_AUDIO_ONLY_KBPS: int = 64          # audio-only вариант в мастер-плейлисте (0 — не делать)
+    HLS_SEGMENT_SECONDS: int = 6
+    MUSIC_HLS_CODEC: Literal["aac", "opus"] = "aac"
+    MUSIC_HLS_BITRATES: str = "128"        # kbps через запятую; несколько — мастер-плейлист с вариантами
+    MUSIC_HLS_SEGMENT_SECONDS: int = 10
+    HLS_DELIVERY_TOKEN_SECONDS: int = 21600  # срок токена в ссылке /stream/<token>/index.m3u8
+    HLS_DELIVERY_MAX_AGE: int = 60           # потолок Cache-Control max-age ответа с плейлистом (и не дольше жизни подписей)
+
+    # ── Transcode worker ────────────────────────────
+    TRANSCODE_WORKERS: int = 0                     # процессов ffmpeg-пула (0 — по числу ядер)
+    TRANSCODE_LEASE_SECONDS: int = 120             # аренда задачи; продлевается heartbeat'ом
+    TRANSCODE_HEARTBEAT_SECONDS: int = 30
+    TRANSCODE_POLL_SECONDS: float = 2.0
+    TRANSCODE_MAX_ATTEMPTS: int = 3
+    TRANSCODE_RETRY_BACKOFF_SECONDS: int = 30      # задержка перед 2-й попыткой, дальше удваивается
+
+    # ── Uploads ─────────────────────────────────────
+    UPLOAD_MAX_PART_SIZE: int = 64 * 1024 * 1024   # потолок одной части resumable-загрузки
+    UPLOAD_SESSION_TTL_HOURS: int = 24             # незавершённые/незабранные загрузки старше — abort-stale-uploads
+    DIRECT_UPLOAD_EXPIRES_SECONDS: int = 3600      # срок presigned PUT/POST для загрузки из браузера
+    DIRECT_UPLOAD_MAX_BYTES: int = 10 * 1024 ** 3  # потолок видео/музыки/рекламы (картинки и книги — меньше)
+
+    # ── Search ──────────────────────────────────
+    SEARCH_ENGINE: Literal["tfidf", "postgres"] = "tfidf"  # postgres — tsvector + GIN
+    SEARCH_INDEX_DIR: str = "/tmp/bus-search-index"   # снимок TF-IDF индекса (матрица + словарь)
+    SEARCH_INDEX_SYNC_SECONDS: int = 30                # как часто догонять изменения из БД
+    SEARCH_SIMILAR_TOP_K: int = 20                     # сколько похожих хранить на элемент
+    SEARCH_SIMILAR_REFRESH_SECONDS: int = 300          # период фонового пересчёта (0 — выключить)
+
+    # ── Pagination / Export ─────────────────────────
+    PAGE_SIZE_DEFAULT: int = 50    # limit списков, если клиент его не передал
+    PAGE_SIZE_MAX: int = 200       # больше — 422; целиком таблицу — через /export
+    EXPORT_YIELD_PER: int = 1000   # строк за один FETCH серверного курсора в /export
 
     # ── Logging / Metrics (опционально) ─────────────
     ENABLE_METRICS: bool = False
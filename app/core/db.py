@@ -1,25 +1,326 @@
 # app/core/db.py
+import itertools
 import time
-from typing import Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncGenerator, Callable, Generator, Optional, Union
 
-from sqlalchemy import text
+from sqlalchemy import Connection, Engine, TextClause, text
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
 from sqlmodel import Session, create_engine, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
 
 from app.core.config import settings
+from app.core.logger import logger
 
-engine = create_engine(
-    str(settings.SQLALCHEMY_DATABASE_URL),
+_POOL = dict(
     pool_pre_ping=True,
     pool_size=getattr(settings, "DB_POOL_SIZE", 5),
     max_overflow=getattr(settings, "DB_MAX_OVERFLOW", 10),
+)
+
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URL),
+    **_POOL,
     # echo=(settings.ENVIRONMENT == "local"),
 )
 
+# Тот же DSN (postgresql+psycopg): psycopg 3 умеет asyncio, SQLAlchemy берёт его async-вариант.
+# Для async def-маршрутов: запросы не блокируют event loop и не занимают поток threadpool.
+async_engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URL), **_POOL)
+
+
+class ReplicaSet:
+    """
+    Реплики только для чтения (DATABASE_REPLICA_URLS): выдаёт соединение со
+    следующей по кругу. Реплика, к которой не удалось подключиться, пропускается
+    DB_REPLICA_RETRY_SECONDS; если недоступны все — None, и чтение идёт на primary.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.urls = urls
+        self.engines = [create_engine(url, **_POOL) for url in urls]
+        self.async_engines = [create_async_engine(url, **_POOL) for url in urls]
+        self._next = itertools.count()
+        self._down_until = [0.0] * len(urls)
+
+    def _candidates(self) -> list[int]:
+        if not self.urls:
+            return []
+        start, now = next(self._next), time.monotonic()
+        order = [(start + i) % len(self.urls) for i in range(len(self.urls))]
+        return [i for i in order if self._down_until[i] <= now]
+
+    def _failed(self, i: int, exc: Exception) -> None:
+        self._down_until[i] = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+        logger.warning("db replica #%d unavailable for %.0fs: %s", i, settings.DB_REPLICA_RETRY_SECONDS, exc)
+
+    def connect(self) -> Optional[Connection]:
+        for i in self._candidates():
+            try:
+                return self.engines[i].connect()
+            except OperationalError as e:
+                self._failed(i, e)
+        return None
+
+    def status(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {"replica": i, "up": self._down_until[i] <= now, "retry_in": max(0.0, round(self._down_until[i] - now, 1))}
+            for i in range(len(self.urls))
+        ]
+
+    async def connect_async(self) -> Optional[AsyncConnection]:
+        for i in self._candidates():
+            try:
+                return await self.async_engines[i].connect()
+            except OperationalError as e:
+                self._failed(i, e)
+        return None
+
+
+replicas = ReplicaSet(settings.SQLALCHEMY_REPLICA_URLS)
+
+_Bind = Union[Engine, Connection]
+
+
+def _is_write(clause) -> bool:
+    # text() может быть чем угодно — безопаснее на primary; SELECT ... FOR UPDATE — тоже
+    return clause is not None and (
+        getattr(clause, "is_dml", False)
+        or isinstance(clause, TextClause)
+        or getattr(clause, "_for_update_arg", None) is not None
+    )
+
+
+class RoutingSession(Session):
+    """
+    Session с двумя bind'ами. Пока read_only и в сессии не было записи, запросы
+    идут на реплику; flush, INSERT/UPDATE/DELETE и всё после первой записи —
+    на primary (read-after-write в пределах сессии). Bind'ы подключаются лениво,
+    закрывает их тот, кто их создал.
+    """
+
+    def __init__(
+        self,
+        primary: Callable[[], _Bind],
+        replica: Optional[Callable[[], Optional[_Bind]]] = None,
+        read_only: bool = False,
+        **kw,
+    ):
+        super().__init__(**kw)
+        self._factories = {"primary": primary, "replica": replica}
+        self._resolved: dict[str, Optional[_Bind]] = {}
+        self.read_only = read_only
+        self.wrote = False
+
+    def _resolve(self, name: str) -> Optional[_Bind]:
+        if name not in self._resolved:
+            factory = self._factories[name]
+            self._resolved[name] = factory() if factory else None
+        return self._resolved[name]
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or _is_write(clause):
+            self.wrote = True
+        if self.read_only and not self.wrote:
+            replica = self._resolve("replica")
+            if replica is not None:
+                return replica
+        return self._resolve("primary")
+
+
+def _tracked(factory: Callable[[], Optional[Connection]], opened: list[Connection]) -> Callable[[], Optional[Connection]]:
+    """Bind-фабрика для RoutingSession, запоминающая открытые соединения: их закрывает владелец сессии."""
+    def bind() -> Optional[Connection]:
+        conn = factory()
+        if conn is not None:
+            opened.append(conn)
+        return conn
+    return bind
+
+
 def get_session() -> Generator[Session, None, None]:
     with Session(engine) as session:
         yield session
 
+
+@contextmanager
+def read_session() -> Generator[Session, None, None]:
+    """
+    Отдельная читающая Session (реплика, если есть) со своими соединениями —
+    не сессия запроса: её можно держать дольше обработчика, например пока
+    StreamingResponse дочитывает серверный курсор (app.core.export).
+    """
+    opened: list[Connection] = []
+    session = RoutingSession(_tracked(engine.connect, opened), _tracked(replicas.connect, opened), read_only=True)
+    try:
+        yield session
+    finally:
+        session.close()
+        for conn in opened:
+            conn.close()
+
+
+def get_read_session() -> Generator[Session, None, None]:
+    """Для GET-маршрутов на sync Session: чтение с реплики, если она есть, запись — на primary."""
+    with read_session() as session:
+        yield session
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    # expire_on_commit=False: после commit атрибуты не перечитываются лениво (в async это ошибка)
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def get_async_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """Для async GET-маршрутов: то же, что get_read_session, на AsyncSession."""
+    replica = await replicas.connect_async()
+    try:
+        async with AsyncSession(
+            sync_session_class=RoutingSession,
+            primary=lambda: async_engine.sync_engine,
+            replica=(lambda: replica.sync_connection) if replica is not None else None,
+            read_only=True,
+            expire_on_commit=False,
+        ) as session:
+            yield session
+    finally:
+        if replica is not None:
+            await replica.close()
+
+
+class UnitOfWork:
+    """
+    Одна Session на HTTP-запрос для модульных репозиториев (музыка, плейлисты,
+    жанры, реклама, пользователи). Соединение берётся из пула при первом
+    обращении к БД и держится до конца запроса: проверки и запись в одном
+    запросе идут через одно соединение, а не через checkout (и pre-ping) на
+    каждый вызов репозитория. commit() в репозиториях фиксирует транзакцию как
+    раньше — соединение после него в пул не возвращается.
+
+    В GET/HEAD-запросах методы чтения (session_scope(read_only=True)) идут на
+    реплику, если она настроена; в остальных запросах всё идёт на primary, чтобы
+    проверки перед записью не видели отставшую реплику.
+    """
+
+    def __init__(self, use_replicas: bool = False):
+        self.use_replicas = use_replicas
+        self._connections: list[Connection] = []
+        self._session: Optional[RoutingSession] = None
+        self.closed = False
+
+    @property
+    def active(self) -> bool:
+        return self._session is not None
+
+    @property
+    def session(self) -> RoutingSession:
+        if self._session is None:
+            # expire_on_commit=False: объекты, прочитанные одним репозиторием, не перечитываются после commit другого
+            self._session = RoutingSession(
+                _tracked(engine.connect, self._connections),
+                _tracked(replicas.connect, self._connections) if self.use_replicas else None,
+                expire_on_commit=False,
+            )
+        return self._session
+
+    def close(self) -> None:
+        """Незафиксированное откатывается, соединения возвращаются в пул."""
+        self.closed = True
+        if self._session is not None:
+            self._session.close()
+            for conn in self._connections:
+                conn.close()
+            self._session, self._connections = None, []
+
+
+_current_uow: ContextVar[Optional[UnitOfWork]] = ContextVar("unit_of_work", default=None)
+_current_tx: ContextVar[Optional[Session]] = ContextVar("transaction", default=None)
+
+
+@contextmanager
+def session_scope(read_only: bool = False) -> Generator[Session, None, None]:
+    """
+    Session для одного вызова репозитория: сессия запроса, если её открыл
+    get_unit_of_work, иначе — своя короткая (воркеры, CLI, фоновые задачи).
+    read_only=True — метод только читает, и запрос можно отдать реплике.
+    Внутри transaction() — её Session.
+    """
+    tx = _current_tx.get()
+    if tx is not None:
+        # ошибку и откат обрабатывает transaction() целиком
+        yield tx
+        return
+    uow = _current_uow.get()
+    if uow is None or uow.closed:
+        with Session(engine) as session:
+            yield session
+        return
+    session = uow.session
+    previous, session.read_only = session.read_only, read_only
+    try:
+        yield session
+    except Exception:
+        # сессия общая: после ошибки запроса её нужно вернуть в рабочее состояние
+        session.rollback()
+        raise
+    finally:
+        session.read_only = previous
+
+
+@contextmanager
+def transaction() -> Generator[Session, None, None]:
+    """
+    Одна транзакция на несколько репозиториев: строка, забранная загрузка и задача
+    transcode фиксируются вместе или не фиксируются вовсе. Внутри блока
+    session_scope отдаёт эту Session, а commit() репозиториев фиксирует только
+    SAVEPOINT; вся запись — при выходе из блока, при исключении откатывается.
+    Вложенный transaction() работает в той же транзакции.
+    """
+    current = _current_tx.get()
+    if current is not None:
+        yield current
+        return
+    with engine.connect() as conn:
+        outer = conn.begin()
+        session = Session(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        token = _current_tx.set(session)
+        try:
+            yield session
+        except BaseException:
+            session.close()
+            outer.rollback()
+            raise
+        finally:
+            _current_tx.reset(token)
+        session.close()
+        outer.commit()
+
+
+def in_transaction() -> bool:
+    return _current_tx.get() is not None
+
+
+async def get_unit_of_work(request: Request) -> AsyncGenerator[UnitOfWork, None]:
+    # async-зависимость: contextvar ставится в задаче запроса и виден обработчику,
+    # в том числе sync-обработчикам в threadpool (контекст копируется в поток)
+    uow = UnitOfWork(use_replicas=request.method in ("GET", "HEAD"))
+    token = _current_uow.set(uow)
+    try:
+        yield uow
+    finally:
+        _current_uow.reset(token)
+        if uow.active:
+            await run_in_threadpool(uow.close)
+        else:
+            uow.close()
+
+
 def _wait_for_db(retries: int = 30, delay: float = 1.0) -> None:
     """Wait for DB to accept connections."""
     for attempt in range(1, retries + 1):
@@ -44,4 +345,7 @@ def create_db_and_tables(drop_existing: bool = False, force: bool = False) -> No
     _wait_for_db()
     if drop_existing:
         SQLModel.metadata.drop_all(engine)
+    # trigram-индексы (gin_trgm_ops) в app.models требуют расширения
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
     SQLModel.metadata.create_all(engine)
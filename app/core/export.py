@@ -0,0 +1,85 @@
+# app/core/export.py
+"""
+Потоковая выгрузка списков целиком (GET …/export?format=ndjson|csv). Строки
+читаются серверным курсором (yield_per: FETCH по EXPORT_YIELD_PER строк) в
+отдельной читающей сессии и сразу уходят клиенту кусками — ни результат
+запроса, ни тело ответа целиком в памяти не собираются, сколько бы строк ни было.
+Интерактивные списки ограничены PAGE_SIZE_MAX (app.api.deps.get_limit).
+"""
+import csv
+import io
+import json
+from typing import Any, Iterator, Literal
+
+from pydantic import BaseModel
+from starlette.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.db import read_session
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# строк в одном куске ответа: меньше — лишние write в сокет, больше — дольше ждать первый байт
+CHUNK_ROWS = 200
+
+
+def _models(stmt, schema: type[BaseModel]) -> Iterator[BaseModel]:
+    # сессия своя, не запроса: генератор дочитывается уже после выхода из обработчика
+    with read_session() as session:
+        for row in session.exec(stmt.execution_options(yield_per=settings.EXPORT_YIELD_PER)):
+            yield schema.model_validate(row)
+
+
+def _cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _ndjson(models: Iterator[BaseModel]) -> Iterator[str]:
+    chunk: list[str] = []
+    for model in models:
+        chunk.append(model.model_dump_json() + "\n")
+        if len(chunk) >= CHUNK_ROWS:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def _csv(models: Iterator[BaseModel], schema: type[BaseModel]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    columns = list(schema.model_fields)
+    writer.writerow(columns)
+    rows = 0
+    for model in models:
+        data = model.model_dump(mode="json")
+        writer.writerow([_cell(data[column]) for column in columns])
+        rows += 1
+        if rows % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_export(stmt, schema: type[BaseModel], fmt: ExportFormat, name: str) -> StreamingResponse:
+    """
+    StreamingResponse со всеми строками stmt (select без limit/offset) в формате
+    fmt; каждая строка проходит через schema, как в обычных списках.
+    """
+    models = _models(stmt, schema)
+    body = _ndjson(models) if fmt == "ndjson" else _csv(models, schema)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
@@ -0,0 +1,63 @@
+# app/core/fts.py
+from sqlalchemy import ColumnElement, cast, func, literal, or_
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlmodel import SQLModel
+
+from app.core.config import settings
+from app.models import FTS_CONFIGS
+
+
+def fts_enabled() -> bool:
+    return settings.SEARCH_ENGINE == "postgres"
+
+
+def search_vector(model: type[SQLModel]) -> ColumnElement | None:
+    """Generated tsvector-колонка модели (см. _add_search_vector в app/models.py)."""
+    return model.__table__.c.get("search_tsv")
+
+
+def ts_query(q: str) -> ColumnElement:
+    """websearch-запрос, разобранный каждым словарём и объединённый через OR."""
+    queries = [func.websearch_to_tsquery(cast(literal(cfg), REGCONFIG), q) for cfg in FTS_CONFIGS]
+    query = queries[0]
+    for other in queries[1:]:
+        query = query.op("||")(other)
+    return query
+
+
+def ts_rank(model: type[SQLModel], q: str) -> ColumnElement:
+    return func.ts_rank_cd(search_vector(model), ts_query(q))
+
+
+def trigram_match(q: str, *columns) -> ColumnElement:
+    """
+    Подстрока (ilike) или нечёткое совпадение слова (`col %> q`, порог
+    pg_trgm.word_similarity_threshold). Оба оператора обслуживает
+    GIN-индекс gin_trgm_ops, см. _add_trigram_indexes в app/models.py.
+    """
+    like = f"%{q}%"
+    return or_(*(or_(column.ilike(like), column.bool_op("%>")(q)) for column in columns))
+
+
+def trigram_rank(q: str, *columns) -> ColumnElement:
+    """Лучшая word_similarity запроса среди колонок (NULL-колонки greatest пропускает)."""
+    scores = [func.word_similarity(q, column) for column in columns]
+    return scores[0] if len(scores) == 1 else func.greatest(*scores)
+
+
+def text_match(model: type[SQLModel], q: str, *columns) -> ColumnElement:
+    """
+    Условие для q=-фильтров репозиториев: при SEARCH_ENGINE=postgres и наличии
+    search_tsv — `search_tsv @@ tsquery`, иначе trigram-совпадение по колонкам.
+    """
+    tsv = search_vector(model)
+    if fts_enabled() and tsv is not None:
+        return tsv.bool_op("@@")(ts_query(q))
+    return trigram_match(q, *columns)
+
+
+def text_rank(model: type[SQLModel], q: str, *columns) -> ColumnElement:
+    """Релевантность для сортировки, согласованная с text_match."""
+    if fts_enabled() and search_vector(model) is not None:
+        return ts_rank(model, q)
+    return trigram_rank(q, *columns)
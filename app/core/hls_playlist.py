@@ -0,0 +1,192 @@
+# app/core/hls_playlist.py
+"""
+Разбор HLS-плейлистов и кеш их подписанных версий.
+
+Плейлист после транскодирования не меняется, поэтому хранится в разобранном виде
+(строки + слоты URI), а готовый текст с подписанными ссылками кешируется на окно
+жизни подписи. Два уровня: in-process TTLCache и, если настроен, Redis
+(app/core/redis.py) — общий для всех воркеров uvicorn. Сегменты подписываются
+заново при каждом render (не из presign_cache): иначе кешированный плейлист мог бы
+содержать ссылки, которые сами уже отлежали своё в кеше подписей.
+"""
+import json
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.redis import r as redis_client
+
+_URI_ATTR = re.compile(r'URI="([^"]+)"')
+
+
+@dataclass(frozen=True)
+class ParsedPlaylist:
+    """lines — исходные строки; slots — (номер строки, URI, URI в атрибуте?) для подписи."""
+    lines: tuple[str, ...]
+    slots: tuple[tuple[int, str, bool], ...]
+
+    @property
+    def is_master(self) -> bool:
+        return any(line.startswith("#EXT-X-STREAM-INF") for line in self.lines)
+
+    @property
+    def variant_uris(self) -> list[str]:
+        return [uri for _, uri, in_attr in self.slots if not in_attr and uri.endswith(".m3u8")]
+
+    def to_json(self) -> str:
+        return json.dumps({"lines": self.lines, "slots": self.slots}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "ParsedPlaylist":
+        data = json.loads(raw)
+        return cls(tuple(data["lines"]), tuple((i, uri, bool(attr)) for i, uri, attr in data["slots"]))
+
+
+def parse(raw: str) -> ParsedPlaylist:
+    lines, slots = [], []
+    for i, line in enumerate(raw.splitlines()):
+        stripped = line.strip()
+        if stripped.startswith("#EXT-X-MAP:"):
+            match = _URI_ATTR.search(stripped)
+            if match and "://" not in match.group(1):
+                slots.append((i, match.group(1), True))
+            lines.append(stripped)
+        elif not stripped or stripped.startswith("#"):
+            lines.append(line)
+        else:
+            lines.append(stripped)
+            if "://" not in stripped:
+                slots.append((i, stripped, False))
+    return ParsedPlaylist(tuple(lines), tuple(slots))
+
+
+def render(parsed: ParsedPlaylist, sign: Callable[[str], str], keep_playlists: bool = False) -> str:
+    """
+    sign получает URI относительно каталога плейлиста и возвращает подписанный URL.
+    keep_playlists — вложенные .m3u8 остаются относительными (плейлист отдаётся
+    с нашего /stream/..., и плеер запросит варианты оттуда же).
+    """
+    lines = list(parsed.lines)
+    for i, uri, in_attr in parsed.slots:
+        if keep_playlists and uri.endswith(".m3u8"):
+            continue
+        if in_attr:
+            lines[i] = _URI_ATTR.sub(lambda m, signed=sign(uri): f'URI="{signed}"', lines[i], count=1)
+        else:
+            lines[i] = sign(uri)
+    return "\n".join(lines) + "\n"
+
+
+@dataclass(frozen=True)
+class SignedPlaylist:
+    """Текст плейлиста и момент (epoch), до которого живут все подписи в нём."""
+    text: str
+    expires_at: float
+
+    def seconds_left(self) -> float:
+        return self.expires_at - time.time()
+
+
+_parsed_cache = TTLCache("hls_parsed", settings.HLS_PLAYLIST_CACHE_SIZE)
+_rendered_cache = TTLCache("hls_rendered", settings.HLS_PLAYLIST_CACHE_SIZE)
+
+
+def _redis_get(key: str) -> Optional[bytes]:
+    if redis_client is None:
+        return None
+    try:
+        return redis_client.get(key)
+    except Exception as e:
+        logger.debug("redis get %s failed: %s", key, e)
+        return None
+
+
+def _redis_set(key: str, value: str, ttl: float) -> None:
+    if redis_client is None or ttl < 1:
+        return
+    try:
+        redis_client.set(key, value, ex=int(ttl))
+    except Exception as e:
+        logger.debug("redis set %s failed: %s", key, e)
+
+
+def load(bucket: str, object_name: str, fetch: Callable[[], str]) -> ParsedPlaylist:
+    """Разобранный плейлист: память → Redis → fetch() из MinIO."""
+    cache_key = (bucket, object_name)
+    parsed = _parsed_cache.get(cache_key)
+    if parsed is not None:
+        return parsed
+    redis_key = f"hls:parsed:{bucket}/{object_name}"
+    raw = _redis_get(redis_key)
+    if raw is not None:
+        parsed = ParsedPlaylist.from_json(raw)
+    else:
+        parsed = parse(fetch())
+        _redis_set(redis_key, parsed.to_json(), settings.HLS_PLAYLIST_CACHE_SECONDS)
+    _parsed_cache.set(cache_key, parsed, ttl=settings.HLS_PLAYLIST_CACHE_SECONDS)
+    return parsed
+
+
+def _from_redis(raw: Optional[bytes], expires_seconds: int) -> Optional[SignedPlaylist]:
+    """Значение в Redis: первая строка — момент подписи, дальше текст."""
+    if raw is None:
+        return None
+    head, _, text = raw.decode("utf-8").partition("\n")
+    try:
+        return SignedPlaylist(text, float(head) + expires_seconds)
+    except ValueError:
+        # запись старого формата (без момента подписи) — считаем промахом
+        return None
+
+
+def rendered(
+    bucket: str,
+    object_name: str,
+    expires_seconds: int,
+    reuse_seconds: int,
+    fetch: Callable[[], str],
+    sign: Callable[[str], str],
+    keep_playlists: bool = False,
+) -> SignedPlaylist:
+    """
+    Подписанный плейлист для окна времени длиной reuse_seconds: все запросы в пределах
+    окна (в любом процессе, если есть Redis) получают один и тот же текст. sign должен
+    подписывать заново (не из presign_cache): тогда подписи моложе текста, и к концу
+    окна им остаётся жить не меньше expires_seconds - reuse_seconds.
+    """
+    now = time.time()
+    window = int(now // reuse_seconds) if reuse_seconds > 0 else int(now)
+    window_left = (window + 1) * reuse_seconds - now
+    cache_key = (bucket, object_name, expires_seconds, window, keep_playlists)
+    signed = _rendered_cache.get(cache_key)
+    if signed is not None:
+        return signed
+    redis_key = f"hls:rendered:{bucket}/{object_name}:{expires_seconds}:{window}:{int(keep_playlists)}"
+    signed = _from_redis(_redis_get(redis_key), expires_seconds)
+    if signed is None:
+        text = render(load(bucket, object_name, fetch), sign, keep_playlists)
+        signed = SignedPlaylist(text, now + expires_seconds)
+        _redis_set(redis_key, f"{now}\n{text}", window_left)
+    # локальная копия живёт не дольше HLS_PLAYLIST_CACHE_SECONDS: перезалитый трек
+    # (тот же префикс) увидим не позже, даже если до нас не дошла инвалидация
+    _rendered_cache.set(cache_key, signed, ttl=min(window_left, settings.HLS_PLAYLIST_CACHE_SECONDS))
+    return signed
+
+
+def invalidate(bucket: str, prefix: str) -> None:
+    """Сбрасывает кеши плейлистов под prefix (после публикации нового HLS)."""
+    _parsed_cache.delete_matching(lambda key: key[0] == bucket and key[1].startswith(prefix))
+    _rendered_cache.delete_matching(lambda key: key[0] == bucket and key[1].startswith(prefix))
+    if redis_client is None:
+        return
+    try:
+        for pattern in (f"hls:parsed:{bucket}/{prefix}*", f"hls:rendered:{bucket}/{prefix}*"):
+            keys = list(redis_client.scan_iter(match=pattern, count=500))
+            if keys:
+                redis_client.delete(*keys)
+    except Exception as e:
+        logger.warning("redis invalidate %s/%s failed: %s", bucket, prefix, e)
@@ -0,0 +1,72 @@
+# app/core/pagination.py
+"""
+Keyset-пагинация по (created_at, id). Курсор — непрозрачная строка с
+created_at и id последней строки страницы; следующая страница — это
+WHERE (created_at, id) < (:created_at, :id) по составному индексу, без OFFSET:
+глубокие страницы не читают и не выбрасывают всё, что было до них, а новые
+записи между запросами не сдвигают выдачу. id в ключе делает порядок
+однозначным при одинаковом created_at.
+"""
+import base64
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import Uuid, tuple_
+from starlette.responses import Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass(frozen=True)
+class Cursor:
+    created_at: datetime
+    id: str
+
+    def encode(self) -> str:
+        raw = json.dumps([self.created_at.isoformat(), self.id], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "Cursor":
+        """ValueError, если строка не похожа на курсор."""
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            created_at, id = json.loads(raw)
+            # все id в таблицах — uuid (у video — строкой)
+            return cls(datetime.fromisoformat(created_at), str(uuid.UUID(id)))
+        except (ValueError, TypeError, AttributeError) as e:
+            raise ValueError("invalid cursor") from e
+
+    @classmethod
+    def after(cls, row: Any) -> "Cursor":
+        return cls(row.created_at, str(row.id))
+
+
+def keyset(stmt, model, cursor: Optional[Cursor], descending: bool = True):
+    """
+    ORDER BY created_at, id (по умолчанию от новых к старым) и, если передан
+    курсор, — только строки после него. Если у запроса уже есть ORDER BY
+    (релевантность, название), ключ становится вторичной сортировкой.
+    """
+    key = (model.created_at, model.id)
+    if cursor is not None:
+        id_value = uuid.UUID(cursor.id) if isinstance(model.__table__.c.id.type, Uuid) else cursor.id
+        bound = (cursor.created_at, id_value)
+        stmt = stmt.where(tuple_(*key) < tuple_(*bound) if descending else tuple_(*key) > tuple_(*bound))
+    return stmt.order_by(*(column.desc() if descending else column.asc() for column in key))
+
+
+def next_cursor(items: Sequence[Any], limit: Optional[int]) -> Optional[str]:
+    """Курсор следующей страницы; None, если эта страница неполная (дальше ничего нет)."""
+    if not limit or len(items) < limit:
+        return None
+    return Cursor.after(items[-1]).encode()
+
+
+def set_next_cursor(response: Response, items: Sequence[Any], limit: Optional[int]) -> None:
+    token = next_cursor(items, limit)
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
@@ -1,31 +1,386 @@
+import asyncio
+import hashlib
 import json
 import mimetypes
 import os
-import tempfile
-from typing import Optional
-from datetime import timedelta
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Optional
+from datetime import datetime, timedelta, UTC
 from urllib.parse import urlparse
+import certifi
+import urllib3
 from fastapi import UploadFile
 from minio import Minio
+from minio.datatypes import Part, PostPolicy
 from minio.error import S3Error
+from app.core import hls_playlist
+from app.core.cache import TTLCache
 from app.core.logger import logger
 from app.core.config import settings
 
-class MinioService:
+# Подписанные GET-ссылки: (bucket, key, expires_seconds) -> url. Ссылка переиспользуется,
+# пока до её истечения больше PRESIGN_CACHE_SAFETY_SECONDS (но не больше половины срока).
+presign_cache = TTLCache("presign", settings.PRESIGN_CACHE_SIZE)
+
+
+@dataclass(frozen=True)
+class ObjectInfo:
+    """То, что нужно от HEAD: размер, ETag, Content-Type."""
+    size: int
+    etag: Optional[str] = None
+    content_type: Optional[str] = None
+
+
+# Метаданные объектов: (bucket, key) -> ObjectInfo или _MISSING. Заполняется при загрузке
+# через MinioService и при HEAD, сбрасывается при удалении; «нет объекта» живёт недолго.
+head_cache = TTLCache("s3_head", settings.S3_HEAD_CACHE_SIZE)
+_MISSING = object()
+
+
+def presign_reuse_seconds(expires_seconds: int) -> int:
+    """Сколько можно отдавать одну и ту же подпись: до запаса PRESIGN_CACHE_SAFETY_SECONDS (не больше половины срока)."""
+    return expires_seconds - min(settings.PRESIGN_CACHE_SAFETY_SECONDS, expires_seconds // 2)
+
+
+class PoolStats:
+    """Счётчики общего пула соединений к MinIO: сколько занято и сколько ждали свободного."""
+
     def __init__(self):
-        # если endpoint начинается с https:// — включим secure=True
-        endpoint = settings.AWS_S3_ENDPOINT_URL.replace("https://", "").replace("http://", "")
-        secure = settings.AWS_S3_ENDPOINT_URL.startswith("https://") or getattr(settings, "AWS_S3_SECURE", False)
-
-        self.client = Minio(
-            endpoint=endpoint,
-            access_key=settings.AWS_ACCESS_KEY_ID,
-            secret_key=settings.AWS_SECRET_ACCESS_KEY,
-            region=getattr(settings, "AWS_REGION", None),
-            secure=secure,
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.peak = 0
+        self.acquired = 0
+        self.waited = 0            # получили соединение, когда все были заняты
+        self.wait_seconds = 0.0
+        self.timeouts = 0          # не дождались за S3_POOL_TIMEOUT
+
+    def acquire(self, seconds: float, saturated: bool) -> None:
+        with self._lock:
+            self.in_use += 1
+            self.peak = max(self.peak, self.in_use)
+            self.acquired += 1
+            if saturated:
+                self.waited += 1
+                self.wait_seconds += seconds
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_connections": settings.S3_MAX_CONNECTIONS,
+                "in_use": self.in_use,
+                "peak": self.peak,
+                "acquired": self.acquired,
+                "waited": self.waited,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "timeouts": self.timeouts,
+                "saturation": round(self.in_use / settings.S3_MAX_CONNECTIONS, 4) if settings.S3_MAX_CONNECTIONS else 0.0,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class _MeteredPool:
+    """
+    Примесь к пулу urllib3: block=True держит не больше S3_MAX_CONNECTIONS соединений
+    (лишние запросы ждут, а не открывают одноразовые), ожидание ограничено S3_POOL_TIMEOUT.
+    """
+
+    def _get_conn(self, timeout=None):
+        saturated = self.pool is not None and self.pool.empty()
+        started = time.perf_counter()
+        try:
+            conn = super()._get_conn(timeout=settings.S3_POOL_TIMEOUT if timeout is None else timeout)
+        except urllib3.exceptions.EmptyPoolError:
+            pool_stats.timeout()
+            logger.warning("s3 pool: no free connection in %.1fs (in use: %d)", settings.S3_POOL_TIMEOUT, pool_stats.in_use)
+            raise
+        pool_stats.acquire(time.perf_counter() - started, saturated)
+        return conn
+
+    def _put_conn(self, conn) -> None:
+        pool_stats.release()
+        super()._put_conn(conn)
+
+
+class _MeteredHTTPPool(_MeteredPool, urllib3.HTTPConnectionPool):
+    pass
+
+
+class _MeteredHTTPSPool(_MeteredPool, urllib3.HTTPSConnectionPool):
+    pass
+
+
+def _build_http_client() -> urllib3.PoolManager:
+    """Общий PoolManager для всех клиентов Minio процесса (вместо пула на каждый MinioService())."""
+    http = urllib3.PoolManager(
+        num_pools=4,
+        maxsize=settings.S3_MAX_CONNECTIONS,
+        block=True,
+        timeout=urllib3.Timeout(connect=settings.S3_CONNECT_TIMEOUT, read=settings.S3_READ_TIMEOUT),
+        cert_reqs="CERT_REQUIRED",
+        ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+        retries=urllib3.Retry(
+            total=settings.S3_HTTP_RETRIES,
+            backoff_factor=0.2,
+            status_forcelist=[500, 502, 503, 504],
+        ),
+    )
+    http.pool_classes_by_scheme = {"http": _MeteredHTTPPool, "https": _MeteredHTTPSPool}
+    return http
+
+
+_http_client: Optional[urllib3.PoolManager] = None
+_minio_client: Optional[Minio] = None
+_minio_service: Optional["MinioService"] = None
+_presign_client: Optional[Minio] = None
+_client_lock = threading.Lock()
+
+# Бакеты, уже проверенные (или созданные) этим процессом: ensure_bucket ходит в MinIO один раз
+_ready_buckets: set[str] = set()
+_ready_buckets_lock = threading.Lock()
+
+
+def get_http_client() -> urllib3.PoolManager:
+    global _http_client
+    if _http_client is None:
+        with _client_lock:
+            if _http_client is None:
+                _http_client = _build_http_client()
+    return _http_client
+
+
+def get_minio_client() -> Minio:
+    """Клиент на внутренний endpoint — один на процесс, поверх общего пула соединений."""
+    global _minio_client
+    if _minio_client is None:
+        http = get_http_client()
+        with _client_lock:
+            if _minio_client is None:
+                # если endpoint начинается с https:// — включим secure=True
+                endpoint = settings.AWS_S3_ENDPOINT_URL.replace("https://", "").replace("http://", "")
+                secure = settings.AWS_S3_ENDPOINT_URL.startswith("https://") or getattr(settings, "AWS_S3_SECURE", False)
+                _minio_client = Minio(
+                    endpoint=endpoint,
+                    access_key=settings.AWS_ACCESS_KEY_ID,
+                    secret_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region=getattr(settings, "AWS_REGION", None),
+                    secure=secure,
+                    http_client=http,
+                )
+    return _minio_client
+
+
+def get_minio_service() -> "MinioService":
+    """Общий MinioService процесса (для сервисов и FastAPI-зависимости app.api.deps.StorageDep)."""
+    global _minio_service
+    if _minio_service is None:
+        client = get_minio_client()
+        with _client_lock:
+            if _minio_service is None:
+                _minio_service = MinioService(client)
+    return _minio_service
+
+
+def s3_pool_stats() -> dict:
+    return pool_stats.snapshot()
+
+
+def get_presign_client() -> Minio:
+    """
+    Клиент для подписи ссылок — на публичный endpoint (подпись зависит от хоста).
+    Создаётся один раз: заодно кешируется регион бакета, иначе minio спрашивал бы его
+    сетевым запросом при каждой подписи.
+    """
+    global _presign_client
+    if _presign_client is None:
+        http = get_http_client()
+        with _client_lock:
+            if _presign_client is None:
+                presign_endpoint = settings.AWS_S3_PUBLIC_URL or settings.AWS_S3_ENDPOINT_URL
+                if "://" not in presign_endpoint:
+                    presign_endpoint = f"http://{presign_endpoint}"
+                parsed = urlparse(presign_endpoint)
+                _presign_client = Minio(
+                    endpoint=parsed.netloc or parsed.path,
+                    access_key=settings.AWS_ACCESS_KEY_ID,
+                    secret_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region=getattr(settings, "AWS_REGION", None),
+                    secure=parsed.scheme == "https",
+                    http_client=http,
+                )
+    return _presign_client
+
+
+@dataclass
+class UploadedObject:
+    key: str
+    size: int
+    seconds: float
+    attempts: int
+
+
+@dataclass
+class StoredObject:
+    """Результат put_stream: ключ, публичный URL, размер и sha256 содержимого."""
+    key: str
+    url: str
+    size: int
+    sha256: str
+
+
+class _HashingReader:
+    """Поток для put_object: по мере чтения частей считает размер и sha256."""
+
+    def __init__(self, raw: BinaryIO):
+        self.raw = raw
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    def read(self, n: int = -1) -> bytes:
+        chunk = self.raw.read(n)
+        self.size += len(chunk)
+        self._hash.update(chunk)
+        return chunk
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+
+@dataclass
+class UploadReport:
+    """Итог upload_dir: что загружено, сколько байт и за сколько."""
+    objects: list[UploadedObject] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def count(self) -> int:
+        return len(self.objects)
+
+    @property
+    def bytes(self) -> int:
+        return sum(o.size for o in self.objects)
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+
+def guess_content_type(name: str) -> str:
+    if name.endswith(".m3u8"):
+        return "application/vnd.apple.mpegurl"
+    if name.endswith(".ts"):
+        return "video/mp2t"
+    if name.endswith(".m4s"):
+        return "video/iso.segment"
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+class HlsPublisher:
+    """
+    Потоковая публикация HLS: segment_ready() вызывается транскодером для каждого
+    закрытого сегмента, сегмент сразу уходит в MinIO и удаляется локально, так что
+    на диске лежит лишь несколько сегментов. finish() дожидается сегментов и
+    догружает остальное (плейлисты, master последним) через upload_dir.
+    При stream=False сегменты не трогаются до finish() — поведение как раньше.
+    """
+
+    def __init__(
+        self,
+        minio: "MinioService",
+        local_dir: str | Path,
+        prefix: str,
+        bucket: str,
+        *,
+        stream: Optional[bool] = None,
+        master_name: str = "index.m3u8",
+    ):
+        self.minio = minio
+        self.local_dir = Path(local_dir)
+        self.prefix = prefix
+        self.bucket = bucket
+        self.stream = settings.HLS_STREAM_UPLOAD if stream is None else stream
+        self.master_name = master_name
+        self.report = UploadReport()
+        self._futures: list[Future] = []
+        self._pool = ThreadPoolExecutor(max_workers=settings.S3_UPLOAD_WORKERS, thread_name_prefix="hls-publish")
+        self._started = time.perf_counter()
+
+    def _upload_segment(self, path: Path) -> UploadedObject:
+        key = f"{self.prefix}{path.relative_to(self.local_dir).as_posix()}"
+        uploaded = self.minio._put_with_retry(self.bucket, key, path, settings.S3_UPLOAD_RETRIES)
+        path.unlink(missing_ok=True)
+        return uploaded
+
+    def segment_ready(self, path: Path) -> None:
+        """Колбэк транскодера. Бросает исключение, если уже упала загрузка предыдущего сегмента."""
+        if not self.stream:
+            return
+        for f in self._futures:
+            if f.done() and f.exception() is not None:
+                raise f.exception()
+        self._futures.append(self._pool.submit(self._upload_segment, path))
+
+    def finish(self) -> UploadReport:
+        try:
+            for future in as_completed(self._futures):
+                self.report.objects.append(future.result())
+        finally:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        rest = self.minio.upload_dir(self.local_dir, self.prefix, self.bucket, master_name=self.master_name)
+        self.report.objects.extend(rest.objects)
+        self.report.seconds = time.perf_counter() - self._started
+        hls_playlist.invalidate(self.bucket, self.prefix)
+        logger.info(
+            "published %d HLS files to s3://%s/%s (%d streamed during encode)",
+            self.report.count, self.bucket, self.prefix, self.report.count - rest.count,
         )
+        return self.report
+
+    def abort(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "HlsPublisher":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # если finish() не вызван (ffmpeg упал), недогруженное просто отменяем
+        self.abort()
+
+
+class MinioService:
+    def __init__(self, client: Optional[Minio] = None):
+        # клиент и пул соединений общие для процесса — см. get_minio_client
+        self.client = client or get_minio_client()
 
     def ensure_bucket(self, bucket: str, public_read: bool = False) -> None:
+        """
+        Проверяет/создаёт бакет один раз на процесс (из lifespan при старте); дальше —
+        только проверка по памяти, без bucket_exists перед каждой загрузкой.
+        """
+        if bucket in _ready_buckets:
+            return
+        with _ready_buckets_lock:
+            if bucket in _ready_buckets:
+                return
+            self._create_bucket(bucket, public_read)
+            _ready_buckets.add(bucket)
+
+    def _create_bucket(self, bucket: str, public_read: bool) -> None:
         try:
             if not self.client.bucket_exists(bucket):
                 self.client.make_bucket(bucket)
@@ -44,24 +399,158 @@ class MinioService:
             logger.error("ensure_bucket error: %s", e)
             raise
 
+    # --- метаданные объектов (HEAD) с кешем ---
+    @staticmethod
+    def _remember(bucket: str, object_name: str, info: ObjectInfo) -> None:
+        head_cache.set((bucket, object_name), info, ttl=settings.S3_HEAD_CACHE_SECONDS)
+
+    def head(self, object_name: str, bucket: str) -> Optional[ObjectInfo]:
+        """Метаданные объекта или None, если его нет. HEAD в MinIO — только при промахе кеша."""
+        cached = head_cache.get((bucket, object_name))
+        if cached is not None:
+            return None if cached is _MISSING else cached
+        try:
+            stat = self.client.stat_object(bucket, object_name)
+        except S3Error as e:
+            if e.code not in ("NoSuchKey", "NoSuchObject"):
+                raise
+            head_cache.set((bucket, object_name), _MISSING, ttl=settings.S3_HEAD_MISSING_SECONDS)
+            return None
+        info = ObjectInfo(stat.size, stat.etag, stat.content_type)
+        self._remember(bucket, object_name, info)
+        return info
+
+    def heads(self, object_names: list[str], bucket: str) -> dict[str, Optional[ObjectInfo]]:
+        """head() для нескольких ключей: промахи кеша проверяются параллельно, а не по очереди."""
+        found: dict[str, Optional[ObjectInfo]] = {}
+        misses = []
+        for name in dict.fromkeys(object_names):
+            cached = head_cache.get((bucket, name))
+            if cached is None:
+                misses.append(name)
+            else:
+                found[name] = None if cached is _MISSING else cached
+        if len(misses) == 1:
+            found[misses[0]] = self.head(misses[0], bucket)
+        elif misses:
+            found.update(zip(misses, _get_head_executor().map(lambda name: self.head(name, bucket), misses)))
+        return found
+
+    def object_exists(self, object_name: str, bucket: str) -> bool:
+        return self.head(object_name, bucket) is not None
+
+    @staticmethod
+    def public_url(object_name: str, bucket: str) -> str:
+        """URL объекта в том виде, в каком он хранится в БД (music_url, file_url и т.п.)."""
+        return f"{settings.AWS_S3_PUBLIC_URL}/{bucket}/{object_name}"
+
     def upload_file(self, object_name: str, src_path: str, bucket: str, content_type: Optional[str] = None) -> str:
         """Загружает локальный файл в MinIO. Возвращает ключ вида '{bucket}/{object_name}'."""
         try:
             self.ensure_bucket(bucket, public_read=False)
-            self.client.fput_object(
+            result = self.client.fput_object(
                 bucket_name=bucket,
                 object_name=object_name,
                 file_path=src_path,
                 content_type=content_type,
             )
+            self._remember(bucket, object_name, ObjectInfo(Path(src_path).stat().st_size, result.etag, content_type))
             logger.info("uploaded %s to s3://%s/%s", src_path, bucket, object_name)
-            return f"{settings.AWS_S3_PUBLIC_URL}/{bucket}/{object_name}"
+            return self.public_url(object_name, bucket)
         except S3Error as e:
             logger.error("upload_file error: %s", e)
             raise
 
+    def _put_with_retry(self, bucket: str, key: str, path: Path, retries: int) -> UploadedObject:
+        started = time.perf_counter()
+        for attempt in range(1, retries + 1):
+            try:
+                self.client.fput_object(
+                    bucket_name=bucket,
+                    object_name=key,
+                    file_path=str(path),
+                    content_type=guess_content_type(path.name),
+                )
+                uploaded = UploadedObject(key, path.stat().st_size, time.perf_counter() - started, attempt)
+                if key.endswith(".m3u8"):
+                    # сегментами кеш не забиваем — ссылки строятся от плейлистов
+                    self._remember(bucket, key, ObjectInfo(uploaded.size, None, guess_content_type(path.name)))
+                return uploaded
+            except (S3Error, OSError, urllib3.exceptions.HTTPError) as e:
+                # сетевые ошибки urllib3 (MaxRetryError, ProtocolError, ReadTimeoutError,
+                # EmptyPoolError — не дождались соединения из пула) наследуют не OSError,
+                # а urllib3.exceptions.HTTPError; OSError — ошибки чтения локального файла
+                if attempt == retries:
+                    raise
+                logger.warning("upload %s failed (attempt %d/%d): %s", key, attempt, retries, e)
+                time.sleep(settings.S3_UPLOAD_RETRY_BACKOFF * 2 ** (attempt - 1))
+
+    def upload_dir(
+        self,
+        local_dir: str | Path,
+        prefix: str,
+        bucket: str,
+        *,
+        workers: Optional[int] = None,
+        retries: Optional[int] = None,
+        master_name: str = "index.m3u8",
+    ) -> UploadReport:
+        """
+        Загружает каталог (HLS-выход ffmpeg) под prefix пулом потоков.
+        Сегменты и прочие файлы идут первыми и параллельно, плейлисты (*.m3u8) —
+        только после них, а master_name — самым последним: плеер не увидит
+        манифест, ссылающийся на ещё не загруженные сегменты.
+        Каждый объект повторяется до `retries` раз; при окончательной ошибке
+        оставшиеся загрузки отменяются, плейлисты не публикуются.
+        """
+        base = Path(local_dir)
+        workers = workers or settings.S3_UPLOAD_WORKERS
+        retries = retries or settings.S3_UPLOAD_RETRIES
+
+        files = sorted(p for p in base.rglob("*") if p.is_file())
+        playlists = [p for p in files if p.suffix == ".m3u8"]
+        master = [p for p in playlists if p.relative_to(base).as_posix() == master_name]
+        stages = [
+            [p for p in files if p.suffix != ".m3u8"],
+            [p for p in playlists if p not in master],
+            master,
+        ]
+
+        report = UploadReport()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s3-upload") as pool:
+            for stage in stages:
+                futures = [
+                    pool.submit(self._put_with_retry, bucket, f"{prefix}{p.relative_to(base).as_posix()}", p, retries)
+                    for p in stage
+                ]
+                try:
+                    for future in as_completed(futures):
+                        uploaded = future.result()
+                        report.objects.append(uploaded)
+                        logger.debug("uploaded s3://%s/%s: %d bytes in %.3fs", bucket, uploaded.key, uploaded.size, uploaded.seconds)
+                except Exception:
+                    for f in futures:
+                        f.cancel()
+                    logger.error("upload_dir %s -> s3://%s/%s aborted after %d files", base, bucket, prefix, report.count)
+                    raise
+        report.seconds = time.perf_counter() - started
+
+        if report.count:
+            slowest = max(report.objects, key=lambda o: o.seconds)
+            logger.info(
+                "uploaded %d files (%.1f MiB) to s3://%s/%s in %.2fs, %.1f MiB/s, slowest %s %.2fs",
+                report.count, report.bytes / 2**20, bucket, prefix, report.seconds,
+                report.bytes_per_second / 2**20, slowest.key, slowest.seconds,
+            )
+        return report
+
+    def hls_publisher(self, local_dir: str | Path, prefix: str, bucket: str, **kwargs) -> HlsPublisher:
+        return HlsPublisher(self, local_dir, prefix, bucket, **kwargs)
+
     def delete_object(self, object_name: str, bucket: str) -> None:
         try:
+            head_cache.delete((bucket, object_name))
             self.client.remove_object(bucket, object_name)
         except S3Error as e:
             logger.error("delete_object error: %s", e)
@@ -70,48 +559,28 @@ class MinioService:
     def presign_get(self, object_name: str, bucket: str, expires_seconds: int = 3600) -> str:
         """Выдаёт временную ссылку на скачивание (рекомендуется вместо public-policy)."""
         try:
-            expires = expires_seconds if hasattr(expires_seconds, "total_seconds") else timedelta(seconds=expires_seconds)
-            presign_endpoint = settings.AWS_S3_PUBLIC_URL or settings.AWS_S3_ENDPOINT_URL
-            if "://" not in presign_endpoint:
-                presign_endpoint = f"http://{presign_endpoint}"
-            parsed = urlparse(presign_endpoint)
-            endpoint = parsed.netloc or parsed.path
-            secure = parsed.scheme == "https"
-            presign_client = Minio(
-                endpoint=endpoint,
-                access_key=settings.AWS_ACCESS_KEY_ID,
-                secret_key=settings.AWS_SECRET_ACCESS_KEY,
-                region=getattr(settings, "AWS_REGION", None),
-                secure=secure,
-            )
-            return presign_client.presigned_get_object(bucket, object_name, expires=expires)
+            if hasattr(expires_seconds, "total_seconds"):
+                expires_seconds = int(expires_seconds.total_seconds())
+            cache_key = (bucket, object_name, expires_seconds)
+            url = presign_cache.get(cache_key)
+            if url is None:
+                url = self._sign_get(object_name, bucket, expires_seconds)
+                presign_cache.set(cache_key, url, ttl=presign_reuse_seconds(expires_seconds))
+            return url
         except S3Error as e:
             logger.error("presign_get error: %s", e)
             raise
 
-    def presign_hls_playlist(self, object_name: str, bucket: str, expires_seconds: int = 3600) -> str:
-        """Generate HLS playlist with presigned segment URLs."""
+    @staticmethod
+    def _sign_get(object_name: str, bucket: str, expires_seconds: int) -> str:
+        """Свежая подпись, мимо presign_cache."""
+        return get_presign_client().presigned_get_object(bucket, object_name, expires=timedelta(seconds=expires_seconds))
+
+    def _read_text(self, object_name: str, bucket: str) -> str:
         response = None
         try:
             response = self.client.get_object(bucket, object_name)
-            raw = response.read().decode("utf-8")
-            prefix = object_name.rsplit("/", 1)[0] + "/" if "/" in object_name else ""
-            lines = []
-            for line in raw.splitlines():
-                stripped = line.strip()
-                if not stripped or stripped.startswith("#"):
-                    lines.append(line)
-                    continue
-                if stripped.startswith("http://") or stripped.startswith("https://"):
-                    lines.append(stripped)
-                    continue
-                seg_key = f"{prefix}{stripped}"
-                seg_url = self.presign_get(seg_key, bucket=bucket, expires_seconds=expires_seconds)
-                lines.append(seg_url)
-            return "\n".join(lines) + "\n"
-        except Exception as e:
-            logger.error("presign_hls_playlist error: %s", e)
-            raise
+            return response.read().decode("utf-8")
         finally:
             if response is not None:
                 try:
@@ -120,6 +589,145 @@ class MinioService:
                 except Exception:
                     pass
 
+    def presign_hls_playlist(
+        self, object_name: str, bucket: str, expires_seconds: int = 3600, keep_playlists: bool = False
+    ) -> str:
+        """
+        Generate HLS playlist with presigned segment URLs.
+        Разобранный и подписанный плейлист берётся из кеша (память/Redis, см. app.core.hls_playlist).
+        """
+        return self.signed_hls_playlist(object_name, bucket, expires_seconds, keep_playlists).text
+
+    def signed_hls_playlist(
+        self, object_name: str, bucket: str, expires_seconds: int = 3600, keep_playlists: bool = False
+    ) -> hls_playlist.SignedPlaylist:
+        """То же, что presign_hls_playlist, плюс момент истечения подписей (для Cache-Control)."""
+        try:
+            prefix = object_name.rsplit("/", 1)[0] + "/" if "/" in object_name else ""
+            return hls_playlist.rendered(
+                bucket,
+                object_name,
+                expires_seconds,
+                presign_reuse_seconds(expires_seconds),
+                fetch=lambda: self._read_text(object_name, bucket),
+                # подпись свежая: текст кешируется целиком, подписи из presign_cache были бы старше его
+                sign=lambda uri: self._sign_get(f"{prefix}{uri}", bucket, expires_seconds),
+                keep_playlists=keep_playlists,
+            )
+        except Exception as e:
+            logger.error("presign_hls_playlist error: %s", e)
+            raise
+
+    def put_stream(
+        self,
+        object_name: str,
+        stream: BinaryIO,
+        bucket: str,
+        content_type: Optional[str] = None,
+    ) -> StoredObject:
+        """
+        Загружает поток в MinIO без временных файлов: multipart put_object частями по
+        S3_PART_SIZE (длина заранее не нужна), sha256 и размер считаются на лету.
+        Части уходят по одной (num_parallel_uploads=1): в памяти — одна часть на загрузку;
+        с параллельными частями minio держал бы в очереди до ~4 частей.
+        """
+        try:
+            self.ensure_bucket(bucket, public_read=False)
+            try:
+                stream.seek(0)
+            except Exception:
+                pass
+            reader = _HashingReader(stream)
+            content_type = content_type or guess_content_type(object_name)
+            result = self.client.put_object(
+                bucket,
+                object_name,
+                reader,
+                length=-1,
+                part_size=settings.S3_PART_SIZE,
+                num_parallel_uploads=1,
+                content_type=content_type,
+            )
+            self._remember(bucket, object_name, ObjectInfo(reader.size, result.etag, content_type))
+            logger.info("streamed %d bytes to s3://%s/%s", reader.size, bucket, object_name)
+            return StoredObject(
+                key=object_name,
+                url=self.public_url(object_name, bucket),
+                size=reader.size,
+                sha256=reader.sha256,
+            )
+        except S3Error as e:
+            logger.error("put_stream error: %s", e)
+            raise
+
+    # --- прямые загрузки из браузера ---
+    def presign_put(self, object_name: str, bucket: str, expires_seconds: int = 3600) -> str:
+        """PUT-ссылка на публичный endpoint. Размер она не ограничивает — проверяется при finalize."""
+        return get_presign_client().presigned_put_object(bucket, object_name, expires=timedelta(seconds=expires_seconds))
+
+    def presign_post(
+        self,
+        object_name: str,
+        bucket: str,
+        content_type: str,
+        max_bytes: int,
+        expires_seconds: int = 3600,
+    ) -> dict:
+        """POST-policy для HTML-формы: ключ, Content-Type и размер (1..max_bytes) проверяет само хранилище."""
+        policy = PostPolicy(bucket, datetime.now(UTC) + timedelta(seconds=expires_seconds))
+        policy.add_equals_condition("key", object_name)
+        policy.add_equals_condition("Content-Type", content_type)
+        policy.add_content_length_range_condition(1, max_bytes)
+        fields = get_presign_client().presigned_post_policy(policy)
+        fields["key"] = object_name
+        fields["Content-Type"] = content_type
+        public = (settings.AWS_S3_PUBLIC_URL or settings.AWS_S3_ENDPOINT_URL).rstrip("/")
+        return {"url": f"{public}/{bucket}", "fields": fields}
+
+    def read_head(self, object_name: str, bucket: str, length: int = 64) -> bytes:
+        """Первые байты объекта (magic bytes) — Range-запрос, без скачивания целиком."""
+        response = self.client.get_object(bucket, object_name, offset=0, length=length)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    # --- multipart upload (resumable-загрузки, см. app/modules/uploads) ---
+    def create_multipart_upload(self, object_name: str, bucket: str, content_type: Optional[str] = None) -> str:
+        """Начинает S3 multipart upload, возвращает его upload_id."""
+        self.ensure_bucket(bucket, public_read=False)
+        return self.client._create_multipart_upload(
+            bucket, object_name, {"Content-Type": content_type or guess_content_type(object_name)}
+        )
+
+    def upload_part(self, object_name: str, bucket: str, upload_id: str, part_number: int, data: bytes) -> str:
+        """Загружает часть part_number (повторная загрузка того же номера её заменяет). Возвращает ETag."""
+        return self.client._upload_part(bucket, object_name, data, None, upload_id, part_number)
+
+    def list_parts(self, object_name: str, bucket: str, upload_id: str) -> list[Part]:
+        """Уже загруженные части — по ним клиент понимает, с какой продолжать."""
+        parts: list[Part] = []
+        marker = None
+        while True:
+            result = self.client._list_parts(bucket, object_name, upload_id, max_parts=1000, part_number_marker=marker)
+            parts.extend(result.parts)
+            if not result.is_truncated:
+                return parts
+            marker = result.next_part_number_marker
+
+    def complete_multipart_upload(self, object_name: str, bucket: str, upload_id: str, parts: list[Part]) -> None:
+        parts = sorted(parts, key=lambda p: p.part_number)
+        self.client._complete_multipart_upload(bucket, object_name, upload_id, [Part(p.part_number, p.etag) for p in parts])
+        head_cache.delete((bucket, object_name))
+
+    def abort_multipart_upload(self, object_name: str, bucket: str, upload_id: str) -> None:
+        self.client._abort_multipart_upload(bucket, object_name, upload_id)
+
+    def internal_url(self, object_name: str, bucket: str, expires_seconds: int = 600) -> str:
+        """Подписанная ссылка на внутренний endpoint — для ffprobe и т.п. внутри сети, не для клиентов."""
+        return self.client.presigned_get_object(bucket, object_name, expires=timedelta(seconds=expires_seconds))
+
     def upload_uploadfile(
         self,
         object_name: str,
@@ -128,23 +736,95 @@ class MinioService:
         content_type: Optional[str] = None,
     ) -> str:
         """
-        Принимает UploadFile, сохраняет во временный файл и загружает в MinIO.
+        Загружает UploadFile в MinIO потоком (см. put_stream).
         Возвращает публичный URL (как и upload_file).
         """
-        # выберем content-type максимально аккуратно
         ctype = content_type or file.content_type or mimetypes.guess_type(file.filename or "")[0] or "application/octet-stream"
+        return self.put_stream(object_name, file.file, bucket, content_type=ctype).url
 
-        # читаем буфер и пишем во временный файл
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            # важно: используем file.file.read(), чтобы не путаться с async/await
-            data = file.file.read()
-            tmp.write(data)
-            tmp_path = tmp.name
 
-        try:
-            return self.upload_file(object_name, tmp_path, bucket, content_type=ctype)
-        finally:
-            try:
-                os.remove(tmp_path)
-            except Exception:
-                pass
+_async_executor: Optional[ThreadPoolExecutor] = None
+_async_executor_lock = threading.Lock()
+
+
+def _get_async_executor() -> ThreadPoolExecutor:
+    global _async_executor
+    if _async_executor is None:
+        with _async_executor_lock:
+            if _async_executor is None:
+                _async_executor = ThreadPoolExecutor(max_workers=settings.S3_ASYNC_WORKERS, thread_name_prefix="s3-async")
+    return _async_executor
+
+
+# HEAD'ы из heads(): короткие запросы на пути выдачи ссылок. Пул свой, а не s3-async:
+# heads() может вызываться из потока s3-async, и ожидание задач в том же пуле при
+# занятых потоках было бы взаимной блокировкой.
+_HEAD_WORKERS = 8
+_head_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_head_executor() -> ThreadPoolExecutor:
+    global _head_executor
+    if _head_executor is None:
+        with _async_executor_lock:
+            if _head_executor is None:
+                _head_executor = ThreadPoolExecutor(max_workers=_HEAD_WORKERS, thread_name_prefix="s3-head")
+    return _head_executor
+
+
+class AsyncMinioService:
+    """
+    Тот же MinioService для async-маршрутов: блокирующие вызовы minio уходят в свой
+    ограниченный пул потоков (S3_ASYNC_WORKERS), а не в event loop. Пул отдельный от
+    threadpool'а Starlette, поэтому долгие загрузки не отнимают потоки у sync-маршрутов.
+    """
+
+    def __init__(self, sync: Optional[MinioService] = None):
+        self.sync = sync or get_minio_service()
+
+    async def _run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_async_executor(), partial(fn, *args, **kwargs))
+
+    async def ensure_bucket(self, bucket: str, public_read: bool = False) -> None:
+        await self._run(self.sync.ensure_bucket, bucket, public_read)
+
+    async def upload_file(self, object_name: str, src_path: str, bucket: str, content_type: Optional[str] = None) -> str:
+        return await self._run(self.sync.upload_file, object_name, src_path, bucket, content_type)
+
+    async def upload_uploadfile(
+        self, object_name: str, file: UploadFile, bucket: str, content_type: Optional[str] = None
+    ) -> str:
+        return await self._run(self.sync.upload_uploadfile, object_name, file, bucket, content_type)
+
+    async def put_stream(
+        self, object_name: str, stream: BinaryIO, bucket: str, content_type: Optional[str] = None
+    ) -> StoredObject:
+        return await self._run(self.sync.put_stream, object_name, stream, bucket, content_type)
+
+    async def upload_part(self, object_name: str, bucket: str, upload_id: str, part_number: int, data: bytes) -> str:
+        return await self._run(self.sync.upload_part, object_name, bucket, upload_id, part_number, data)
+
+    async def upload_dir(self, local_dir: str | Path, prefix: str, bucket: str, **kwargs) -> UploadReport:
+        return await self._run(self.sync.upload_dir, local_dir, prefix, bucket, **kwargs)
+
+    async def stat_object(self, object_name: str, bucket: str):
+        return await self._run(self.sync.client.stat_object, bucket, object_name)
+
+    async def fget_object(self, object_name: str, bucket: str, file_path: str) -> None:
+        await self._run(self.sync.client.fget_object, bucket, object_name, file_path)
+
+    async def read_text(self, object_name: str, bucket: str) -> str:
+        return await self._run(self.sync._read_text, object_name, bucket)
+
+    async def delete_object(self, object_name: str, bucket: str) -> None:
+        await self._run(self.sync.delete_object, object_name, bucket)
+
+    async def presign_get(self, object_name: str, bucket: str, expires_seconds: int = 3600) -> str:
+        # подпись локальная и кешированная — пул не нужен
+        return self.sync.presign_get(object_name, bucket, expires_seconds)
+
+    async def presign_hls_playlist(
+        self, object_name: str, bucket: str, expires_seconds: int = 3600, keep_playlists: bool = False
+    ) -> str:
+        return await self._run(self.sync.presign_hls_playlist, object_name, bucket, expires_seconds, keep_playlists)
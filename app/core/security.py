@@ -49,6 +49,26 @@ def decode_token(token: str):
     except jwt.InvalidTokenError as e:
         raise HTTPException(status_code=403, detail=f"Invalid token: {str(e)}")
 
+def _media_token_key() -> str:
+    # отдельный ключ: токен из URL плейлиста не должен проходить как access-токен
+    return settings.JWT_SECRET + ":hls"
+
+def create_media_token(prefix: str, expires_delta: timedelta) -> str:
+    """Токен для ссылок на HLS: даёт доступ к плейлистам под prefix в бакете без заголовка Authorization."""
+    return jwt.encode(_with_exp({"prefix": prefix}, expires_delta), _media_token_key(), algorithm="HS256")
+
+def decode_media_token(token: str) -> str:
+    """Возвращает prefix из токена create_media_token."""
+    try:
+        payload = jwt.decode(token, _media_token_key(), algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Media token expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=403, detail="Invalid media token")
+    if not payload.get("prefix"):
+        raise HTTPException(status_code=403, detail="Invalid media token")
+    return payload["prefix"]
+
 def decode_refresh_token(token: str):
     import jwt
     try:
@@ -7,18 +7,38 @@ from fastapi.openapi.utils import get_openapi
 import time
 
 from app.api.main import api_router
-from app.core.db import engine
+from app.core.db import engine, replicas
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.cache import cache_stats
 from app.core.config import settings
+from app.core.s3 import get_minio_service, s3_pool_stats
 from app.utils.custom_docs import custom_swagger_ui_html
 from app.core.logger import logger
+from app.modules.search.search_index import search_index
+from app.modules.search.search_similar_job import similar_refresher
 
 
-# ── lifespan: проверка подключения к БД ────────────────────────────────────────
+# ── lifespan: проверка БД и бакета, прогрев поискового индекса, пересчёт похожих ─
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     with engine.connect() as conn:
         conn.execute(text("SELECT 1"))
+    try:
+        # один раз на процесс: загрузки дальше не спрашивают bucket_exists
+        get_minio_service().ensure_bucket(settings.AWS_S3_BUCKET_NAME)
+    except Exception as e:
+        logger.warning("bucket check failed, will retry on first upload: %s", e)
+    try:
+        search_index.warm_up()
+    except Exception as e:
+        logger.warning("search index warm-up failed, will retry on first query: %s", e)
+    similar_refresher.start()
     yield
+    similar_refresher.stop()
+    try:
+        search_index.save()
+    except Exception as e:
+        logger.warning("search index save failed: %s", e)
 
 
 # ── FastAPI app ────────────────────────────────────────────────────────────────
@@ -54,6 +74,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 @app.middleware("http")
@@ -107,5 +128,23 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/health/caches", include_in_schema=False)
+def health_caches():
+    """Счётчики in-process кешей (presign и др.) этого воркера uvicorn."""
+    return cache_stats()
+
+
+@app.get("/health/s3-pool", include_in_schema=False)
+def health_s3_pool():
+    """Общий пул соединений к MinIO этого воркера: занято, пик, сколько запросов ждали соединение."""
+    return s3_pool_stats()
+
+
+@app.get("/health/db-replicas", include_in_schema=False)
+def health_db_replicas():
+    """Реплики для чтения этого воркера: какие сейчас пропускаются после ошибки подключения."""
+    return replicas.status()
+
+
 # ── API роутер ────────────────────────────────────────────────────────────────
 app.include_router(api_router, prefix="/api/v1")
@@ -5,6 +5,8 @@ from typing import Optional, List
 from datetime import datetime, UTC
 
 from sqlmodel import SQLModel, Field, Column, DateTime, UniqueConstraint, Relationship
+from sqlalchemy import BigInteger, Computed, Index, Table
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.types import Enum as SAEnum
 
 
@@ -104,7 +106,7 @@ class Playlist(SQLModel, table=True):
 
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC), nullable=False)
     updated_at: datetime = Field(
-        sa_column=Column(DateTime(timezone=True), default=datetime.now(UTC), onupdate=datetime.now(UTC))
+        sa_column=Column(DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
     )
     deleted_at: Optional[datetime] = Field(default=None, nullable=True)
 
@@ -124,7 +126,7 @@ class Genre(SQLModel, table=True):
 
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC), nullable=False)
     updated_at: datetime = Field(
-        sa_column=Column(DateTime(timezone=True), default=datetime.now(UTC), onupdate=datetime.now(UTC))
+        sa_column=Column(DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
     )
     deleted_at: Optional[datetime] = Field(default=None, nullable=True)
 
@@ -152,7 +154,7 @@ class Music(SQLModel, table=True):
 
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC), nullable=False)
     updated_at: datetime = Field(
-        sa_column=Column(DateTime(timezone=True), default=datetime.now(UTC), onupdate=datetime.now(UTC))
+        sa_column=Column(DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
     )
     deleted_at: Optional[datetime] = Field(default=None, nullable=True)
 
@@ -182,7 +184,7 @@ class Ad(SQLModel, table=True):
 
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC), nullable=False)
     updated_at: datetime = Field(
-        sa_column=Column(DateTime(timezone=True), default=datetime.now(UTC), onupdate=datetime.now(UTC))
+        sa_column=Column(DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
     )
     deleted_at: Optional[datetime] = Field(default=None, nullable=True)
 
@@ -198,3 +200,178 @@ class Statistics(SQLModel, table=True):
 
     watched_full: bool = Field(default=False)
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC), nullable=False)
+
+
+# ───────────────────────── Transcoding ───────────────
+class TranscodeJobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class TranscodeJob(SQLModel, table=True):
+    """Очередь перекодирования в HLS: строки забирает `python -m app.cli transcode-worker`."""
+    __tablename__ = "transcode_job"
+    __table_args__ = (Index("ix_transcode_job_status_run_after", "status", "run_after"),)
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    kind: str = Field(max_length=16, index=True)              # video | music | ad
+    item_id: str = Field(index=True)
+    source_key: str                                           # исходник в MinIO
+    status: TranscodeJobStatus = Field(
+        sa_column=Column(SAEnum(TranscodeJobStatus, name="transcode_job_status_enum"), nullable=False),
+        default=TranscodeJobStatus.PENDING,
+    )
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=3)
+    run_after: datetime = Field(default_factory=lambda: datetime.now(UTC), sa_column=Column(DateTime(timezone=True), nullable=False))
+    lease_owner: Optional[str] = Field(default=None)
+    lease_expires_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True)))
+    last_error: Optional[str] = Field(default=None)
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC), sa_column=Column(DateTime(timezone=True), nullable=False))
+    updated_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+    )
+
+
+# ───────────────────────── Uploads ───────────────────────
+class UploadSessionStatus(str, enum.Enum):
+    ACTIVE = "active"          # части ещё грузятся
+    COMPLETED = "completed"    # multipart собран, объект в MinIO
+    CONSUMED = "consumed"      # объект привязан к видео/книге
+    ABORTED = "aborted"
+
+
+class UploadSession(SQLModel, table=True):
+    """
+    Загрузка файла в обход API: возобновляемая (S3 multipart, s3_upload_id задан)
+    или прямая из браузера по presigned PUT/POST (s3_upload_id пуст).
+    """
+    __tablename__ = "upload_session"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    kind: str = Field(max_length=16)                          # video | music | ad | book | image
+    object_key: str                                           # куда собирается объект в MinIO
+    s3_upload_id: Optional[str] = Field(default=None)
+    filename: str
+    content_type: Optional[str] = Field(default=None)
+    size: Optional[int] = Field(default=None, sa_column=Column(BigInteger))  # известен после complete
+    status: UploadSessionStatus = Field(
+        sa_column=Column(SAEnum(UploadSessionStatus, name="upload_session_status_enum"), nullable=False, index=True),
+        default=UploadSessionStatus.ACTIVE,
+    )
+    created_by: uuid.UUID = Field(foreign_key="users.id", index=True, nullable=False)
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC), sa_column=Column(DateTime(timezone=True), nullable=False))
+    updated_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+    )
+
+
+# ───────────────────────── Media blobs ───────────────────
+class MediaBlob(SQLModel, table=True):
+    """
+    Индекс содержимого загруженных файлов: одинаковые байты хранятся в MinIO один раз.
+    hls_key — мастер-плейлист, уже сделанный из этого исходника (hls_kind: video | music).
+    """
+    __tablename__ = "media_blob"
+    __table_args__ = (UniqueConstraint("bucket", "object_key", name="uq_media_blob_object"),)
+
+    bucket: str = Field(primary_key=True)
+    sha256: str = Field(primary_key=True, max_length=64)
+    object_key: str
+    size: int = Field(sa_column=Column(BigInteger, nullable=False))
+    content_type: Optional[str] = Field(default=None)
+    hls_kind: Optional[str] = Field(default=None, max_length=16)
+    hls_key: Optional[str] = Field(default=None)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC), sa_column=Column(DateTime(timezone=True), nullable=False))
+
+
+# ───────────────────────── Search ────────────────────────
+class SearchSimilar(SQLModel, table=True):
+    """Предрассчитанные top-K похожих элементов (одна строка на книгу/видео/трек)."""
+    __tablename__ = "search_similar"
+
+    item_type: str = Field(primary_key=True, max_length=16)   # book | video | music
+    item_id: str = Field(primary_key=True)
+    text_hash: str = Field(max_length=40)                       # sha1(title + description) на момент расчёта
+    neighbours: list[dict] = Field(default_factory=list, sa_column=Column(JSONB, nullable=False))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC), nullable=False)
+
+
+# ───────────────────────── Full-text search ─────────────
+# Жанры и названия в основном русские, но встречается и английский —
+# индексируем каждое поле обоими словарями.
+FTS_CONFIGS = ("russian", "english")
+
+
+def _add_search_vector(table: Table, weighted_columns: list[tuple[str, str]]) -> None:
+    """
+    Добавляет в таблицу generated-колонку search_tsv (tsvector) и GIN-индекс по ней.
+    Колонка не маппится в модель: SQLAlchemy не пытается её вставлять/обновлять,
+    а в запросах она доступна как Model.__table__.c.search_tsv.
+    """
+    parts = [
+        f"setweight(to_tsvector('{cfg}'::regconfig, coalesce({column}, '')), '{weight}')"
+        for column, weight in weighted_columns
+        for cfg in FTS_CONFIGS
+    ]
+    table.append_column(Column("search_tsv", TSVECTOR, Computed(" || ".join(parts), persisted=True)))
+    Index(f"ix_{table.name}_search_tsv", table.c.search_tsv, postgresql_using="gin")
+
+
+_add_search_vector(Book.__table__, [("title", "A"), ("author", "A"), ("description", "B")])
+_add_search_vector(Video.__table__, [("title", "A"), ("description", "B")])
+_add_search_vector(Music.__table__, [("title", "A"), ("description", "B")])
+_add_search_vector(Playlist.__table__, [("title", "A"), ("description", "B")])
+
+
+# ───────────────────────── Trigram indexes ──────────────
+# GIN (gin_trgm_ops) по текстовым колонкам q=-фильтров: ilike '%q%' и
+# нечёткое `col %> q` идут по индексу вместо seq scan. Нужен pg_trgm
+# (CREATE EXTENSION делают миграция 009 и create_db_and_tables).
+def _add_trigram_indexes(table: Table, columns: list[str]) -> None:
+    for column in columns:
+        Index(
+            f"ix_{table.name}_{column}_trgm",
+            table.c[column],
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        )
+
+
+_add_trigram_indexes(Book.__table__, ["title", "author", "description"])
+_add_trigram_indexes(Video.__table__, ["title", "description"])
+_add_trigram_indexes(Music.__table__, ["title", "description"])
+_add_trigram_indexes(Playlist.__table__, ["title", "description"])
+_add_trigram_indexes(Genre.__table__, ["name", "description"])
+_add_trigram_indexes(Ad.__table__, ["title"])
+
+
+# ───────────────────────── Keyset pagination ────────────
+# Списки идут по (created_at, id) — app.core.pagination.keyset: составной индекс
+# даёт и порядок, и условие «после курсора» без OFFSET. Если список фильтрует
+# мягко удалённые, индекс частичный (deleted_at IS NULL); prefix — колонки
+# фильтра списка (плейлист у музыки, статус у видео, реклама у статистики).
+def _add_keyset_index(table: Table, prefix: tuple[str, ...] = (), soft_delete: bool = True) -> None:
+    columns = [*prefix, "created_at", "id"]
+    Index(
+        f"ix_{table.name}_{'_'.join(columns)}",
+        *(table.c[column] for column in columns),
+        postgresql_where=table.c.deleted_at.is_(None) if soft_delete else None,
+    )
+
+
+_add_keyset_index(Music.__table__)
+_add_keyset_index(Music.__table__, ("playlist_id",))
+_add_keyset_index(Playlist.__table__)
+_add_keyset_index(Genre.__table__)
+_add_keyset_index(Ad.__table__)
+_add_keyset_index(Video.__table__)
+_add_keyset_index(Video.__table__, ("status",))
+_add_keyset_index(Book.__table__)
+_add_keyset_index(User.__table__, soft_delete=False)
+_add_keyset_index(Statistics.__table__, soft_delete=False)
+_add_keyset_index(Statistics.__table__, ("ad_id",), soft_delete=False)
@@ -1,19 +1,43 @@
 from datetime import datetime, UTC
 from app.models import Ad
-from app.core.db import engine
-from sqlmodel import Session, desc, select
+from app.core.db import session_scope
+from app.core.fts import trigram_match, trigram_rank
+from app.core.pagination import Cursor, keyset
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.schemas import AdPublic, UpdateAd
 
+
+def _select_all(skip: int | None, limit: int | None, order_by: str, q: str | None, cursor: Cursor | None = None):
+    stmt = select(Ad).where(Ad.deleted_at == None)
+
+    if q:
+        stmt = stmt.where(trigram_match(q, Ad.title))
+
+    if order_by == "date":
+        stmt = keyset(stmt, Ad, cursor)
+    elif order_by == "title":
+        stmt = stmt.order_by(Ad.title)
+    elif order_by == "relevance" and q:
+        stmt = stmt.order_by(trigram_rank(q, Ad.title).desc())
+
+    if skip:
+        stmt = stmt.offset(skip)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
 class AdRepository():
     def create(self, data: Ad) -> AdPublic:
-        with Session(engine) as session:
+        with session_scope() as session:
             session.add(data)
             session.commit()
             session.refresh(data)
             return AdPublic.model_validate(data)
 
     def findById(self, id: str) -> AdPublic | None:
-        with Session(engine) as session:
+        with session_scope(read_only=True) as session:
             stmt = select(Ad).where(Ad.id == id, Ad.deleted_at == None)
             result = session.exec(stmt).first()
             if not result:
@@ -25,31 +49,19 @@ class AdRepository():
         skip: int | None = None,
         limit: int | None = None,
         order_by: str = "date",
-        q: str | None = None
+        q: str | None = None,
+        cursor: Cursor | None = None,
     ) -> list[AdPublic]:
-        with Session(engine) as session:
-            stmt = select(Ad).where(Ad.deleted_at == None)
-
-            if q:
-                stmt = stmt.where(
-                    (Ad.title.ilike(f"%{q}%"))
-                )
-
-            if order_by == "date":
-                stmt = stmt.order_by(desc(Ad.created_at))
-            elif order_by == "title":
-                stmt = stmt.order_by(Ad.title)
-
-            if skip:
-                stmt = stmt.offset(skip)
-            if limit:
-                stmt = stmt.limit(limit)
-
-            results = session.exec(stmt).all()
+        with session_scope(read_only=True) as session:
+            results = session.exec(_select_all(skip, limit, order_by, q, cursor)).all()
             return [AdPublic.model_validate(result) for result in results]
 
+    def exportQuery(self, q: str | None = None):
+        """Тот же запрос, что у findAll (по дате), без limit/offset — для app.core.export."""
+        return _select_all(None, None, "date", q)
+
     def updateById(self, id: str, data: UpdateAd) -> AdPublic | None:
-        with Session(engine) as session:
+        with session_scope() as session:
             stmt = select(Ad).where(Ad.id == id, Ad.deleted_at == None)
             result = session.exec(stmt).first()
             if not result:
@@ -65,7 +77,7 @@ class AdRepository():
             return AdPublic.model_validate(result)
 
     def deleteById(self, id: str) -> AdPublic | None:
-        with Session(engine) as session:
+        with session_scope() as session:
             stmt = select(Ad).where(Ad.id == id)
             result = session.exec(stmt).first()
             if not result:
@@ -74,4 +86,39 @@ class AdRepository():
             session.add(result)
             session.commit()
             session.refresh(result)
-            return AdPublic.model_validate(result)
\ No newline at end of file
+            return AdPublic.model_validate(result)
+
+
+class AsyncAdRepository():
+    """Реклама на AsyncSession запроса — для async def-маршрутов."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create(self, data: Ad, commit: bool = True) -> AdPublic:
+        """commit=False — только flush: строку зафиксирует следующий commit сессии (вместе с задачей transcode)."""
+        self.session.add(data)
+        if commit:
+            await self.session.commit()
+        else:
+            await self.session.flush()
+        await self.session.refresh(data)
+        return AdPublic.model_validate(data)
+
+    async def findById(self, id: str) -> AdPublic | None:
+        stmt = select(Ad).where(Ad.id == id, Ad.deleted_at.is_(None))
+        result = (await self.session.exec(stmt)).first()
+        if not result:
+            return None
+        return AdPublic.model_validate(result)
+
+    async def findAll(
+        self,
+        skip: int | None = None,
+        limit: int | None = None,
+        order_by: str = "date",
+        q: str | None = None,
+        cursor: Cursor | None = None,
+    ) -> list[AdPublic]:
+        results = (await self.session.exec(_select_all(skip, limit, order_by, q, cursor))).all()
+        return [AdPublic.model_validate(result) for result in results]
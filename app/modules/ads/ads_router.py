@@ -1,10 +1,12 @@
 from typing import Annotated
 import uuid
 from pydantic import Field
-from fastapi import Form, APIRouter, UploadFile, Path, BackgroundTasks, Depends
+from fastapi import Form, APIRouter, HTTPException, UploadFile, Path, Depends, Response
 
+from app.api.deps import AsyncReadSessionDep, AsyncSessionDep, CursorDep, ExportFormatDep, LimitDep, get_unit_of_work
+from app.core.pagination import set_next_cursor
 from app.modules.ads.ads_service import AdService
-from app.schemas import CreateAd, AdPublic
+from app.schemas import AdFinalize, CreateAd, AdPublic
 from app.modules.auth.auth_router import any_user_guard, admin_guard
 
 service = AdService()
@@ -12,24 +14,44 @@ service = AdService()
 ad_router = APIRouter(
     prefix="/ads",
     tags=["Ads"],
+    dependencies=[Depends(get_unit_of_work)],
 )
 
+@ad_router.get("/export")
+def export_ads(
+    fmt: ExportFormatDep = "ndjson",
+    q: str | None = None,
+    _=Depends(admin_guard),
+):
+    """Вся реклама потоком (NDJSON или CSV), от новых к старым."""
+    return service.export(fmt, q=q)
+
 @ad_router.get("/{id}", response_model=AdPublic | None)
-def get_ad_by_id(
+async def get_ad_by_id(
     id: Annotated[str, Path(description="The id of ad")],
+    session: AsyncReadSessionDep,
     _=Depends(any_user_guard),
 ):
-    return service.findById(id)
+    return await service.findById(session, id)
 
 @ad_router.get("/", response_model=list[AdPublic])
-def get_ads(
+async def get_ads(
+    session: AsyncReadSessionDep,
+    response: Response,
+    cursor: CursorDep,
+    limit: LimitDep,
     skip: int | None = None,
-    limit: int | None = None,
     order_by: str = "date",
     q: str | None = None,
     _=Depends(any_user_guard),
 ):
-    return service.findAll(skip=skip, limit=limit, order_by=order_by, q=q)
+    # курсор (created_at, id) — только для сортировки по дате
+    if cursor and order_by != "date":
+        raise HTTPException(status_code=400, detail="cursor requires order_by=date")
+    ads = await service.findAll(session, skip=skip, limit=limit, order_by=order_by, q=q, cursor=cursor)
+    if order_by == "date":
+        set_next_cursor(response, ads, limit)
+    return ads
 
 @ad_router.post("/", response_model=AdPublic)
 async def create_ad(
@@ -39,10 +61,18 @@ async def create_ad(
         Field()
     ],
     ad: UploadFile,
-    background_tasks: BackgroundTasks,
+    session: AsyncSessionDep,
+    _=Depends(admin_guard),
+):
+    return await service.create(session, data=CreateAd(title=title), ad=ad)
+
+@ad_router.post("/finalize", response_model=AdPublic)
+def finalize_ad(
+    data: AdFinalize,
     _=Depends(admin_guard),
 ):
-    return await service.create(data=CreateAd(title=title), ad=ad, background_tasks=background_tasks)
+    """Создать рекламу из ролика, загруженного напрямую в хранилище (POST /uploads/presign)."""
+    return service.finalize(data)
 
 @ad_router.delete("/{id}", response_model=AdPublic)
 def delete_ad(
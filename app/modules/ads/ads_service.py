@@ -1,7 +1,7 @@
 import tempfile
 import uuid
 from pathlib import Path
-from fastapi import BackgroundTasks, HTTPException, UploadFile
+from fastapi import HTTPException, UploadFile
 
 import mimetypes
 import os
@@ -9,77 +9,79 @@ import shutil
 from app.models import Ad, AdStatus
 from app.core.logger import logger
 from app.core.config import settings
-from app.core.s3 import MinioService
-from app.schemas import CreateAd, UpdateAd, AdPublic
-from app.modules.ads.ads_repository import AdRepository
+from app.core.db import transaction
+from app.core.export import ExportFormat, stream_export
+from app.core.pagination import Cursor
+from app.core.s3 import AsyncMinioService, get_minio_service
+from app.schemas import AdFinalize, CreateAd, UpdateAd, AdPublic
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.modules.ads.ads_repository import AdRepository, AsyncAdRepository
 from app.modules.transcoder.transcoder_service import TranscoderService
+from app.modules.transcoder.transcode_job_repository import (
+    AsyncTranscodeJobRepository,
+    TranscodeItemGone,
+    TranscodeJobRepository,
+)
+from app.modules.uploads.upload_service import UploadService
 
 VALID_VIDEO_TYPES = {"video/mp4", "video/avi", "video/mpeg", "video/quicktime", "video/webm"}
 
 class AdService():
     def __init__(self):
-        self.minio = MinioService()
+        self.minio = get_minio_service()
+        self.storage = AsyncMinioService(self.minio)
         self.repo = AdRepository()
         self.transcoder = TranscoderService()
+        self.jobs = TranscodeJobRepository()
 
-    def _upload_hls_dir(self, local_dir: Path, ad_id: str) -> str:
+    def _transcode_and_publish(self, input_path: str, local_dir: Path, ad_id: str) -> str | None:
+        """Кодирует в HLS, выгружая сегменты по ходу; возвращает URL плейлиста или None, если ffmpeg упал."""
         prefix = f"ads/hls/{ad_id}/"
-        count = 0
-        for p in local_dir.glob("*"):
-            if p.is_file():
-                key = f"{prefix}{p.name}"
-                ctype, _ = mimetypes.guess_type(p.name)
-                self.minio.client.fput_object(
-                    bucket_name=settings.AWS_S3_BUCKET_NAME,
-                    object_name=key,
-                    file_path=str(p),
-                    content_type=ctype or "application/octet-stream",
-                )
-                count += 1
-        if count == 0:
-            raise RuntimeError("No HLS files to upload")
+        with self.minio.hls_publisher(local_dir, prefix, settings.AWS_S3_BUCKET_NAME) as publisher:
+            ok = self.transcoder.transcodeToHlsLadder(input_path, str(local_dir / "index.m3u8"), on_segment=publisher.segment_ready)
+            if not ok:
+                return None
+            if publisher.finish().count == 0:
+                raise RuntimeError("No HLS files to upload")
         return f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/{prefix}index.m3u8"
 
-    def transcodeAd(self, ad_id, input_path: str):
+    def transcodeAd(self, ad_id, source_key: str):
+        """
+        Задача transcode-воркера: исходник из MinIO → HLS → MinIO, статус ACTIVE.
+        Ошибки пробрасываются — повтор или FAILED решает воркер. Здесь только
+        репозиторий, не updateById: HTTPException из дочернего процесса пула не распаковывается.
+        """
         tmp_dir = Path(tempfile.mkdtemp(prefix="hls_ad_"))
-        output_path = tmp_dir / "index.m3u8"
         try:
-            status = self.transcoder.transcodeToHls(input_path, str(output_path))
-            if status:
-                master_url = self._upload_hls_dir(tmp_dir, ad_id)
-                self.updateById(ad_id, UpdateAd(status=AdStatus.ACTIVE, video_url=master_url))
-            else:
-                self.updateById(ad_id, UpdateAd(status=AdStatus.FAILED))
+            input_path = tmp_dir / "source"
+            self.minio.client.fget_object(settings.AWS_S3_BUCKET_NAME, source_key, str(input_path))
+            master_url = self._transcode_and_publish(str(input_path), tmp_dir / "hls", ad_id)
+            if not master_url:
+                raise RuntimeError("ffmpeg failed")
+            if self.repo.findById(ad_id) is None:
+                raise TranscodeItemGone(f"ad {ad_id} deleted")
+            if self.repo.updateById(ad_id, UpdateAd(status=AdStatus.ACTIVE, video_url=master_url)) is None:
+                raise TranscodeItemGone(f"ad {ad_id} deleted")
         finally:
-            try:
-                Path(input_path).unlink(missing_ok=True)
-            except Exception:
-                pass
-            try:
-                shutil.rmtree(tmp_dir, ignore_errors=True)
-            except Exception:
-                pass
-
-    async def create(self, data: CreateAd, ad: UploadFile, background_tasks: BackgroundTasks) -> AdPublic:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    async def create(self, session: AsyncSession, data: CreateAd, ad: UploadFile) -> AdPublic:
         try:
             self.validate_file(ad, VALID_VIDEO_TYPES, "ad")
 
-            with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                tmp_path = tmp.name
-                tmp.write(await ad.read())
             ad_ext = mimetypes.guess_extension(ad.content_type) or os.path.splitext(ad.filename)[1]
             object_name = f"{uuid.uuid4()}{ad_ext}"
-            ad_key = self.minio.upload_file(object_name, tmp_path, settings.AWS_S3_BUCKET_NAME)
+            ad_key = (await self.storage.put_stream(object_name, ad.file, settings.AWS_S3_BUCKET_NAME, ad.content_type)).url
 
-            ad_obj = self.repo.create(
+            ad_obj = await AsyncAdRepository(session).create(
                 Ad(
                     title=data.title,
                     video_url=ad_key,
                     status=AdStatus.PROCESSING
-                )
+                ),
+                commit=False,
             )
-
-            background_tasks.add_task(self.transcodeAd, ad_obj.id, tmp_path)
+            await AsyncTranscodeJobRepository(session).enqueue("ad", str(ad_obj.id), object_name)
 
             return ad_obj
         except HTTPException as e:
@@ -88,9 +90,31 @@ class AdService():
             logger.error("error %s", e)
             raise HTTPException(status_code=500, detail="Internal server error")
 
-    def findById(self, id: str) -> AdPublic | None:
+    def finalize(self, data: AdFinalize) -> AdPublic:
+        """Ролик уже лежит в MinIO (загружен из браузера по /uploads/presign)."""
+        try:
+            uploads = UploadService()
+            upload = uploads.prepare(data.upload_id, "ad")
+            # строка, забранная загрузка и задача — одной транзакцией
+            with transaction(), uploads.claim((upload, "upload_id")):
+                ad_obj = self.repo.create(
+                    Ad(
+                        title=data.title,
+                        video_url=self.minio.public_url(upload.object_key, settings.AWS_S3_BUCKET_NAME),
+                        status=AdStatus.PROCESSING,
+                    )
+                )
+                self.jobs.enqueue("ad", str(ad_obj.id), upload.object_key)
+            return ad_obj
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error("error %s", e)
+            raise HTTPException(status_code=500, detail="Internal server error")
+
+    async def findById(self, session: AsyncSession, id: str) -> AdPublic | None:
         try:
-            ad = self.repo.findById(id)
+            ad = await AsyncAdRepository(session).findById(id)
             if not ad:
                 raise HTTPException(status_code=404, detail="Ad not found")
             return ad
@@ -100,14 +124,25 @@ class AdService():
             logger.error("error %s", e)
             raise HTTPException(status_code=500)
 
-    def findAll(self, skip: int | None = None, limit: int | None = None, order_by: str = "date", q: str | None = None) -> list[AdPublic]:
+    async def findAll(
+        self,
+        session: AsyncSession,
+        skip: int | None = None,
+        limit: int | None = None,
+        order_by: str = "date",
+        q: str | None = None,
+        cursor: Cursor | None = None,
+    ) -> list[AdPublic]:
         try:
-            ads = self.repo.findAll(skip, limit, order_by, q=q)
+            ads = await AsyncAdRepository(session).findAll(skip, limit, order_by, q=q, cursor=cursor)
             return ads
         except Exception as e:
             logger.error("error %s", e)
             raise HTTPException(status_code=500)
 
+    def export(self, fmt: ExportFormat, q: str | None = None):
+        return stream_export(self.repo.exportQuery(q), AdPublic, fmt, "ads")
+
     def updateById(self, id: str, data: UpdateAd) -> AdPublic:
         try:
             ad = self.repo.updateById(id, data)
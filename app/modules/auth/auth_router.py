@@ -3,11 +3,12 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import JSONResponse
 
+from app.api.deps import get_unit_of_work
 from app.core.security import decode_token
 from app.modules.auth.auth_dto import SignInDto, SignUpDto, RefreshDto
 from app.modules.auth.auth_service import AuthService
 
-auth_router = APIRouter(prefix="/auth",)
+auth_router = APIRouter(prefix="/auth", dependencies=[Depends(get_unit_of_work)])
 service = AuthService()
 
 def _extract_token_from_request(request: Request) -> str:
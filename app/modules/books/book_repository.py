@@ -5,6 +5,8 @@ from typing import Optional, List
 from datetime import datetime
 from sqlmodel import Session, select
 
+from app.core.fts import text_match, text_rank
+from app.core.pagination import Cursor, keyset
 from app.models import Book
 
 
@@ -34,18 +36,15 @@ class BookRepository:
         limit: int,
         offset: int,
         include_deleted: bool = False,
+        cursor: Optional[Cursor] = None,
     ) -> List[Book]:
         stmt = select(Book)
         if not include_deleted:
             stmt = stmt.where(Book.deleted_at.is_(None))
 
         if q:
-            like = f"%{q}%"
-            stmt = stmt.where(
-                (Book.title.ilike(like)) |
-                (Book.author.ilike(like)) |
-                (Book.description.ilike(like))
-            )
+            stmt = stmt.where(text_match(Book, q, Book.title, Book.author, Book.description))
+            stmt = stmt.order_by(text_rank(Book, q, Book.title, Book.author, Book.description).desc())
         if genre:
             stmt = stmt.where(Book.genre == genre)
         if author:
@@ -53,7 +52,7 @@ class BookRepository:
         if year is not None:
             stmt = stmt.where(Book.published_year == year)
 
-        stmt = stmt.order_by(Book.created_at.desc()).limit(limit).offset(offset)
+        stmt = keyset(stmt, Book, cursor).limit(limit).offset(offset)
         return self.session.exec(stmt).all()
 
     # UPDATE (generic save)
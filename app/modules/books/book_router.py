@@ -3,39 +3,53 @@ from __future__ import annotations
 import uuid
 from typing import Annotated, Optional, List
 
-from fastapi import APIRouter, Depends, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Response
 from sqlmodel import Session
 
+from app.api.deps import CursorDep, LimitDep, ReadSessionDep, StorageDep
+from app.core.pagination import set_next_cursor
 from app.core.db import get_session
-from app.schemas import BookCreate, BookUpdate, BookOut
+from app.schemas import BookCreate, BookFinalize, BookUpdate, BookOut
 from app.modules.books.book_service import BookService
 from app.modules.auth.auth_router import any_user_guard, admin_guard
 
 router = APIRouter(prefix="/books", tags=["Books"])
 
+
+def svc(storage: StorageDep, session: Session = Depends(get_session)) -> BookService:
+    return BookService(session, storage)
+
+def read_svc(storage: StorageDep, session: ReadSessionDep) -> BookService:
+    return BookService(session, storage)
+
 # ---------- READ (публичный доступ на чтение по ТЗ) ----------
 @router.get("", response_model=List[BookOut])
 def list_books(
+    response: Response,
+    cursor: CursorDep,
+    limit: LimitDep,
     q: Optional[str] = Query(None, description="query in title/author/description"),
     genre: Optional[str] = Query(None),
     author: Optional[str] = Query(None),
     year: Optional[int] = Query(None),
-    limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
     _=Depends(any_user_guard),
-    session: Session = Depends(get_session),
+    service: BookService = Depends(read_svc),
 ):
-    service = BookService(session)
-    return service.list(q=q, genre=genre, author=author, year=year, limit=limit, offset=offset)
+    if cursor and q:
+        raise HTTPException(400, "cursor cannot be combined with q")
+    books = service.list(q=q, genre=genre, author=author, year=year, limit=limit, offset=offset, cursor=cursor)
+    if not q:
+        set_next_cursor(response, books, limit)
+    return books
 
 
 @router.get("/{book_id}", response_model=BookOut)
 def get_book(
     book_id: uuid.UUID,
     _=Depends(any_user_guard),
-    session: Session = Depends(get_session),
+    service: BookService = Depends(read_svc),
 ):
-    service = BookService(session)
     return service.get(book_id)
 
 
@@ -43,9 +57,8 @@ def get_book(
 def get_book_links(
     book_id: uuid.UUID,
     _=Depends(any_user_guard),
-    session: Session = Depends(get_session),
+    service: BookService = Depends(read_svc),
 ):
-    service = BookService(session)
     return service.presigned_links(book_id)
 
 # ---------- WRITE (только админ) ----------
@@ -56,9 +69,10 @@ def create_book(
     description: str = Form(...),
     genre: Optional[str] = Form(None),              # ✅ дефолт через =
     published_year: Optional[int] = Form(None),     # ✅
-    file: UploadFile = File(..., description="PDF/EPUB file"),
+    file: Optional[UploadFile] = File(None, description="PDF/EPUB file (or upload_id)"),
     cover: UploadFile = File(..., description="image/* cover"),
-    session: Session = Depends(get_session),
+    upload_id: Optional[str] = Form(None, description="completed resumable upload (POST /uploads)"),
+    service: BookService = Depends(svc),
     user=Depends(any_user_guard),
 ):
     body = BookCreate(
@@ -68,21 +82,31 @@ def create_book(
         genre=genre,
         published_year=published_year,
     )
-    return BookService(session).create(
+    return service.create(
         created_by=uuid.UUID(user["id"]),
         body=body,
         file=file,
         cover=cover,
+        upload_id=upload_id,
     )
 
 
+@router.post("/finalize", response_model=BookOut, dependencies=[Depends(admin_guard)])
+def finalize_book(
+    body: BookFinalize,
+    service: BookService = Depends(svc),
+    user=Depends(any_user_guard),
+):
+    """Книга и обложка загружены из браузера напрямую в MinIO (POST /uploads/presign)."""
+    return service.finalize(created_by=uuid.UUID(user["id"]), body=body)
+
+
 @router.patch("/{book_id}", response_model=BookOut, dependencies=[Depends(admin_guard)])
 def update_book_meta(
     book_id: uuid.UUID,
     patch: BookUpdate,
-    session: Session = Depends(get_session),
+    service: BookService = Depends(svc),
 ):
-    service = BookService(session)
     return service.update_meta(book_id, patch)
 
 
@@ -90,7 +114,6 @@ def update_book_meta(
 @router.delete("/{book_id}", response_model=dict, dependencies=[Depends(admin_guard)])
 def delete_book(
     book_id: uuid.UUID,
-    session: Session = Depends(get_session),
+    service: BookService = Depends(svc),
 ):
-    service = BookService(session)
     return service.soft_delete(book_id)
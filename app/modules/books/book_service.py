@@ -8,10 +8,15 @@ from fastapi import HTTPException, UploadFile
 from sqlmodel import Session
 
 from app.core.config import settings
-from app.core.s3 import MinioService
+from app.core.db import transaction
+from app.core.pagination import Cursor
+from app.core.s3 import MinioService, get_minio_service
 from app.models import Book
-from app.schemas import BookCreate, BookUpdate
+from app.schemas import BookCreate, BookFinalize, BookUpdate
 from app.modules.books.book_repository import BookRepository
+from app.modules.media.media_blob_service import MediaBlobService
+from app.modules.search.search_index import search_index
+from app.modules.uploads.upload_service import UploadService
 
 # Разрешённые типы
 ALLOWED_BOOK_MIMES = {
@@ -42,11 +47,12 @@ def _ext_for_cover(file: UploadFile) -> str:
 
 
 class BookService:
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, storage: Optional[MinioService] = None):
         self.session = session
         self.repo = BookRepository(session)
-        self.minio = MinioService()
+        self.minio = storage or get_minio_service()
         self.bucket = _bucket()
+        self.blobs = MediaBlobService(self.minio)
 
     def _ensure(self, book_id: uuid.UUID) -> Book:
         book = self.repo.get(book_id)
@@ -71,30 +77,64 @@ class BookService:
         *,
         created_by: uuid.UUID,
         body: BookCreate,
-        file: UploadFile,
+        file: Optional[UploadFile],
         cover: Optional[UploadFile],
+        upload_id: Optional[str] = None,
     ) -> Book:
-        ct = (file.content_type or "").lower()
-        if ct not in ALLOWED_BOOK_MIMES and _ext_for_book(file) not in {".pdf", ".epub"}:
-            raise HTTPException(400, "file must be PDF or EPUB")
+        """Файл книги — либо file, либо завершённая resumable-загрузка upload_id (/uploads)."""
+        if (file is None) == (upload_id is None):
+            raise HTTPException(400, "Provide either file or upload_id")
+        if file is not None:
+            ct = (file.content_type or "").lower()
+            if ct not in ALLOWED_BOOK_MIMES and _ext_for_book(file) not in {".pdf", ".epub"}:
+                raise HTTPException(400, "file must be PDF or EPUB")
 
         if cover and not (cover.content_type or "").lower().startswith(ALLOWED_COVER_PREFIX):
             raise HTTPException(400, "cover must be an image/*")
 
         new_id = uuid.uuid4()
 
-        # book file
-        file_ext = _ext_for_book(file)
-        file_obj = f"books/{new_id}/file{file_ext}"
-        file_url = self.minio.upload_uploadfile(file_obj, file, self.bucket)
+        # book file: загрузка проверяется сейчас, забирается вместе с созданием строки
+        uploads = UploadService()
+        upload = None
+        if upload_id is not None:
+            upload = uploads.prepare(upload_id, "book")
+            file_url = self.minio.public_url(upload.object_key, self.bucket)
+        else:
+            file_url = self.blobs.store(file.file, self.bucket, _ext_for_book(file), file.content_type).url
 
         # cover (optional)
         cover_url = None
         if cover:
-            cover_ext = _ext_for_cover(cover)
-            cover_obj = f"books/{new_id}/cover{cover_ext}"
-            cover_url = self.minio.upload_uploadfile(cover_obj, cover, self.bucket)
+            cover_url = self.blobs.store(cover.file, self.bucket, _ext_for_cover(cover), cover.content_type).url
 
+        with transaction() as tx, uploads.claim(*([(upload, "upload_id")] if upload is not None else [])):
+            book = self._register(tx, new_id, created_by, body, file_url, cover_url)
+        search_index.upsert("book", str(book.id), book.title, book.description)
+        return book
+
+    def finalize(self, *, created_by: uuid.UUID, body: BookFinalize) -> Book:
+        """Файл и обложка уже лежат в MinIO (загружены из браузера по /uploads/presign)."""
+        uploads = UploadService()
+        # сначала проверяются обе загрузки: отклонённая обложка не должна сжечь файл книги
+        book = uploads.prepare(body.upload_id, "book")
+        cover = uploads.prepare(body.cover_upload_id, "image", "cover_upload_id") if body.cover_upload_id else None
+        file_url = self.minio.public_url(book.object_key, self.bucket)
+        cover_url = self.minio.public_url(cover.object_key, self.bucket) if cover else None
+        with transaction() as tx, uploads.claim((book, "upload_id"), *([(cover, "cover_upload_id")] if cover else [])):
+            book = self._register(tx, uuid.uuid4(), created_by, body, file_url, cover_url)
+        search_index.upsert("book", str(book.id), book.title, book.description)
+        return book
+
+    def _register(
+        self,
+        tx: Session,
+        new_id: uuid.UUID,
+        created_by: uuid.UUID,
+        body: BookCreate,
+        file_url: str,
+        cover_url: Optional[str],
+    ) -> Book:
         book = Book(
             id=new_id,
             title=body.title,
@@ -107,7 +147,8 @@ class BookService:
             created_by=created_by,
             # created_at/updated_at у тебя уже дефолтятся в модели, можно не трогать
         )
-        return self.repo.create(book)
+        # в транзакции tx вызывающего — вместе с забранными загрузками
+        return BookRepository(tx).create(book)
 
     # READ
     def list(
@@ -118,8 +159,9 @@ class BookService:
         year: Optional[int],
         limit: int,
         offset: int,
+        cursor: Optional[Cursor] = None,
     ):
-        return self.repo.list(q=q, genre=genre, author=author, year=year, limit=limit, offset=offset)
+        return self.repo.list(q=q, genre=genre, author=author, year=year, limit=limit, offset=offset, cursor=cursor)
 
     def get(self, book_id: uuid.UUID) -> Book:
         return self._ensure(book_id)
@@ -129,11 +171,14 @@ class BookService:
         book = self._ensure(book_id)
         for k, v in patch.model_dump(exclude_unset=True).items():
             setattr(book, k, v)
-        return self.repo.save(book)
+        book = self.repo.save(book)
+        search_index.upsert("book", str(book.id), book.title, book.description)
+        return book
 
     # SOFT DELETE
     def soft_delete(self, book_id: uuid.UUID) -> dict:
         book = self._ensure(book_id)
         book.deleted_at = datetime.utcnow()
         self.repo.save(book)
+        search_index.remove("book", str(book_id))
         return {"deleted": str(book_id)}
@@ -1,16 +1,59 @@
 from datetime import datetime, UTC
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models import Genre
-from app.core.db import engine
+from app.core.db import session_scope
+from app.core.fts import trigram_match, trigram_rank
+from app.core.pagination import Cursor, keyset
 from app.schemas import GenreCreate, GenreUpdate, GenrePublic
 
 
+def _select_all(
+    skip: int | None,
+    limit: int | None,
+    q: str | None,
+    type: str | None,
+    sort_by: str,
+    order: str,
+    cursor: Cursor | None = None,
+):
+    stmt = select(Genre).where(Genre.deleted_at == None)
+
+    if q:
+        stmt = stmt.where(trigram_match(q, Genre.name, Genre.description))
+
+    if type:
+        stmt = stmt.where(Genre.type == type)
+
+    allowed_sort_fields = {"name", "created_at", "updated_at", "type", "relevance"}
+    if sort_by not in allowed_sort_fields or (sort_by == "relevance" and not q):
+        sort_by = "created_at"
+
+    if sort_by == "relevance":
+        # релевантность всегда от лучшего совпадения к худшему
+        stmt = stmt.order_by(trigram_rank(q, Genre.name, Genre.description).desc())
+    elif sort_by == "created_at":
+        stmt = keyset(stmt, Genre, cursor, descending=order == "desc")
+    else:
+        sort_column = getattr(Genre, sort_by)
+        if order == "desc":
+            stmt = stmt.order_by(sort_column.desc())
+        else:
+            stmt = stmt.order_by(sort_column.asc())
+
+    if skip:
+        stmt = stmt.offset(skip)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
 class GenreRepository():
     def __init__(self):
         return
     
     def create(self, data: GenreCreate) -> GenrePublic:
-        with Session(engine) as session:
+        with session_scope() as session:
             genre = Genre(
                 name=data.name,
                 description=data.description,
@@ -23,7 +66,7 @@ class GenreRepository():
 
 
     def findById(self, id: str) -> GenrePublic | None:
-        with Session(engine) as session:
+        with session_scope(read_only=True) as session:
             stmt = select(Genre).where(Genre.id == id).where(Genre.deleted_at == None)
             result = session.exec(stmt).first()
             if not result:
@@ -38,38 +81,18 @@ class GenreRepository():
         type: str | None = None,
         sort_by: str = "created_at",
         order: str = "asc",
+        cursor: Cursor | None = None,
     ) -> list[GenrePublic]:
-      with Session(engine) as session:
-        stmt = select(Genre).where(Genre.deleted_at == None)
-
-        if q:
-            stmt = stmt.where(
-                (Genre.name.ilike(f"%{q}%")) | (Genre.description.ilike(f"%{q}%"))
-            )
-
-        if type:
-            stmt = stmt.where(Genre.type == type)
-
-        allowed_sort_fields = {"name", "created_at", "updated_at", "type"}
-        if sort_by not in allowed_sort_fields:
-            sort_by = "created_at"
-
-        sort_column = getattr(Genre, sort_by)
-        if order == "desc":
-            stmt = stmt.order_by(sort_column.desc())
-        else:
-            stmt = stmt.order_by(sort_column.asc())
-
-        if skip:
-            stmt = stmt.offset(skip)
-        if limit:
-            stmt = stmt.limit(limit)
-
-        results = session.exec(stmt).all()
+      with session_scope(read_only=True) as session:
+        results = session.exec(_select_all(skip, limit, q, type, sort_by, order, cursor)).all()
         return [GenrePublic.model_validate(result) for result in results]
 
+    def exportQuery(self, q: str | None = None, type: str | None = None):
+        """Тот же запрос, что у findAll (по дате создания), без limit/offset — для app.core.export."""
+        return _select_all(None, None, q, type, "created_at", "asc")
+
     def updateById(self, id: str, data: GenreUpdate) -> GenrePublic | None:
-        with Session(engine) as session:
+        with session_scope() as session:
             stmt = select(Genre).where(Genre.id == id).where(Genre.deleted_at == None)
             result = session.exec(stmt).first()
             if not result:
@@ -85,7 +108,7 @@ class GenreRepository():
             return GenrePublic.model_validate(result)
 
     def deleteById(self, id: str) -> GenrePublic | None:
-        with Session(engine) as session:
+        with session_scope() as session:
             stmt = select(Genre).where(Genre.id == id).where(Genre.deleted_at == None)
             result = session.exec(stmt).first()
             if not result:
@@ -96,3 +119,30 @@ class GenreRepository():
             session.commit()
             session.refresh(result)
             return GenrePublic.model_validate(result)
+
+
+class AsyncGenreRepository():
+    """Чтение жанров на AsyncSession запроса — для async def-маршрутов."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def findById(self, id: str) -> GenrePublic | None:
+        stmt = select(Genre).where(Genre.id == id).where(Genre.deleted_at.is_(None))
+        result = (await self.session.exec(stmt)).first()
+        if not result:
+            return None
+        return GenrePublic.model_validate(result)
+
+    async def findAll(
+        self,
+        skip: int | None = None,
+        limit: int | None = None,
+        q: str | None = None,
+        type: str | None = None,
+        sort_by: str = "created_at",
+        order: str = "asc",
+        cursor: Cursor | None = None,
+    ) -> list[GenrePublic]:
+        results = (await self.session.exec(_select_all(skip, limit, q, type, sort_by, order, cursor))).all()
+        return [GenrePublic.model_validate(result) for result in results]
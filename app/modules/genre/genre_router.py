@@ -1,30 +1,53 @@
-from fastapi import APIRouter, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
 from typing import Optional, List
 import uuid
 
+from app.api.deps import AsyncReadSessionDep, CursorDep, ExportFormatDep, LimitDep, get_unit_of_work
+from app.core.pagination import set_next_cursor
 from app.models import GenreType
 from app.schemas import GenrePublic, GenreCreate, GenreUpdate
 from app.modules.genre.genre_service import GenreService
 from app.modules.auth.auth_router import any_user_guard, admin_guard
 
-genre_router = APIRouter(prefix="/genres", tags=["Genres"])
+genre_router = APIRouter(prefix="/genres", tags=["Genres"], dependencies=[Depends(get_unit_of_work)])
 service = GenreService()
 
 @genre_router.get("/", response_model=List[GenrePublic])
-def get_genres(
+async def get_genres(
+    session: AsyncReadSessionDep,
+    response: Response,
+    cursor: CursorDep,
+    limit: LimitDep,
     skip: Optional[int] = Query(default=None, ge=0),
-    limit: Optional[int] = Query(default=None, ge=1),
     q: Optional[str] = Query(default=None),
     type: Optional[GenreType] = Query(default=None),
     sort_by: Optional[str] = Query(default="created_at"),
     order: Optional[str] = Query(default="asc", regex="^(asc|desc)$"),
     _=Depends(any_user_guard),
 ):
-    return service.get_all(skip=skip, limit=limit, q=q, type=type, sort_by=sort_by, order=order)
+    # курсор (created_at, id) — только для сортировки по дате создания
+    if cursor and sort_by != "created_at":
+        raise HTTPException(status_code=400, detail="cursor requires sort_by=created_at")
+    genres = await service.get_all_async(
+        session, skip=skip, limit=limit, q=q, type=type, sort_by=sort_by, order=order, cursor=cursor
+    )
+    if sort_by == "created_at":
+        set_next_cursor(response, genres, limit)
+    return genres
+
+@genre_router.get("/export")
+def export_genres(
+    fmt: ExportFormatDep = "ndjson",
+    q: Optional[str] = Query(default=None),
+    type: Optional[GenreType] = Query(default=None),
+    _=Depends(admin_guard),
+):
+    """Все жанры потоком (NDJSON или CSV), от старых к новым."""
+    return service.export(fmt, q=q, type=type)
 
 @genre_router.get("/{genre_id}", response_model=GenrePublic)
-def get_genre(genre_id: uuid.UUID, _=Depends(any_user_guard)):
-    return service.get_by_id(genre_id)
+async def get_genre(genre_id: uuid.UUID, session: AsyncReadSessionDep, _=Depends(any_user_guard)):
+    return await service.get_by_id_async(session, genre_id)
 
 
 @genre_router.post("/", response_model=GenrePublic)
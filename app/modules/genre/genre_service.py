@@ -1,8 +1,12 @@
 import uuid
 from typing import Optional, List
 
+from app.core.export import ExportFormat, stream_export
+from app.core.pagination import Cursor
 from app.models import GenreType
-from app.modules.genre.genre_repository import GenreRepository
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.modules.genre.genre_repository import AsyncGenreRepository, GenreRepository
 from app.schemas import GenreCreate, GenreUpdate, GenrePublic
 
 
@@ -18,12 +22,34 @@ class GenreService:
         type: Optional[GenreType] = None,
         sort_by: str = "created_at",
         order: str = "asc",
+        cursor: Optional[Cursor] = None,
     ) -> List[GenrePublic]:
-        return self.repo.findAll(skip=skip, limit=limit, q=q, type=type, sort_by=sort_by, order=order)
+        return self.repo.findAll(skip=skip, limit=limit, q=q, type=type, sort_by=sort_by, order=order, cursor=cursor)
     
+    def export(self, fmt: ExportFormat, q: Optional[str] = None, type: Optional[GenreType] = None):
+        return stream_export(self.repo.exportQuery(q=q, type=type), GenrePublic, fmt, "genres")
+
     def get_by_id(self, genre_id: uuid.UUID) -> Optional[GenrePublic]:
         return self.repo.findById(str(genre_id))
 
+    async def get_all_async(
+        self,
+        session: AsyncSession,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+        q: Optional[str] = None,
+        type: Optional[GenreType] = None,
+        sort_by: str = "created_at",
+        order: str = "asc",
+        cursor: Optional[Cursor] = None,
+    ) -> List[GenrePublic]:
+        return await AsyncGenreRepository(session).findAll(
+            skip=skip, limit=limit, q=q, type=type, sort_by=sort_by, order=order, cursor=cursor
+        )
+
+    async def get_by_id_async(self, session: AsyncSession, genre_id: uuid.UUID) -> Optional[GenrePublic]:
+        return await AsyncGenreRepository(session).findById(str(genre_id))
+
     def create(self, data: GenreCreate) -> GenrePublic:
         return self.repo.create(data)
 
@@ -0,0 +1,44 @@
+from typing import Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.db import session_scope
+from app.models import MediaBlob
+
+
+class MediaBlobRepository:
+    def get(self, bucket: str, sha256: str) -> Optional[MediaBlob]:
+        with session_scope(read_only=True) as session:
+            return session.get(MediaBlob, (bucket, sha256))
+
+    def add(self, blob: MediaBlob) -> MediaBlob:
+        """
+        INSERT ... ON CONFLICT DO NOTHING: если тот же файл параллельно загрузил
+        другой запрос, возвращается уже записанная строка.
+        """
+        with session_scope() as session:
+            stmt = (
+                insert(MediaBlob)
+                .values(**blob.model_dump())
+                .on_conflict_do_nothing(index_elements=["bucket", "sha256"])
+            )
+            session.execute(stmt)
+            session.commit()
+            return session.get(MediaBlob, (blob.bucket, blob.sha256))
+
+    def delete(self, bucket: str, sha256: str) -> None:
+        with session_scope() as session:
+            session.execute(delete(MediaBlob).where(MediaBlob.bucket == bucket, MediaBlob.sha256 == sha256))
+            session.commit()
+
+    def set_rendition(self, bucket: str, object_key: str, kind: str, hls_key: str) -> bool:
+        """Запоминает HLS исходника (первый опубликованный); для ключей не из индекса — ничего не делает."""
+        with session_scope() as session:
+            result = session.execute(
+                update(MediaBlob)
+                .where(MediaBlob.bucket == bucket, MediaBlob.object_key == object_key, MediaBlob.hls_key.is_(None))
+                .values(hls_kind=kind, hls_key=hls_key)
+            )
+            session.commit()
+            return result.rowcount > 0
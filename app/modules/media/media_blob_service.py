@@ -0,0 +1,121 @@
+"""
+Дедупликация загрузок по содержимому. UploadFile к моменту вызова сервиса уже
+лежит у Starlette во временном файле, поэтому sha256 считается по нему потоком
+(кусками, без чтения в память) до отправки в MinIO: если такое содержимое уже
+есть, байты никуда не передаются, а если из него уже делали HLS — не нужен и
+transcode. Новые объекты пишутся под ключом из хеша: media/ab/abcdef….ext.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.logger import logger
+from app.core.s3 import AsyncMinioService, MinioService, StoredObject, get_minio_service
+from app.models import MediaBlob
+from app.modules.media.media_blob_repository import MediaBlobRepository
+
+HASH_CHUNK = 1024 * 1024
+
+
+def rendition_prefix(root: str, source_key: str) -> str:
+    """
+    Каталог HLS из исходника source_key: root + хеш ключа. Такой HLS становится общим
+    (record_rendition), поэтому новый исходник того же трека/видео кодируется в новый
+    каталог, а не поверх; повтор той же задачи пишет в свой же.
+    """
+    return f"{root}{hashlib.sha256(source_key.encode()).hexdigest()[:16]}/"
+
+
+def sha256_stream(stream: BinaryIO) -> tuple[str, int]:
+    """sha256 и размер потока; поток возвращается в начало."""
+    stream.seek(0)
+    digest, size = hashlib.sha256(), 0
+    while chunk := stream.read(HASH_CHUNK):
+        digest.update(chunk)
+        size += len(chunk)
+    stream.seek(0)
+    return digest.hexdigest(), size
+
+
+@dataclass
+class StoredBlob(StoredObject):
+    """StoredObject + откуда он: reused — объект уже был в MinIO, загрузки не было."""
+    reused: bool = False
+    hls_kind: Optional[str] = None
+    hls_key: Optional[str] = None
+
+    def rendition(self, kind: str) -> Optional[str]:
+        """Ключ готового мастер-плейлиста этого исходника для kind (video | music)."""
+        return self.hls_key if self.hls_kind == kind else None
+
+
+class MediaBlobService:
+    def __init__(self, minio: Optional[MinioService] = None):
+        self.minio = minio or get_minio_service()
+        self.storage = AsyncMinioService(self.minio)
+        self.repo = MediaBlobRepository()
+
+    @staticmethod
+    def object_key(sha256: str, ext: str) -> str:
+        return f"media/{sha256[:2]}/{sha256}{ext}"
+
+    def _stored(self, row: MediaBlob, reused: bool) -> StoredBlob:
+        return StoredBlob(
+            key=row.object_key,
+            url=self.minio.public_url(row.object_key, row.bucket),
+            size=row.size,
+            sha256=row.sha256,
+            reused=reused,
+            hls_kind=row.hls_kind,
+            hls_key=row.hls_key,
+        )
+
+    def _lookup(self, stream: BinaryIO, bucket: str) -> tuple[str, int, Optional[MediaBlob]]:
+        sha256, size = sha256_stream(stream)
+        row = self.repo.get(bucket, sha256)
+        if row is None:
+            return sha256, size, None
+        if not self.minio.object_exists(row.object_key, bucket):
+            # объект удалили мимо индекса — строка больше ни на что не указывает
+            logger.warning("media blob %s: s3://%s/%s is gone, uploading again", sha256, bucket, row.object_key)
+            self.repo.delete(bucket, sha256)
+            return sha256, size, None
+        logger.info("media blob %s: reusing s3://%s/%s (%d bytes)", sha256, bucket, row.object_key, size)
+        return sha256, size, row
+
+    def _record(self, stored: StoredObject, bucket: str, content_type: Optional[str]) -> StoredBlob:
+        row = self.repo.add(
+            MediaBlob(
+                bucket=bucket,
+                sha256=stored.sha256,
+                object_key=stored.key,
+                size=stored.size,
+                content_type=content_type,
+            )
+        )
+        return self._stored(row, reused=False)
+
+    def store(self, stream: BinaryIO, bucket: str, ext: str, content_type: Optional[str] = None) -> StoredBlob:
+        """Кладёт поток в MinIO, если такого содержимого там ещё нет."""
+        sha256, _, row = self._lookup(stream, bucket)
+        if row is not None:
+            return self._stored(row, reused=True)
+        stored = self.minio.put_stream(self.object_key(sha256, ext), stream, bucket, content_type)
+        return self._record(stored, bucket, content_type)
+
+    async def store_async(
+        self, stream: BinaryIO, bucket: str, ext: str, content_type: Optional[str] = None
+    ) -> StoredBlob:
+        """То же для async-маршрутов: хеш и БД — в threadpool, загрузка — через AsyncMinioService."""
+        sha256, _, row = await run_in_threadpool(self._lookup, stream, bucket)
+        if row is not None:
+            return self._stored(row, reused=True)
+        stored = await self.storage.put_stream(self.object_key(sha256, ext), stream, bucket, content_type)
+        return await run_in_threadpool(self._record, stored, bucket, content_type)
+
+    def record_rendition(self, bucket: str, source_key: str, kind: str, hls_key: str) -> None:
+        """Вызывается transcode-задачей после публикации HLS: следующий такой же исходник его переиспользует."""
+        if self.repo.set_rendition(bucket, source_key, kind, hls_key):
+            logger.info("media blob s3://%s/%s: %s HLS at %s", bucket, source_key, kind, hls_key)
@@ -1,13 +1,34 @@
 from datetime import UTC, datetime
 import uuid
 from app.models import Music
-from app.core.db import engine
-from sqlmodel import Session, select
+from app.core.db import session_scope
+from app.core.fts import text_match, text_rank
+from app.core.pagination import Cursor, keyset
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.schemas import CreateMusic, MusicPublic, UpdateMusic
 
+
+def _select_all(skip: int | None, limit: int | None, q: str | None, playlist_id: uuid.UUID | None, cursor: Cursor | None = None):
+    stmt = select(Music).where(Music.deleted_at == None)
+    if playlist_id:
+        stmt = stmt.where(Music.playlist_id == playlist_id)
+
+    if q:
+        stmt = stmt.where(text_match(Music, q, Music.title, Music.description))
+        stmt = stmt.order_by(text_rank(Music, q, Music.title, Music.description).desc())
+    stmt = keyset(stmt, Music, cursor)
+
+    if skip:
+        stmt = stmt.offset(skip)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
 class MusicRepository():
   def create(self, data: CreateMusic) -> MusicPublic:
-    with Session(engine) as session:
+    with session_scope() as session:
         music = Music(**data.model_dump())
         session.add(music)
         session.commit()
@@ -15,33 +36,24 @@ class MusicRepository():
         return MusicPublic.model_validate(music)
   
   def findById(self, id: str) -> MusicPublic | None:
-    with Session(engine) as session:
+    with session_scope(read_only=True) as session:
         stmt = select(Music).where(Music.id == id).where(Music.deleted_at == None)
         result = session.exec(stmt).first()
         if not result:
            return None 
         return MusicPublic.model_validate(result)
   
-  def findAll(self, skip: int | None = None, limit: int | None = None, q: str | None = None, playlist_id: uuid.UUID | None = None) -> list[MusicPublic]:
-    with Session(engine) as session:
-        stmt = select(Music).where(Music.deleted_at == None)
-        if playlist_id:
-            stmt = stmt.where(Music.playlist_id == playlist_id)
-            
-        if q:
-            stmt = stmt.where(
-                (Music.title.ilike(f"%{q}%")) | (Music.description.ilike(f"%{q}%"))
-            )
-
-        if skip:
-            stmt = stmt.offset(skip)
-        if limit:
-            stmt = stmt.limit(limit)
-        results = session.exec(stmt).all()
+  def findAll(self, skip: int | None = None, limit: int | None = None, q: str | None = None, playlist_id: uuid.UUID | None = None, cursor: Cursor | None = None) -> list[MusicPublic]:
+    with session_scope(read_only=True) as session:
+        results = session.exec(_select_all(skip, limit, q, playlist_id, cursor)).all()
         return [MusicPublic.model_validate(result) for result in results]
+
+  def exportQuery(self, q: str | None = None, playlist_id: uuid.UUID | None = None):
+    """Тот же запрос, что у findAll, без limit/offset — для app.core.export."""
+    return _select_all(None, None, q, playlist_id)
     
   def updateById(self, id: str, data: UpdateMusic) -> MusicPublic | None:
-    with Session(engine) as session:
+    with session_scope() as session:
         stmt = select(Music).where(Music.id == id)
         result = session.exec(stmt).first()
         if not result:
@@ -57,7 +69,7 @@ class MusicRepository():
         return MusicPublic.model_validate(result)
     
   def deleteById(self, id: str) -> MusicPublic | None:
-    with Session(engine) as session:
+    with session_scope() as session:
         stmt = select(Music).where(Music.id == id)
         result = session.exec(stmt).first()
         if not result:
@@ -67,3 +79,43 @@ class MusicRepository():
         session.commit()
         session.refresh(result)
         return MusicPublic.model_validate(result)
+
+
+class AsyncMusicRepository():
+  """Те же запросы на AsyncSession запроса — для async def-маршрутов."""
+
+  def __init__(self, session: AsyncSession):
+    self.session = session
+
+  async def create(self, data: CreateMusic, commit: bool = True) -> MusicPublic:
+    """commit=False — только flush: строку зафиксирует следующий commit сессии (вместе с задачей transcode)."""
+    music = Music(**data.model_dump())
+    self.session.add(music)
+    if commit:
+      await self.session.commit()
+    else:
+      await self.session.flush()
+    await self.session.refresh(music)
+    return MusicPublic.model_validate(music)
+
+  async def findById(self, id: str) -> MusicPublic | None:
+    stmt = select(Music).where(Music.id == id).where(Music.deleted_at.is_(None))
+    result = (await self.session.exec(stmt)).first()
+    if not result:
+       return None
+    return MusicPublic.model_validate(result)
+
+  async def findAll(self, skip: int | None = None, limit: int | None = None, q: str | None = None, playlist_id: uuid.UUID | None = None, cursor: Cursor | None = None) -> list[MusicPublic]:
+    results = (await self.session.exec(_select_all(skip, limit, q, playlist_id, cursor))).all()
+    return [MusicPublic.model_validate(result) for result in results]
+
+  async def updateById(self, id: str, data: UpdateMusic) -> MusicPublic | None:
+    result = (await self.session.exec(select(Music).where(Music.id == id))).first()
+    if not result:
+        return None
+    for key, value in data.model_dump(exclude_unset=True).items():
+        setattr(result, key, value)
+    self.session.add(result)
+    await self.session.commit()
+    await self.session.refresh(result)
+    return MusicPublic.model_validate(result)
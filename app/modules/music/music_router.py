@@ -1,9 +1,11 @@
 import uuid
 from typing import Annotated
-from fastapi import APIRouter, BackgroundTasks, Form, Path, UploadFile, Depends
+from fastapi import APIRouter, Form, HTTPException, Path, Response, UploadFile, Depends
 from pydantic import Field
 
-from app.schemas import MusicPublic, UpdateMusic
+from app.api.deps import AsyncReadSessionDep, AsyncSessionDep, CursorDep, ExportFormatDep, LimitDep, get_unit_of_work
+from app.core.pagination import set_next_cursor
+from app.schemas import MusicFinalize, MusicPublic, UpdateMusic
 from app.modules.music.music_service import MusicService
 from app.modules.auth.auth_router import any_user_guard, admin_guard
 
@@ -12,24 +14,45 @@ service = MusicService()
 music_router = APIRouter(
     prefix="/musics",
     tags=["Music"],
+    dependencies=[Depends(get_unit_of_work)],
 )
 
+@music_router.get("/export")
+def export_musics(
+    fmt: ExportFormatDep = "ndjson",
+    q: str | None = None,
+    playlist_id: uuid.UUID | None = None,
+    _=Depends(admin_guard),
+):
+    """Все треки потоком (NDJSON или CSV) — вместо листания страниц до конца."""
+    return service.export(fmt, q=q, playlist_id=playlist_id)
+
 @music_router.get("/{id}", response_model=MusicPublic | None)
-def get_music_by_id(
+async def get_music_by_id(
     id: Annotated[str, Path(description="The id of music")],
+    session: AsyncReadSessionDep,
     _=Depends(any_user_guard),
 ):
-    return service.findById(id)
+    return await service.findByIdAsync(session, id)
 
 @music_router.get("/", response_model=list[MusicPublic])
-def get_musics(
+async def get_musics(
+    session: AsyncReadSessionDep,
+    response: Response,
+    cursor: CursorDep,
+    limit: LimitDep,
     skip: int | None = None,
-    limit: int | None = None,
     q: str | None = None,
     playlist_id: uuid.UUID | None = None,
     _=Depends(any_user_guard),
 ):
-    return service.findAll(skip=skip, limit=limit, q=q, playlist_id=playlist_id)
+    # с q порядок — по релевантности, курсор (created_at, id) к нему не подходит
+    if cursor and q:
+        raise HTTPException(status_code=400, detail="cursor cannot be combined with q")
+    musics = await service.findAllAsync(session, skip=skip, limit=limit, q=q, playlist_id=playlist_id, cursor=cursor)
+    if not q:
+        set_next_cursor(response, musics, limit)
+    return musics
 
 @music_router.post("/", response_model=MusicPublic)
 async def create_music(
@@ -50,20 +73,28 @@ async def create_music(
     ],
     preview_img: UploadFile,
     music: UploadFile,
-    background_tasks: BackgroundTasks,
+    session: AsyncSessionDep,
     genre_id: Annotated[str | None, Form(...)] = None,
     _=Depends(admin_guard),
 ):
     return await service.create(
+        session,
         playlist_id=str(playlist_id),
         title=title,
         description=description,
         genre_id=str(genre_id) if genre_id else None,
         preview_img=preview_img,
         music=music,
-        background_tasks=background_tasks
     )
 
+@music_router.post("/finalize", response_model=MusicPublic)
+def finalize_music(
+    data: MusicFinalize,
+    _=Depends(admin_guard),
+):
+    """Создать трек из файлов, загруженных напрямую в хранилище (POST /uploads/presign)."""
+    return service.finalize(data)
+
 @music_router.delete("/{id}", response_model=MusicPublic)
 def delete_music(
     id: Annotated[uuid.UUID, Path(description="The id of music")],
@@ -82,7 +113,7 @@ def update_music(
 @music_router.patch("/{id}/media", response_model=MusicPublic)
 async def update_music_media(
     id: Annotated[uuid.UUID, Path(description="The id of music")],
-    background_tasks: BackgroundTasks,
+    session: AsyncSessionDep,
     playlist_id: Annotated[uuid.UUID | None, Form()] = None,
     title: Annotated[str | None, Form()] = None,
     description: Annotated[str | None, Form()] = None,
@@ -92,6 +123,7 @@ async def update_music_media(
     _=Depends(admin_guard),
 ):
     return await service.update_media(
+        session,
         music_id=str(id),
         playlist_id=playlist_id,
         title=title,
@@ -99,7 +131,6 @@ async def update_music_media(
         genre_id=genre_id,
         preview_img=preview_img,
         music=music,
-        background_tasks=background_tasks,
     )
 
 
@@ -5,118 +5,135 @@ import uuid
 from pathlib import Path
 import subprocess
 import shutil
-from fastapi import HTTPException, UploadFile, BackgroundTasks
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models import MusicStatus
 from app.core.logger import logger
+from app.modules.genre.genre_repository import AsyncGenreRepository
 from app.modules.genre.genre_service import GenreService
-from app.schemas import CreateMusic, UpdateMusic, MusicPublic
-from app.modules.music.music_repository import MusicRepository
+from app.schemas import CreateMusic, MusicFinalize, UpdateMusic, MusicPublic
+from app.modules.music.music_repository import AsyncMusicRepository, MusicRepository
+from app.modules.playlist.playlist_repository import AsyncPlaylistRepository
 from app.modules.playlist.playlist_service import PlaylistService
 from app.core.config import settings
-from app.core.s3 import MinioService
+from app.core.db import transaction
+from app.core.export import ExportFormat, stream_export
+from app.core.pagination import Cursor
+from app.core.s3 import AsyncMinioService, get_minio_service
 from app.modules.transcoder.transcoder_service import TranscoderService
+from app.modules.transcoder.transcode_job_repository import (
+    AsyncTranscodeJobRepository,
+    TranscodeItemGone,
+    TranscodeJobRepository,
+)
+from app.modules.media.media_blob_service import MediaBlobService, rendition_prefix
+from app.modules.search.search_index import search_index
+from app.modules.stream.stream_service import playlist_url
+from app.modules.uploads.upload_service import UploadService
 
 class MusicService():
     def __init__(self):
-        self.minio = MinioService()
+        self.minio = get_minio_service()
+        self.storage = AsyncMinioService(self.minio)
+        self.blobs = MediaBlobService(self.minio)
         self.repo = MusicRepository()
         self.transcoder = TranscoderService()
+        self.jobs = TranscodeJobRepository()
         self.playlistService = PlaylistService()
         self.genreService = GenreService()
 
-    def _upload_hls_dir(self, local_dir: Path, music_id: str) -> str:
-        prefix = f"music/hls/{music_id}/"
-        count = 0
-        for p in local_dir.glob("*"):
-            if p.is_file():
-                key = f"{prefix}{p.name}"
-                ctype, _ = mimetypes.guess_type(p.name)
-                self.minio.client.fput_object(
-                    bucket_name=settings.AWS_S3_BUCKET_NAME,
-                    object_name=key,
-                    file_path=str(p),
-                    content_type=ctype or "application/octet-stream",
-                )
-                count += 1
-        if count == 0:
-            raise RuntimeError("No HLS files to upload")
-        return f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/{prefix}index.m3u8"
-
-    def transcodeMusic(self, music_id, input_path: str):
+    def _transcode_and_publish(self, input_path: str, local_dir: Path, prefix: str) -> str | None:
+        """Кодирует в HLS, выгружая сегменты по ходу; возвращает ключ плейлиста или None, если ffmpeg упал."""
+        with self.minio.hls_publisher(local_dir, prefix, settings.AWS_S3_BUCKET_NAME) as publisher:
+            ok = self.transcoder.transcodeAudioToHls(input_path, str(local_dir / "index.m3u8"), on_segment=publisher.segment_ready)
+            if not ok:
+                return None
+            if publisher.finish().count == 0:
+                raise RuntimeError("No HLS files to upload")
+        return f"{prefix}index.m3u8"
+
+    def transcodeMusic(self, music_id, source_key: str):
+        """
+        Задача transcode-воркера: исходник из MinIO → HLS → MinIO, статус ACTIVE.
+        Ошибки пробрасываются — повтор или FAILED решает воркер. Здесь только
+        репозиторий, не updateById: HTTPException из дочернего процесса пула не распаковывается.
+        """
         tmp_dir = Path(tempfile.mkdtemp(prefix="hls_music_"))
-        output_path = tmp_dir / "index.m3u8"
         try:
-            status = self.transcoder.transcodeToHls(input_path, str(output_path))
-            if status:
-                master_url = self._upload_hls_dir(tmp_dir, music_id)
-                self.updateById(music_id, UpdateMusic(status=MusicStatus.ACTIVE, music_url=master_url))
-            else:
-                self.updateById(music_id, UpdateMusic(status=MusicStatus.FAILED))
+            input_path = tmp_dir / "source"
+            self.minio.client.fget_object(settings.AWS_S3_BUCKET_NAME, source_key, str(input_path))
+            prefix = rendition_prefix(f"music/hls/{music_id}/", source_key)
+            master_key = self._transcode_and_publish(str(input_path), tmp_dir / "hls", prefix)
+            if not master_key:
+                raise RuntimeError("ffmpeg failed")
+            self.blobs.record_rendition(settings.AWS_S3_BUCKET_NAME, source_key, "music", master_key)
+            master_url = self.minio.public_url(master_key, settings.AWS_S3_BUCKET_NAME)
+            if self.repo.findById(music_id) is None:
+                raise TranscodeItemGone(f"music {music_id} deleted")
+            music = self.repo.updateById(music_id, UpdateMusic(status=MusicStatus.ACTIVE, music_url=master_url))
+            if music is None:
+                raise TranscodeItemGone(f"music {music_id} deleted")
+            search_index.upsert("music", str(music.id), music.title, music.description)
         finally:
-            try:
-                Path(input_path).unlink(missing_ok=True)
-            except Exception:
-                pass
-            try:
-                shutil.rmtree(tmp_dir, ignore_errors=True)
-            except Exception:
-                pass
+            shutil.rmtree(tmp_dir, ignore_errors=True)
 
     async def create(
         self,
+        session: AsyncSession,
         playlist_id: str,
         title: str,
         description: str,
         preview_img: UploadFile,
         music: UploadFile,
-        background_tasks: BackgroundTasks,
         genre_id: str | None = None,
     ) -> MusicPublic:
         try:
-            playlist = self.playlistService.findById(playlist_id)
-            if not playlist:
+            repo = AsyncMusicRepository(session)
+            if not await AsyncPlaylistRepository(session).exists(playlist_id):
                 raise HTTPException(status_code=400, detail="Playlist not found")
 
             genre = None
             if genre_id:
-                genre = self.genreService.get_by_id(genre_id)
+                genre = await AsyncGenreRepository(session).findById(genre_id)
                 if not genre:
                     raise HTTPException(status_code=400, detail="Genre not found")
 
             self.validate_audio_file(music)
-            with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                image_tmp_path = tmp.name
-                tmp.write(await preview_img.read())
-
+            bucket = settings.AWS_S3_BUCKET_NAME
             mime_type, _ = mimetypes.guess_type(preview_img.filename)
             ext = mimetypes.guess_extension(mime_type) or ".jpg"
-            object_name = f"{uuid.uuid4()}{ext}"
-            image_key = self.minio.upload_file(object_name, image_tmp_path, settings.AWS_S3_BUCKET_NAME)
-
-            with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                music_tmp_path = tmp.name
-                tmp.write(await music.read())
+            image = await self.blobs.store_async(preview_img.file, bucket, ext, mime_type)
 
             mime_type, _ = mimetypes.guess_type(music.filename)
             ext = mimetypes.guess_extension(mime_type) or ".mp3"
-            object_name = f"{uuid.uuid4()}{ext}"
-            music_key = self.minio.upload_file(object_name, music_tmp_path, settings.AWS_S3_BUCKET_NAME)
+            source = await self.blobs.store_async(music.file, bucket, ext, mime_type)
 
-            duration = self.get_audio_duration(music_tmp_path)
+            duration = await run_in_threadpool(self._probe_duration, source.key)
 
-            music_obj = self.repo.create(
+            music_obj = await repo.create(
                 CreateMusic(
                     playlist_id=playlist_id,
                     title=title,
                     description=description,
                     duration=duration,
-                    music_url=music_key,
-                    preview_img=image_key,
+                    music_url=source.url,
+                    preview_img=image.url,
                     genre_id=genre_id if genre else None,
-                )
+                ),
+                commit=False,  # фиксируется вместе со статусом или задачей ниже
             )
 
-            background_tasks.add_task(self.transcodeMusic, music_obj.id, music_tmp_path)
+            hls_key = source.rendition("music")
+            if hls_key:
+                # этот трек уже кодировали — HLS общий, transcode не нужен
+                music_obj = await repo.updateById(
+                    str(music_obj.id),
+                    UpdateMusic(status=MusicStatus.ACTIVE, music_url=self.minio.public_url(hls_key, bucket)),
+                )
+            else:
+                await AsyncTranscodeJobRepository(session).enqueue("music", str(music_obj.id), source.key)
+            search_index.upsert("music", str(music_obj.id), music_obj.title, music_obj.description)
 
             return music_obj
         except HTTPException as e:
@@ -125,8 +142,47 @@ class MusicService():
             logger.error("error %s", e)
             raise HTTPException(status_code=500, detail="Internal server error")
 
+    def finalize(self, data: MusicFinalize) -> MusicPublic:
+        """Трек и обложка уже лежат в MinIO (загружены из браузера по /uploads/presign)."""
+        try:
+            if not self.playlistService.findById(str(data.playlist_id)):
+                raise HTTPException(status_code=400, detail="Playlist not found")
+            if data.genre_id and not self.genreService.get_by_id(str(data.genre_id)):
+                raise HTTPException(status_code=400, detail="Genre not found")
+
+            # всё, что может отклонить запрос, — до того, как загрузки забраны: иначе
+            # отклонённая обложка сожгла бы уже загруженный трек
+            uploads = UploadService()
+            music = uploads.prepare(data.upload_id, "music")
+            preview = uploads.prepare(data.preview_upload_id, "image", "preview_upload_id")
+            duration = self._probe_duration(music.object_key)
+            bucket = settings.AWS_S3_BUCKET_NAME
+
+            # строка, забранные загрузки и задача — одной транзакцией
+            with transaction(), uploads.claim((music, "upload_id"), (preview, "preview_upload_id")):
+                music_obj = self.repo.create(
+                    CreateMusic(
+                        playlist_id=data.playlist_id,
+                        title=data.title,
+                        description=data.description,
+                        duration=duration,
+                        music_url=self.minio.public_url(music.object_key, bucket),
+                        preview_img=self.minio.public_url(preview.object_key, bucket),
+                        genre_id=data.genre_id,
+                    )
+                )
+                self.jobs.enqueue("music", str(music_obj.id), music.object_key)
+            search_index.upsert("music", str(music_obj.id), music_obj.title, music_obj.description)
+            return music_obj
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error("error %s", e)
+            raise HTTPException(status_code=500, detail="Internal server error")
+
     async def update_media(
         self,
+        session: AsyncSession,
         *,
         music_id: str,
         playlist_id: uuid.UUID | None,
@@ -135,18 +191,13 @@ class MusicService():
         genre_id: uuid.UUID | None,
         preview_img: UploadFile | None,
         music: UploadFile | None,
-        background_tasks: BackgroundTasks,
     ) -> MusicPublic:
         try:
-            if playlist_id:
-                playlist = self.playlistService.findById(str(playlist_id))
-                if not playlist:
-                    raise HTTPException(status_code=400, detail="Playlist not found")
+            if playlist_id and not await AsyncPlaylistRepository(session).exists(str(playlist_id)):
+                raise HTTPException(status_code=400, detail="Playlist not found")
 
-            if genre_id:
-                genre = self.genreService.get_by_id(str(genre_id))
-                if not genre:
-                    raise HTTPException(status_code=400, detail="Genre not found")
+            if genre_id and not await AsyncGenreRepository(session).findById(str(genre_id)):
+                raise HTTPException(status_code=400, detail="Genre not found")
 
             update_data = UpdateMusic()
             if playlist_id:
@@ -159,33 +210,30 @@ class MusicService():
                 update_data.genre_id = genre_id
 
             if preview_img:
-                with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                    image_tmp_path = tmp.name
-                    tmp.write(await preview_img.read())
-
                 mime_type, _ = mimetypes.guess_type(preview_img.filename)
                 ext = mimetypes.guess_extension(mime_type) or ".jpg"
                 object_name = f"{uuid.uuid4()}{ext}"
-                image_key = self.minio.upload_file(object_name, image_tmp_path, settings.AWS_S3_BUCKET_NAME)
-                update_data.preview_img = image_key
+                stored = await self.storage.put_stream(object_name, preview_img.file, settings.AWS_S3_BUCKET_NAME, mime_type)
+                update_data.preview_img = stored.url
 
             if music:
                 self.validate_audio_file(music)
-                with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                    music_tmp_path = tmp.name
-                    tmp.write(await music.read())
-
                 mime_type, _ = mimetypes.guess_type(music.filename)
                 ext = mimetypes.guess_extension(mime_type) or ".mp3"
                 object_name = f"{uuid.uuid4()}{ext}"
-                music_key = self.minio.upload_file(object_name, music_tmp_path, settings.AWS_S3_BUCKET_NAME)
-                update_data.music_url = music_key
+                stored = await self.storage.put_stream(object_name, music.file, settings.AWS_S3_BUCKET_NAME, mime_type)
+                update_data.music_url = stored.url
 
-                duration = self.get_audio_duration(music_tmp_path)
-                update_data.duration = duration
-                background_tasks.add_task(self.transcodeMusic, music_id, music_tmp_path)
+                update_data.duration = await run_in_threadpool(self._probe_duration, object_name)
+                update_data.status = MusicStatus.PROCESSING
 
-            return self.updateById(music_id, update_data)
+            updated = await AsyncMusicRepository(session).updateById(music_id, update_data)
+            if not updated:
+                raise HTTPException(status_code=404, detail="Music not found")
+            search_index.upsert("music", str(updated.id), updated.title, updated.description)
+            if music:
+                await AsyncTranscodeJobRepository(session).enqueue("music", music_id, object_name)
+            return updated
         except HTTPException:
             raise
         except Exception as e:
@@ -204,14 +252,44 @@ class MusicService():
             logger.error("error %s", e)
             raise HTTPException(status_code=500)
 
-    def findAll(self, skip: int | None = None, limit: int | None = None, q: str | None = None, playlist_id: uuid.UUID | None = None) -> list[MusicPublic]:
+    def findAll(self, skip: int | None = None, limit: int | None = None, q: str | None = None, playlist_id: uuid.UUID | None = None, cursor: Cursor | None = None) -> list[MusicPublic]:
         try:
-            musics = self.repo.findAll(skip, limit, q, playlist_id)
+            musics = self.repo.findAll(skip, limit, q, playlist_id, cursor)
             return musics
         except Exception as e:
             logger.error("error %s", e)
             raise HTTPException(status_code=500)
 
+    def export(self, fmt: ExportFormat, q: str | None = None, playlist_id: uuid.UUID | None = None):
+        return stream_export(self.repo.exportQuery(q, playlist_id), MusicPublic, fmt, "musics")
+
+    async def findByIdAsync(self, session: AsyncSession, id: str) -> MusicPublic | None:
+        try:
+            music = await AsyncMusicRepository(session).findById(id)
+            if not music:
+                raise HTTPException(status_code=404, detail="Music not found")
+            return music
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error("error %s", e)
+            raise HTTPException(status_code=500)
+
+    async def findAllAsync(
+        self,
+        session: AsyncSession,
+        skip: int | None = None,
+        limit: int | None = None,
+        q: str | None = None,
+        playlist_id: uuid.UUID | None = None,
+        cursor: Cursor | None = None,
+    ) -> list[MusicPublic]:
+        try:
+            return await AsyncMusicRepository(session).findAll(skip, limit, q, playlist_id, cursor)
+        except Exception as e:
+            logger.error("error %s", e)
+            raise HTTPException(status_code=500)
+
     def updateById(self, id: str, data: UpdateMusic) -> MusicPublic:
         try:
             if data.playlist_id:
@@ -221,6 +299,7 @@ class MusicService():
             music = self.repo.updateById(id, data)
             if not music:
                 raise HTTPException(status_code=404, detail="Music not found")
+            search_index.upsert("music", str(music.id), music.title, music.description)
             return music
         except HTTPException:
             raise
@@ -233,6 +312,7 @@ class MusicService():
             music = self.repo.deleteById(id)
             if not music:
                 raise HTTPException(status_code=404, detail="Music not found")
+            search_index.remove("music", str(music.id))
             return music
         except HTTPException:
             raise
@@ -252,31 +332,26 @@ class MusicService():
         if not music:
             raise HTTPException(status_code=404, detail="Music not found")
 
-        def presign_if_exists(key: str) -> str | None:
-            try:
-                self.minio.client.stat_object(settings.AWS_S3_BUCKET_NAME, key)
-                return self.minio.presign_get(key, bucket=settings.AWS_S3_BUCKET_NAME, expires_seconds=3600)
-            except Exception:
-                return None
-
+        bucket = settings.AWS_S3_BUCKET_NAME
         links = {}
         if music.music_url:
             key = self._extract_key(music.music_url)
-            link = presign_if_exists(key)
-            if not link:
-                fallback_key = f"music/hls/{id}/index.m3u8"
-                link = presign_if_exists(fallback_key)
-                key = fallback_key
-            if not link:
+            if not key.endswith(".m3u8"):
+                # исходник ещё не перекодирован (или HLS уже есть, а запись не обновлена):
+                # оба ключа проверяются одним батчем через кеш HEAD (app.core.s3.head_cache)
+                fallback_key = f"{rendition_prefix(f'music/hls/{id}/', key)}index.m3u8"
+                found = self.minio.heads([key, fallback_key], bucket)
+                key = key if found[key] else fallback_key if found[fallback_key] else None
+            if key is None:
                 raise HTTPException(status_code=404, detail="Music file missing from storage")
+            # подпись локальная (без запросов в MinIO); сам m3u8 с подписями отдаёт /stream
+            link = self.minio.presign_get(key, bucket=bucket, expires_seconds=3600)
             if key.endswith(".m3u8"):
-                links["playlist"] = self.minio.presign_hls_playlist(key, bucket=settings.AWS_S3_BUCKET_NAME, expires_seconds=3600)
+                links["playlist_url"] = playlist_url(key)
             links["music_url"] = link
         if music.preview_img:
             key = self._extract_key(music.preview_img)
-            link = presign_if_exists(key)
-            if link:
-                links["preview_img"] = link
+            links["preview_img"] = self.minio.presign_get(key, bucket=bucket, expires_seconds=3600)
         return links
 
 
@@ -304,6 +379,10 @@ class MusicService():
                 detail=f"Unsupported file extension: .{ext}"
             )
         
+    def _probe_duration(self, object_name: str) -> int:
+        """Длительность уже загруженного трека: ffprobe читает его из MinIO по ссылке, без копии на диск."""
+        return self.get_audio_duration(self.minio.internal_url(object_name, settings.AWS_S3_BUCKET_NAME))
+
     def get_audio_duration(self, path: str) -> int:
         result = subprocess.run(
             ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", path],
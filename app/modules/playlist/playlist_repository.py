@@ -1,11 +1,28 @@
 from app.models import Playlist
-from app.core.db import engine
-from sqlmodel import Session, select
+from app.core.db import session_scope
+from app.core.fts import text_match, text_rank
+from app.core.pagination import Cursor, keyset
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.schemas import CreatePlaylist, PlaylistPublic, UpdatePlaylist
 
+
+def _select_all(skip: int | None, limit: int | None, q: str | None, cursor: Cursor | None = None):
+    stmt = select(Playlist).where(Playlist.deleted_at == None)
+    if q:
+        stmt = stmt.where(text_match(Playlist, q, Playlist.title, Playlist.description))
+        stmt = stmt.order_by(text_rank(Playlist, q, Playlist.title, Playlist.description).desc())
+    stmt = keyset(stmt, Playlist, cursor)
+    if skip:
+        stmt = stmt.offset(skip)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
 class PlaylistRepository():
   def create(self, data: CreatePlaylist) -> PlaylistPublic:
-    with Session(engine) as session:
+    with session_scope() as session:
         playlist = Playlist(
             title=data.title,
             description=data.description,
@@ -17,29 +34,24 @@ class PlaylistRepository():
         return PlaylistPublic.model_validate(playlist)
   
   def findById(self, id: str) -> PlaylistPublic | None:
-    with Session(engine) as session:
+    with session_scope(read_only=True) as session:
         stmt = select(Playlist).where(Playlist.id == id).where(Playlist.deleted_at == None)
         result = session.exec(stmt).first()
         if not result:
            return None 
         return PlaylistPublic.model_validate(result)
   
-  def findAll(self, skip: int | None = None, limit: int | None = None, q: str | None = None) -> list[PlaylistPublic]:
-    with Session(engine) as session:
-        stmt = select(Playlist).where(Playlist.deleted_at == None)
-        if q:
-            stmt = stmt.where(
-                (Playlist.title.ilike(f"%{q}%")) | (Playlist.description.ilike(f"%{q}%"))
-            )
-        if skip:
-            stmt = stmt.offset(skip)
-        if limit:
-            stmt = stmt.limit(limit)
-        results = session.exec(stmt).all()
+  def findAll(self, skip: int | None = None, limit: int | None = None, q: str | None = None, cursor: Cursor | None = None) -> list[PlaylistPublic]:
+    with session_scope(read_only=True) as session:
+        results = session.exec(_select_all(skip, limit, q, cursor)).all()
         return [PlaylistPublic.model_validate(result) for result in results]
+
+  def exportQuery(self, q: str | None = None):
+    """Тот же запрос, что у findAll, без limit/offset — для app.core.export."""
+    return _select_all(None, None, q)
     
   def updateById(self, id: str, data: UpdatePlaylist) -> PlaylistPublic | None:
-    with Session(engine) as session:
+    with session_scope() as session:
         stmt = select(Playlist).where(Playlist.id == id)
         result = session.exec(stmt).first()
         if not result:
@@ -55,7 +67,7 @@ class PlaylistRepository():
         return PlaylistPublic.model_validate(result)
     
   def deleteById(self, id: str) -> PlaylistPublic | None:
-    with Session(engine) as session:
+    with session_scope() as session:
         stmt = select(Playlist).where(Playlist.id == id)
         result = session.exec(stmt).first()
         if not result:
@@ -63,3 +75,14 @@ class PlaylistRepository():
         session.delete(result)
         session.commit()
         return PlaylistPublic.model_validate(result)
+
+
+class AsyncPlaylistRepository():
+  """Для async def-маршрутов: только проверка существования (PlaylistPublic тянет musics)."""
+
+  def __init__(self, session: AsyncSession):
+    self.session = session
+
+  async def exists(self, id: str) -> bool:
+    stmt = select(Playlist.id).where(Playlist.id == id).where(Playlist.deleted_at.is_(None))
+    return (await self.session.exec(stmt)).first() is not None
@@ -1,9 +1,11 @@
 import uuid
 from typing import Annotated
-from fastapi import APIRouter, Form, Path, UploadFile, Depends
+from fastapi import APIRouter, Form, HTTPException, Path, Response, UploadFile, Depends
 from pydantic import Field
 
 from app.schemas import PlaylistPublic, UpdatePlaylist
+from app.api.deps import CursorDep, ExportFormatDep, LimitDep, get_unit_of_work
+from app.core.pagination import set_next_cursor
 from app.modules.playlist.playlist_service import PlaylistService
 from app.modules.auth.auth_router import any_user_guard, admin_guard
 
@@ -12,8 +14,18 @@ service = PlaylistService()
 playlist_router = APIRouter(
     prefix="/playlists",
     tags=["Playlist"],
+    dependencies=[Depends(get_unit_of_work)],
 )
 
+@playlist_router.get("/export")
+def export_playlists(
+    fmt: ExportFormatDep = "ndjson",
+    q: str | None = None,
+    _=Depends(admin_guard),
+):
+    """Все плейлисты потоком (NDJSON или CSV), без вложенных треков."""
+    return service.export(fmt, q=q)
+
 @playlist_router.get("/{id}", response_model=PlaylistPublic | None)
 def get_playlist_by_id(
     id: Annotated[str, Path(description="The id of playlist")],
@@ -23,12 +35,19 @@ def get_playlist_by_id(
 
 @playlist_router.get("/", response_model=list[PlaylistPublic])
 def get_playlists(
+    response: Response,
+    cursor: CursorDep,
+    limit: LimitDep,
     skip: int | None = None,
-    limit: int | None = None,
     q: str | None = None,
     _=Depends(any_user_guard),
 ):
-    return service.findAll(skip=skip, limit=limit, q=q)
+    if cursor and q:
+        raise HTTPException(status_code=400, detail="cursor cannot be combined with q")
+    playlists = service.findAll(skip=skip, limit=limit, q=q, cursor=cursor)
+    if not q:
+        set_next_cursor(response, playlists, limit)
+    return playlists
 
 @playlist_router.post("/", response_model=PlaylistPublic)
 async def create_playlist(
@@ -1,30 +1,36 @@
 import mimetypes
 import os
-import tempfile
-import uuid
 from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
 from app.core.logger import logger
-from app.schemas import CreatePlaylist, UpdatePlaylist, PlaylistPublic
+from app.schemas import CreatePlaylist, UpdatePlaylist, PlaylistExport, PlaylistPublic
 from app.modules.playlist.playlist_repository import PlaylistRepository
 from app.core.config import settings
-from app.core.s3 import MinioService
+from app.core.export import ExportFormat, stream_export
+from app.core.pagination import Cursor
+from app.core.s3 import AsyncMinioService, get_minio_service
+from app.modules.media.media_blob_service import MediaBlobService
+from app.modules.search.search_index import search_index
 
 class PlaylistService():
     def __init__(self):
         self.repo = PlaylistRepository()
-        self.minio = MinioService()
+        self.minio = get_minio_service()
+        self.storage = AsyncMinioService(self.minio)
+        self.blobs = MediaBlobService(self.minio)
 
     async def create(self, title: str, description: str, preview_img: UploadFile) -> PlaylistPublic:
         try:
-            with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                image_tmp_path = tmp.name
-                tmp.write(await preview_img.read())
-
             image_ext = mimetypes.guess_extension(preview_img.content_type) or os.path.splitext(preview_img.filename)[1]
-            object_name = f"{uuid.uuid4()}{image_ext}"
-            image_key = self.minio.upload_file(object_name, image_tmp_path, settings.AWS_S3_BUCKET_NAME)
+            stored = await self.blobs.store_async(
+                preview_img.file, settings.AWS_S3_BUCKET_NAME, image_ext, preview_img.content_type
+            )
+            image_key = stored.url
 
-            return self.repo.create(CreatePlaylist(title=title, description=description, preview_img=image_key))
+            # PlaylistPublic тянет musics (ленивая связь) — запись на sync Session, но не в event loop
+            return await run_in_threadpool(
+                self.repo.create, CreatePlaylist(title=title, description=description, preview_img=image_key)
+            )
         except HTTPException as e:
             raise e
         except Exception as e:
@@ -43,14 +49,17 @@ class PlaylistService():
             logger.error("error %s", e)
             raise HTTPException(status_code=500)
 
-    def findAll(self, skip: int | None = None, limit: int | None = None, q: str | None = None) -> list[PlaylistPublic]:
+    def findAll(self, skip: int | None = None, limit: int | None = None, q: str | None = None, cursor: Cursor | None = None) -> list[PlaylistPublic]:
         try:
-            playlists = self.repo.findAll(skip, limit, q)
+            playlists = self.repo.findAll(skip, limit, q, cursor)
             return playlists
         except Exception as e:
             logger.error("error %s", e)
             raise HTTPException(status_code=500)
 
+    def export(self, fmt: ExportFormat, q: str | None = None):
+        return stream_export(self.repo.exportQuery(q), PlaylistExport, fmt, "playlists")
+
     def updateById(self, id: str, data: UpdatePlaylist) -> PlaylistPublic:
         try:
             playlist = self.repo.updateById(id, data)
@@ -68,6 +77,9 @@ class PlaylistService():
             playlist = self.repo.deleteById(id)
             if not playlist:
                 raise HTTPException(status_code=404, detail="Playlist not found")
+            # музыка удаляется каскадом (жёстко), без deleted_at — чистим индекс явно
+            for music in playlist.musics:
+                search_index.remove("music", str(music.id))
             return playlist
         except HTTPException:
             raise
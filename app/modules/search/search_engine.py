@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from typing import List, Optional, Protocol
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.fts import search_vector, ts_query, ts_rank
+from app.models import Book, Video, Music
+from app.modules.search.search_index import search_index
+from app.modules.search.search_schema import SearchResult, SearchType
+
+
+SEARCH_MODELS = {"book": Book, "video": Video, "music": Music}
+
+
+class SearchEngine(Protocol):
+    def search(self, query: str, type_filter: Optional[SearchType], limit: int) -> List[SearchResult]: ...
+
+
+class TfidfSearchEngine:
+    """In-process TF-IDF индекс (app/modules/search/search_index.py)."""
+
+    def search(self, query: str, type_filter: Optional[SearchType], limit: int) -> List[SearchResult]:
+        hits = search_index.search(query, type_filter, limit)
+        return [
+            SearchResult(id=h.id, type=h.type, title=h.title, description=h.description or None, score=h.score)
+            for h in hits
+        ]
+
+
+class PostgresSearchEngine:
+    """Полнотекстовый поиск Postgres: search_tsv @@ tsquery по GIN-индексу, ранжирование ts_rank_cd."""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def search(self, query: str, type_filter: Optional[SearchType], limit: int) -> List[SearchResult]:
+        tsq = ts_query(query)
+        results: list[SearchResult] = []
+        for type_, model in SEARCH_MODELS.items():
+            if type_filter not in (None, type_):
+                continue
+            rank = ts_rank(model, query).label("score")
+            stmt = (
+                select(model.id, model.title, model.description, rank)
+                .where(model.deleted_at.is_(None))
+                .where(search_vector(model).bool_op("@@")(tsq))
+                .order_by(rank.desc())
+                .limit(limit)
+            )
+            for row_id, title, description, score in self.session.exec(stmt):
+                results.append(
+                    SearchResult(id=str(row_id), type=type_, title=title, description=description or None, score=float(score))
+                )
+        results.sort(key=lambda r: r.score, reverse=True)
+        return results[:limit]
+
+
+def get_search_engine(session: Session) -> SearchEngine:
+    if settings.SEARCH_ENGINE == "postgres":
+        return PostgresSearchEngine(session)
+    return TfidfSearchEngine()
@@ -0,0 +1,415 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, UTC
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sqlmodel import Session, or_, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.logger import logger
+from app.models import Book, Video, Music
+from app.modules.search.search_schema import SearchType
+
+
+_MODELS = {"book": Book, "video": Video, "music": Music}
+
+# снимок — один файл: матрица и словарь меняются одним os.replace
+_SNAPSHOT_FILE = "index.npz"
+
+# перекрытие окна синхронизации: строки, закоммиченные чуть позже своего updated_at, не теряются
+_SYNC_OVERLAP = timedelta(seconds=5)
+
+
+@dataclass
+class IndexHit:
+    id: str
+    type: SearchType
+    title: str
+    description: str
+    score: float
+
+
+@dataclass
+class _Entry:
+    title: str
+    description: str
+    cols: np.ndarray     # индексы терминов (отсортированы)
+    counts: np.ndarray   # сырые частоты терминов
+
+
+@dataclass
+class TypeVectors:
+    ids: list[str]
+    titles: list[str]
+    descriptions: list[str]
+    vectors: sparse.csr_matrix   # L2-нормированные tf-idf строки, cos = скалярное произведение
+    positions: dict[str, int]
+
+
+@dataclass
+class _Snapshot:
+    keys: list[tuple[str, str]]
+    entries: list[_Entry]
+    types: np.ndarray
+    matrix: sparse.csr_matrix
+    idf: np.ndarray
+    norms: np.ndarray
+    by_type: dict[str, TypeVectors] = field(default_factory=dict)
+
+
+class SearchIndex:
+    """
+    Долгоживущий TF-IDF индекс по книгам, видео и музыке (один на процесс).
+
+    Документы хранятся как сырые частоты терминов по растущему словарю,
+    idf и нормы строк считаются лениво, поэтому upsert/remove ничего не
+    переобучают, а запрос = разбор строки + одно разреженное умножение.
+    Снимок (матрица + словарь) пишется на диск и подхватывается при старте,
+    расхождение с БД догоняется по created_at/updated_at/deleted_at.
+    """
+
+    def __init__(self, path: str, sync_seconds: int = 30):
+        self.path = Path(path)
+        self.sync_seconds = sync_seconds
+        # тот же анализатор, что был у TfidfVectorizer в SearchService
+        self._analyze = TfidfVectorizer(stop_words="english").build_analyzer()
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._vocab: dict[str, int] = {}
+        self._terms: list[str] = []     # термин по номеру столбца ("" — столбец свободен)
+        self._df: list[int] = []
+        self._free: list[int] = []      # столбцы терминов, у которых df упал до 0
+        # пока идёт полная пересборка — журнал upsert/remove, проигрывается поверх нового индекса
+        self._pending: Optional[list[tuple]] = None
+        self._docs: dict[tuple[str, str], _Entry] = {}
+        self._snap: Optional[_Snapshot] = None
+        self._synced_at: Optional[datetime] = None
+        self._last_check = 0.0
+        self._dirty = False
+        self._ready = False
+
+    # --- lifecycle ---
+    def warm_up(self) -> None:
+        """Load the on-disk snapshot (or build from DB) and catch up with recent changes."""
+        if self.load():
+            self.sync()
+        else:
+            self.sync(full=True)
+        self._ready = True
+        if self._dirty:
+            self.save()
+
+    def maybe_sync(self) -> None:
+        if not self._ready:
+            self.warm_up()
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.sync_seconds:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return  # другой поток уже синхронизирует
+        try:
+            self._last_check = now
+            self.sync()
+            if self._dirty:
+                self.save()
+        finally:
+            self._sync_lock.release()
+
+    def sync(self, full: bool = False) -> None:
+        """Pull rows changed since the last sync (or everything when full=True)."""
+        started = datetime.now(UTC)
+        since = None if full or self._synced_at is None else self._synced_at - _SYNC_OVERLAP
+        target = SearchIndex(str(self.path), self.sync_seconds) if since is None else self
+        if target is not self:
+            with self._lock:
+                self._pending = []
+        try:
+            self._pull(target, since)
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            if target is not self:
+                # изменения, пришедшие во время пересборки, не должны потеряться при подмене
+                for op, *args in self._pending:
+                    getattr(target, op)(*args)
+                self._pending = None
+                self._vocab, self._terms, self._df, self._free, self._docs = (
+                    target._vocab, target._terms, target._df, target._free, target._docs
+                )
+                self._snap = None
+                self._dirty = True
+            self._synced_at = started
+        logger.info("search index synced (%s): %d docs", "full" if since is None else "delta", len(self._docs))
+
+    @staticmethod
+    def _pull(target: "SearchIndex", since: Optional[datetime]) -> None:
+        with Session(engine) as session:
+            for type_, model in _MODELS.items():
+                stmt = select(model.id, model.title, model.description, model.deleted_at)
+                if since is None:
+                    stmt = stmt.where(model.deleted_at.is_(None))
+                else:
+                    stmt = stmt.where(or_(
+                        model.created_at >= since,
+                        model.updated_at >= since,
+                        model.deleted_at >= since,
+                    ))
+                for row_id, title, description, deleted_at in session.exec(stmt):
+                    if deleted_at is not None:
+                        target.remove(type_, str(row_id))
+                    else:
+                        target.upsert(type_, str(row_id), title, description)
+
+    # --- mutations ---
+    def upsert(self, type_: SearchType, id: str, title: str, description: Optional[str]) -> None:
+        description = description or ""
+        counts = Counter(self._analyze(f"{title}. {description}"))
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(("upsert", type_, id, title, description))
+            key = (type_, id)
+            self._drop(key)
+            cols = np.empty(len(counts), dtype=np.int32)
+            vals = np.empty(len(counts), dtype=np.float32)
+            for i, (term, count) in enumerate(counts.items()):
+                col = self._vocab.get(term)
+                if col is None:
+                    col = self._new_col(term)
+                self._df[col] += 1
+                cols[i] = col
+                vals[i] = count
+            order = np.argsort(cols)
+            self._docs[key] = _Entry(title=title, description=description, cols=cols[order], counts=vals[order])
+            self._touch()
+
+    def remove(self, type_: SearchType, id: str) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(("remove", type_, id))
+            if self._drop((type_, id)):
+                self._touch()
+
+    def _new_col(self, term: str) -> int:
+        if self._free:
+            col = self._free.pop()
+            self._terms[col] = term
+        else:
+            col = len(self._df)
+            self._terms.append(term)
+            self._df.append(0)
+        self._vocab[term] = col
+        return col
+
+    def _drop(self, key: tuple[str, str]) -> bool:
+        entry = self._docs.pop(key, None)
+        if entry is None:
+            return False
+        for col in entry.cols:
+            self._df[col] -= 1
+            if self._df[col] == 0:
+                # термина больше нет ни в одном документе — убираем из словаря, как sklearn при переобучении
+                del self._vocab[self._terms[col]]
+                self._terms[col] = ""
+                self._free.append(int(col))
+        return True
+
+    def _touch(self) -> None:
+        self._snap = None
+        self._dirty = True
+
+    # --- queries ---
+    def _snapshot(self) -> _Snapshot:
+        with self._lock:
+            if self._snap is None:
+                keys = list(self._docs)
+                entries = [self._docs[k] for k in keys]
+                matrix = self._counts_matrix(entries)
+                df = np.asarray(self._df, dtype=np.float64)
+                # smooth idf, как в sklearn: ln((1 + n) / (1 + df)) + 1
+                idf = np.log((1.0 + len(keys)) / (1.0 + df)) + 1.0
+                norms = np.sqrt(matrix.multiply(matrix) @ (idf ** 2))
+                norms[norms == 0] = 1.0
+                self._snap = _Snapshot(
+                    keys=keys,
+                    entries=entries,
+                    types=np.array([k[0] for k in keys], dtype=object),
+                    matrix=matrix,
+                    idf=idf,
+                    norms=norms,
+                )
+            return self._snap
+
+    def _counts_matrix(self, entries: list[_Entry]) -> sparse.csr_matrix:
+        indptr = np.zeros(len(entries) + 1, dtype=np.int64)
+        for i, e in enumerate(entries):
+            indptr[i + 1] = indptr[i] + len(e.cols)
+        indices = np.concatenate([e.cols for e in entries]) if entries else np.empty(0, dtype=np.int32)
+        data = np.concatenate([e.counts for e in entries]) if entries else np.empty(0, dtype=np.float32)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(entries), len(self._df)))
+
+    def search(self, query: str, type_filter: Optional[SearchType], limit: int = 10) -> list[IndexHit]:
+        self.maybe_sync()
+        with self._lock:
+            snap = self._snapshot()
+            terms = Counter(t for t in self._analyze(query) if t in self._vocab)
+            cols = {self._vocab[t]: c for t, c in terms.items()}
+        if not cols or snap.matrix.shape[0] == 0:
+            return []
+
+        q = np.zeros(snap.matrix.shape[1])
+        for col, count in cols.items():
+            q[col] = count * snap.idf[col]
+        q /= np.linalg.norm(q)
+
+        # cos(d, q) = sum_t tf(d,t)*idf(t) * q(t) / ||d||
+        scores = (snap.matrix @ (q * snap.idf)) / snap.norms
+        if type_filter:
+            scores[snap.types != type_filter] = 0.0
+        return self._top(snap, scores, limit)
+
+    def vectors(self, type_: SearchType) -> TypeVectors:
+        """Normalized tf-idf rows of one content type (cached until the next change)."""
+        snap = self._snapshot()
+        cached = snap.by_type.get(type_)
+        if cached is not None:
+            return cached
+        rows = np.flatnonzero(snap.types == type_)
+        scale = sparse.diags(1.0 / snap.norms[rows])
+        vectors = (scale @ snap.matrix[rows] @ sparse.diags(snap.idf)).tocsr()
+        ids = [snap.keys[i][1] for i in rows]
+        cached = TypeVectors(
+            ids=ids,
+            titles=[snap.entries[i].title for i in rows],
+            descriptions=[snap.entries[i].description for i in rows],
+            vectors=vectors,
+            positions={doc_id: i for i, doc_id in enumerate(ids)},
+        )
+        snap.by_type[type_] = cached
+        return cached
+
+    def similar(self, type_: SearchType, id: str, limit: int = 10) -> list[IndexHit]:
+        """Live nearest neighbours of one item: a single sparse row x matrix product."""
+        self.maybe_sync()
+        tv = self.vectors(type_)
+        pos = tv.positions.get(id)
+        if pos is None:
+            return []
+        scores = (tv.vectors @ tv.vectors[pos].T).toarray().ravel()
+        scores[pos] = 0.0  # exclude self
+        k = min(limit, scores.size)
+        if k <= 0:
+            return []
+        top_idx = np.argpartition(-scores, k - 1)[:k]
+        top_idx = top_idx[np.argsort(-scores[top_idx])]
+        return [
+            IndexHit(id=tv.ids[i], type=type_, title=tv.titles[i], description=tv.descriptions[i], score=float(scores[i]))
+            for i in top_idx
+            if scores[i] > 0
+        ]
+
+    def _top(self, snap: _Snapshot, scores: np.ndarray, limit: int) -> list[IndexHit]:
+        k = min(limit, scores.size)
+        if k <= 0:
+            return []
+        top_idx = np.argpartition(-scores, k - 1)[:k]
+        top_idx = top_idx[np.argsort(-scores[top_idx])]
+        hits: list[IndexHit] = []
+        for idx in top_idx:
+            if scores[idx] <= 0:
+                break
+            type_, doc_id = snap.keys[idx]
+            entry = snap.entries[idx]
+            hits.append(IndexHit(id=doc_id, type=type_, title=entry.title, description=entry.description, score=float(scores[idx])))
+        return hits
+
+    # --- persistence ---
+    def save(self) -> None:
+        with self._lock:
+            keys = list(self._docs)
+            entries = [self._docs[k] for k in keys]
+            matrix = self._counts_matrix(entries)
+            vocab = list(self._terms)
+            meta = {
+                "synced_at": self._synced_at.isoformat() if self._synced_at else None,
+                "vocab": vocab,
+                "keys": keys,
+                "titles": [e.title for e in entries],
+                "descriptions": [e.description for e in entries],
+            }
+            self._dirty = False
+
+        # каталог общий для всех воркеров: у каждого свой временный файл
+        self.path.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.path, prefix="index.", suffix=".tmp", delete=False) as tmp:
+            try:
+                np.savez(
+                    tmp,
+                    data=matrix.data,
+                    indices=matrix.indices,
+                    indptr=matrix.indptr,
+                    shape=np.array(matrix.shape),
+                    meta=np.array(json.dumps(meta, ensure_ascii=False)),
+                )
+            except BaseException:
+                tmp.close()
+                os.unlink(tmp.name)
+                raise
+        os.replace(tmp.name, self.path / _SNAPSHOT_FILE)
+
+    def load(self) -> bool:
+        try:
+            with np.load(self.path / _SNAPSHOT_FILE) as npz:
+                matrix = sparse.csr_matrix(
+                    (npz["data"], npz["indices"], npz["indptr"]), shape=tuple(npz["shape"])
+                )
+                meta = json.loads(str(npz["meta"]))
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning("search index snapshot unreadable, rebuilding: %s", e)
+            return False
+
+        if matrix.shape[0] != len(meta["keys"]) or matrix.shape[1] != len(meta["vocab"]):
+            logger.warning("search index snapshot is inconsistent, rebuilding")
+            return False
+
+        docs: dict[tuple[str, str], _Entry] = {}
+        for i, (type_, doc_id) in enumerate(meta["keys"]):
+            start, end = matrix.indptr[i], matrix.indptr[i + 1]
+            docs[(type_, doc_id)] = _Entry(
+                title=meta["titles"][i],
+                description=meta["descriptions"][i],
+                cols=matrix.indices[start:end].astype(np.int32),
+                counts=matrix.data[start:end].astype(np.float32),
+            )
+        df = np.bincount(matrix.indices, minlength=matrix.shape[1])
+
+        with self._lock:
+            self._df = df.tolist()
+            self._terms = [term if self._df[col] else "" for col, term in enumerate(meta["vocab"])]
+            self._vocab = {term: col for col, term in enumerate(self._terms) if term}
+            self._free = [col for col, count in enumerate(self._df) if count == 0]
+            self._docs = docs
+            self._synced_at = datetime.fromisoformat(meta["synced_at"]) if meta.get("synced_at") else None
+            self._snap = None
+            self._dirty = False
+        return True
+
+
+search_index = SearchIndex(settings.SEARCH_INDEX_DIR, settings.SEARCH_INDEX_SYNC_SECONDS)
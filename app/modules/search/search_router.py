@@ -1,8 +1,7 @@
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session
 
-from app.api.deps import SessionDep
+from app.api.deps import ReadSessionDep
 from app.modules.search.search_service import SearchService
 from app.modules.search.search_schema import SearchResult, SearchType
 from app.modules.auth.auth_router import any_user_guard
@@ -11,7 +10,7 @@ from app.modules.auth.auth_router import any_user_guard
 router = APIRouter(prefix="/search", tags=["Search"])
 
 
-def svc(session: Session = Depends(SessionDep)) -> SearchService:
+def svc(session: ReadSessionDep) -> SearchService:
     return SearchService(session)
 
 
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import defaultdict
+from typing import Iterator, Optional
+
+import numpy as np
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.logger import logger
+from app.modules.search.search_index import TypeVectors, search_index
+from app.modules.search.search_schema import SearchType
+from app.modules.search.search_similar_repository import SimilarRepository
+
+
+_TYPES: tuple[SearchType, ...] = ("book", "video", "music")
+_LOCK_KEY = 0x5EA5C1A1   # pg advisory lock: один пересчёт на все воркеры
+_CHUNK = 128             # строк за одно умножение X[chunk] @ X.T
+
+
+def _text_hash(title: str, description: str) -> str:
+    return hashlib.sha1(f"{title}\n{description}".encode("utf-8")).hexdigest()
+
+
+def _neighbours(tv: TypeVectors, pairs: list[tuple[int, float]]) -> list[dict]:
+    return [
+        {"id": tv.ids[pos], "title": tv.titles[pos], "description": tv.descriptions[pos] or None, "score": round(score, 6)}
+        for pos, score in pairs
+    ]
+
+
+def _nearest(
+    tv: TypeVectors,
+    positions: list[int],
+    k: int,
+    reverse: Optional[dict[int, list[tuple[int, float]]]] = None,
+) -> Iterator[tuple[int, list[tuple[int, float]]]]:
+    """
+    Top-k соседей для строк `positions`. Если передан `reverse`, туда же
+    складываются обратные пары (сосед -> (строка, score)) для подмешивания
+    изменившихся документов в чужие списки.
+    """
+    if not positions:
+        return
+    xt = tv.vectors.T.tocsr()
+    for start in range(0, len(positions), _CHUNK):
+        chunk = positions[start:start + _CHUNK]
+        block = (tv.vectors[chunk] @ xt).tocsr()
+        for row, pos in enumerate(chunk):
+            lo, hi = block.indptr[row], block.indptr[row + 1]
+            idx, scores = block.indices[lo:hi], block.data[lo:hi]
+            keep = (idx != pos) & (scores > 0)
+            idx, scores = idx[keep], scores[keep]
+            if reverse is not None:
+                for other, score in zip(idx.tolist(), scores.tolist()):
+                    reverse[other].append((pos, score))
+            if idx.size > k:
+                part = np.argpartition(-scores, k - 1)[:k]
+                idx, scores = idx[part], scores[part]
+            order = np.argsort(-scores)
+            yield pos, [(int(idx[i]), float(scores[i])) for i in order]
+
+
+def _refresh_type(repo: SimilarRepository, type_: SearchType, k: int, full: bool) -> int:
+    tv = search_index.vectors(type_)
+    stored = repo.list_for_type(type_)
+    hashes = [_text_hash(t, d) for t, d in zip(tv.titles, tv.descriptions)]
+
+    removed = [doc_id for doc_id in stored if doc_id not in tv.positions]
+    changed = [
+        pos for pos, doc_id in enumerate(tv.ids)
+        if full or doc_id not in stored or stored[doc_id].text_hash != hashes[pos]
+    ]
+    if not changed and not removed:
+        return 0
+
+    rows: dict[int, list[dict]] = {}
+    reverse: dict[int, list[tuple[int, float]]] = defaultdict(list)
+    collect_reverse = not full and len(stored) > 0
+    for pos, pairs in _nearest(tv, changed, k, reverse if collect_reverse else None):
+        rows[pos] = _neighbours(tv, pairs)
+
+    # остальные строки: выбрасываем ссылки на изменившиеся/удалённые документы
+    # и подмешиваем изменившиеся документы, если они попадают в top-K
+    stale = set(removed) | {tv.ids[pos] for pos in changed}
+    changed_set = set(changed)
+    recompute: list[int] = []
+    for doc_id, row in stored.items():
+        pos = tv.positions.get(doc_id)
+        if pos is None or pos in changed_set:
+            continue
+        kept = [n for n in row.neighbours if n["id"] not in stale]
+        if len(kept) < len(row.neighbours):
+            recompute.append(pos)  # кто-то выпал из top-K — нужен честный пересчёт строки
+            continue
+        candidates = reverse.get(pos)
+        if not candidates:
+            continue
+        merged = sorted(kept + _neighbours(tv, candidates), key=lambda n: n["score"], reverse=True)[:k]
+        if merged != row.neighbours:
+            rows[pos] = merged
+    for pos, pairs in _nearest(tv, recompute, k):
+        rows[pos] = _neighbours(tv, pairs)
+
+    repo.upsert_many(type_, [(tv.ids[pos], hashes[pos], neighbours) for pos, neighbours in rows.items()])
+    repo.delete_many(type_, removed)
+    return len(rows) + len(removed)
+
+
+def refresh_similar(full: bool = False) -> int:
+    """
+    Обновляет таблицу search_similar. По умолчанию пересчитываются только
+    строки, чей текст изменился (по text_hash), и строки, в чьи top-K эти
+    изменения попадают. Возвращает число записанных/удалённых строк.
+    """
+    search_index.maybe_sync()
+    k = settings.SEARCH_SIMILAR_TOP_K
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _LOCK_KEY}).scalar():
+            logger.info("similar refresh skipped: another worker is running it")
+            return 0
+        try:
+            written = 0
+            with Session(engine) as session:
+                repo = SimilarRepository(session)
+                for type_ in _TYPES:
+                    written += _refresh_type(repo, type_, k, full)
+            if written:
+                logger.info("similar refresh (%s): %d rows", "full" if full else "delta", written)
+            return written
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _LOCK_KEY})
+
+
+class SimilarRefresher:
+    """Фоновый поток, периодически вызывающий refresh_similar()."""
+
+    def __init__(self, interval_seconds: int):
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval_seconds <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="similar-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                refresh_similar()
+            except Exception as e:
+                logger.warning("similar refresh failed: %s", e)
+            self._stop.wait(self.interval_seconds)
+
+
+similar_refresher = SimilarRefresher(settings.SEARCH_SIMILAR_REFRESH_SECONDS)
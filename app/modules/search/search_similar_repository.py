@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from datetime import datetime, UTC
+from typing import Iterable, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, delete, select
+
+from app.models import SearchSimilar
+
+
+class SimilarRepository:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def get(self, item_type: str, item_id: str) -> Optional[SearchSimilar]:
+        return self.session.get(SearchSimilar, (item_type, item_id))
+
+    def list_for_type(self, item_type: str) -> dict[str, SearchSimilar]:
+        stmt = select(SearchSimilar).where(SearchSimilar.item_type == item_type)
+        return {row.item_id: row for row in self.session.exec(stmt).all()}
+
+    def upsert_many(self, item_type: str, rows: Iterable[tuple[str, str, list[dict]]], chunk: int = 500) -> None:
+        now = datetime.now(UTC)
+        values = [
+            {"item_type": item_type, "item_id": item_id, "text_hash": text_hash, "neighbours": neighbours, "updated_at": now}
+            for item_id, text_hash, neighbours in rows
+        ]
+        for start in range(0, len(values), chunk):
+            stmt = insert(SearchSimilar).values(values[start:start + chunk])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[SearchSimilar.item_type, SearchSimilar.item_id],
+                set_={
+                    "text_hash": stmt.excluded.text_hash,
+                    "neighbours": stmt.excluded.neighbours,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            self.session.exec(stmt)
+        self.session.commit()
+
+    def delete_many(self, item_type: str, item_ids: list[str]) -> None:
+        if not item_ids:
+            return
+        self.session.exec(
+            delete(SearchSimilar)
+            .where(SearchSimilar.item_type == item_type)
+            .where(SearchSimilar.item_id.in_(item_ids))
+        )
+        self.session.commit()
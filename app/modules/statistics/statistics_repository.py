@@ -1,53 +1,107 @@
-from datetime import date, datetime
+from datetime import date, datetime, time
 from typing import Optional
 import uuid
+from app.core.pagination import Cursor, keyset
 from app.models import Statistics
-from app.core.db import engine
-from sqlmodel import Session, select
+from sqlalchemy import DateTime, func, literal
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from .statistics_dto import StatisticsCreate, StatisticsPublic
 
+
+def _day_bound(day: date, at: time):
+    # statistics.created_at в БД — timestamp без зоны (миграция 004_stats), в нём UTC.
+    # Граница — такой же naive timestamp: тип колонки в модели (UTCDateTime) naive не
+    # принимает, а aware-значение сравнивалось бы через неявный cast по TimeZone сессии.
+    return literal(datetime.combine(day, at), DateTime())
+
+
+def _filtered(stmt, ad_id: Optional[uuid.UUID], start_date: Optional[date], end_date: Optional[date]):
+    if ad_id is not None:
+        stmt = stmt.where(Statistics.ad_id == ad_id)
+    if start_date is not None:
+        stmt = stmt.where(Statistics.created_at >= _day_bound(start_date, time.min))
+    if end_date is not None:
+        stmt = stmt.where(Statistics.created_at <= _day_bound(end_date, time.max))
+    return stmt
+
+
+def _select_all(
+    skip: int | None,
+    limit: int | None,
+    ad_id: Optional[uuid.UUID],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    cursor: Optional[Cursor] = None,
+):
+    stmt = _filtered(select(Statistics), ad_id, start_date, end_date)
+    stmt = keyset(stmt, Statistics, cursor, descending=False)
+    if skip:
+        stmt = stmt.offset(skip)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
 class StatisticsRepository():
-  def create(self, data: StatisticsCreate) -> StatisticsPublic:
-    with Session(engine) as session:
-        data = Statistics(**data.model_dump())
-        session.add(data)
-        session.commit()
-        session.refresh(data)
-        return StatisticsPublic.model_validate(data)
-  
-  def findById(self, id: str) -> StatisticsPublic | None:
-    with Session(engine) as session:
-        stmt = select(Statistics).where(Statistics.id == id)
-        result = session.exec(stmt).first()
-        if not result:
-           return None 
-        return StatisticsPublic.model_validate(result)
-  
-  def findAll(
+  """Async-репозиторий: сессия — из зависимости get_async_session (app.api.deps.AsyncSessionDep)."""
+
+  def __init__(self, session: AsyncSession):
+    self.session = session
+
+  async def create(self, data: StatisticsCreate) -> StatisticsPublic:
+    data = Statistics(**data.model_dump())
+    self.session.add(data)
+    await self.session.commit()
+    await self.session.refresh(data)
+    return StatisticsPublic.model_validate(data)
+
+  async def findById(self, id: str) -> StatisticsPublic | None:
+    stmt = select(Statistics).where(Statistics.id == id)
+    result = (await self.session.exec(stmt)).first()
+    if not result:
+       return None
+    return StatisticsPublic.model_validate(result)
+
+  async def findAll(
         self,
         skip: int | None = None,
         limit: int | None = None,
         ad_id: Optional[uuid.UUID] = None,
         start_date: Optional[date] = None,
-        end_date: Optional[date] = None
+        end_date: Optional[date] = None,
+        cursor: Optional[Cursor] = None,
     ) -> list[StatisticsPublic]:
-    with Session(engine) as session:
-        stmt = select(Statistics)
-        if ad_id is not None:
-            stmt = stmt.where(Statistics.ad_id == ad_id)
-        if start_date is not None:
-            start_dt = datetime.combine(start_date, datetime.min.time())
-            stmt = stmt.where(Statistics.created_at >= start_dt)
-        if end_date is not None:
-            end_dt = datetime.combine(end_date, datetime.max.time())
-            stmt = stmt.where(Statistics.created_at <= end_dt)
-
-        stmt = stmt.order_by(Statistics.created_at, Statistics.ad_id)
-
-        if skip:
-            stmt = stmt.offset(skip)
-        if limit:
-            stmt = stmt.limit(limit)
-
-        results = session.exec(stmt).all()
-        return [StatisticsPublic.model_validate(result) for result in results]
\ No newline at end of file
+    results = (await self.session.exec(_select_all(skip, limit, ad_id, start_date, end_date, cursor))).all()
+    return [StatisticsPublic.model_validate(result) for result in results]
+
+  async def aggregate(
+        self,
+        ad_id: Optional[uuid.UUID] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> tuple[int, int, int, list[tuple[date, int]]]:
+    """(просмотров, уникальных устройств, досмотренных, [(день UTC, просмотров)]) — считает Postgres."""
+    totals = _filtered(
+        select(
+            func.count(),
+            func.count(Statistics.device_id.distinct()),
+            func.count().filter(Statistics.watched_full),
+        ),
+        ad_id, start_date, end_date,
+    )
+    total_views, unique_devices, watched = (await self.session.exec(totals)).one()
+
+    # колонка naive (UTC) — дата берётся как есть, без перевода в TimeZone сессии
+    day = func.date(Statistics.created_at)
+    daily = _filtered(select(day, func.count()), ad_id, start_date, end_date).group_by(day).order_by(day)
+    return total_views, unique_devices, watched, [tuple(row) for row in (await self.session.exec(daily)).all()]
+
+  @staticmethod
+  def exportQuery(
+        ad_id: Optional[uuid.UUID] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ):
+    """Тот же запрос, что у findAll, без limit/offset — для app.core.export (у выгрузки своя сессия)."""
+    return _select_all(None, None, ad_id, start_date, end_date)
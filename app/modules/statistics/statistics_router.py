@@ -1,8 +1,10 @@
 from datetime import date
 from typing import Annotated, Optional
 import uuid
-from fastapi import APIRouter, Path, Query, Depends
+from fastapi import APIRouter, Path, Query, Depends, Response
 
+from app.api.deps import AsyncReadSessionDep, AsyncSessionDep, CursorDep, ExportFormatDep, LimitDep
+from app.core.pagination import set_next_cursor
 from .statistics_dto import StatisticsPublic, StatisticsCreate, AggregatedStatistics
 from app.modules.statistics.statistics_service import StatisticsService
 from app.modules.auth.auth_router import any_user_guard, admin_guard
@@ -14,24 +16,54 @@ statistics_router = APIRouter(
     tags=["Statistics"],
 )
 
+@statistics_router.get("/records", response_model=list[StatisticsPublic])
+async def get_statistics_records(
+    session: AsyncReadSessionDep,
+    response: Response,
+    cursor: CursorDep,
+    limit: LimitDep,
+    start_date: Optional[date] = Query(None, description="Start date, format YYYY-MM-DD"),
+    end_date: Optional[date] = Query(None, description="End date, format YYYY-MM-DD"),
+    ad_id: uuid.UUID = Query(None, description="ID of Ad"),
+    skip: int | None = None,
+    _=Depends(admin_guard),
+):
+    """Сырые записи просмотров от старых к новым; постранично — limit и курсор из X-Next-Cursor."""
+    records = await service.findAll(
+        session, skip=skip, limit=limit, ad_id=ad_id, start_date=start_date, end_date=end_date, cursor=cursor
+    )
+    set_next_cursor(response, records, limit)
+    return records
+
+@statistics_router.get("/export")
+def export_statistics(
+    fmt: ExportFormatDep = "ndjson",
+    start_date: Optional[date] = Query(None, description="Start date, format YYYY-MM-DD"),
+    end_date: Optional[date] = Query(None, description="End date, format YYYY-MM-DD"),
+    ad_id: uuid.UUID = Query(None, description="ID of Ad"),
+    _=Depends(admin_guard),
+):
+    """Все записи просмотров потоком (NDJSON или CSV), от старых к новым."""
+    return service.export(fmt, ad_id=ad_id, start_date=start_date, end_date=end_date)
+
 @statistics_router.get("/{id}", response_model=StatisticsPublic | None)
-def get_statistics_by_id(
+async def get_statistics_by_id(
     id: Annotated[str, Path(description="The id of statistics")],
+    session: AsyncReadSessionDep,
     _=Depends(admin_guard),
 ):
-    return service.findById(id)
+    return await service.findById(session, id)
 
 @statistics_router.get("/", response_model=AggregatedStatistics)
-def get_statisticss(
+async def get_statisticss(
+    session: AsyncReadSessionDep,
     start_date: Optional[date] = Query(None, description="Start date, format YYYY-MM-DD"),
     end_date: Optional[date] = Query(None, description="End date, format YYYY-MM-DD"),
     ad_id: uuid.UUID = Query(None, description="ID of Ad"),
-    skip: int | None = None,
-    limit: int | None = None,
     _=Depends(admin_guard),
 ):
-    return service.getAggregatedStatistics(skip=skip, limit=limit, start_date=start_date, ad_id=ad_id, end_date=end_date)
+    return await service.getAggregatedStatistics(session, start_date=start_date, ad_id=ad_id, end_date=end_date)
 
 @statistics_router.post("/", response_model=StatisticsPublic)
-async def create_statistics(data: StatisticsCreate, _=Depends(any_user_guard)):
-    return await service.create(data)
+async def create_statistics(data: StatisticsCreate, session: AsyncSessionDep, _=Depends(any_user_guard)):
+    return await service.create(session, data)
@@ -1,29 +1,30 @@
-from collections import defaultdict
 from datetime import date
 from typing import Optional
 import uuid
 from fastapi import HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.export import ExportFormat, stream_export
 from app.core.logger import logger
+from app.core.pagination import Cursor
 from .statistics_dto import  StatisticsPublic, StatisticsCreate, AggregatedStatistics
 from app.modules.statistics.statistics_repository import StatisticsRepository
 
 
 class StatisticsService():
-    def __init__(self):
-        self.repo = StatisticsRepository()
+    """Все методы async: репозиторий работает на AsyncSession запроса."""
 
-    async def create(self, data: StatisticsCreate) -> StatisticsPublic:
+    async def create(self, session: AsyncSession, data: StatisticsCreate) -> StatisticsPublic:
         try:
-            return self.repo.create(data)
+            return await StatisticsRepository(session).create(data)
         except HTTPException as e:
             raise e
         except Exception as e:
             logger.error("error %s", e)
             raise HTTPException(status_code=500, detail="Internal server error")
 
-    def findById(self, id: str) -> StatisticsPublic | None:
+    async def findById(self, session: AsyncSession, id: str) -> StatisticsPublic | None:
         try:
-            statistics = self.repo.findById(id)
+            statistics = await StatisticsRepository(session).findById(id)
             if not statistics:
                 raise HTTPException(status_code=404, detail="Statistics not found")
             return statistics
@@ -33,55 +34,58 @@ class StatisticsService():
             logger.error("error %s", e)
             raise HTTPException(status_code=500)
 
-    def findAll(
+    async def findAll(
         self,
+        session: AsyncSession,
         skip: Optional[int] = None,
         limit: Optional[int] = None,
         ad_id: Optional[uuid.UUID] = None,
         start_date: Optional[date] = None,
-        end_date: Optional[date] = None
+        end_date: Optional[date] = None,
+        cursor: Optional[Cursor] = None,
     ) -> list[StatisticsPublic]:
         try:
-            statisticss = self.repo.findAll(skip, limit, ad_id, start_date, end_date)
+            statisticss = await StatisticsRepository(session).findAll(skip, limit, ad_id, start_date, end_date, cursor)
             return statisticss
         except Exception as e:
             logger.error("error %s", e)
             raise HTTPException(status_code=500)
 
-    def getAggregatedStatistics(
+    def export(
             self,
-            skip: int | None = None,
-            limit: int | None = None,
+            fmt: ExportFormat,
+            ad_id: uuid.UUID | None = None,
+            start_date: date | None = None,
+            end_date: date | None = None,
+    ):
+        return stream_export(
+            StatisticsRepository.exportQuery(ad_id, start_date, end_date), StatisticsPublic, fmt, "statistics"
+        )
+
+    async def getAggregatedStatistics(
+            self,
+            session: AsyncSession,
             ad_id: uuid.UUID | None = None,
             start_date: date | None = None,
             end_date: date | None = None,
     ) -> AggregatedStatistics:
         try:
-            records = self.repo.findAll(
+            # агрегаты считает БД: записи просмотров в память не читаются
+            total_views, unique_devices, watched, daily = await StatisticsRepository(session).aggregate(
                 ad_id=ad_id,
                 start_date=start_date,
                 end_date=end_date
             )
 
-            unique_devices = len(set(r.device_id for r in records))
-
-            total_views = len(records)
             if total_views == 0:
                 watched_distribution = {"watched": 0, "not_watched": 0}
             else:
-                counts = defaultdict(int)
-                for r in records:
-                    key = "watched" if r.watched_full else "not_watched"
-                    counts[key] += 1
+                counts = {"watched": watched, "not_watched": total_views - watched}
                 watched_distribution = {
-                    k: round(v / total_views * 100, 2) for k, v in counts.items()
+                    k: round(v / total_views * 100, 2) for k, v in counts.items() if v
                 }
 
-            daily_views = defaultdict(int)
-            for r in records:
-                day = r.created_at.date()
-                daily_views[day] += 1
-            daily_views_list = [{"day": str(day), "views": count} for day, count in sorted(daily_views.items())]
+            daily_views_list = [{"day": str(day), "views": count} for day, count in daily]
 
             return {
                 "unique_devices": unique_devices,
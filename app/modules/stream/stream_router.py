@@ -0,0 +1,22 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Header, Path, Response
+
+from app.modules.stream.stream_service import PLAYLIST_MEDIA_TYPE, StreamService
+
+service = StreamService()
+
+stream_router = APIRouter()
+
+
+@stream_router.get("/{token}/{name:path}", response_class=Response)
+def get_playlist(
+    token: Annotated[str, Path(description="Media token from /play or /links")],
+    name: Annotated[str, Path(description="Playlist file, e.g. index.m3u8")],
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    text, etag, max_age = service.playlist(token, name)
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={max_age}"}
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=text, media_type=PLAYLIST_MEDIA_TYPE, headers=headers)
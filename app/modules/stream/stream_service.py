@@ -0,0 +1,51 @@
+import hashlib
+import posixpath
+from datetime import timedelta
+
+from fastapi import HTTPException
+from minio.error import S3Error
+
+from app.core.config import settings
+from app.core.s3 import get_minio_service
+from app.core.security import create_media_token, decode_media_token
+
+PLAYLIST_MEDIA_TYPE = "application/vnd.apple.mpegurl"
+
+
+def playlist_url(object_key: str) -> str:
+    """
+    Ссылка на плейлист через /stream: токен открывает каталог плейлиста, сам m3u8
+    подписывается при запросе плеера. Не ходит ни в MinIO, ни в БД.
+    """
+    prefix, name = posixpath.split(object_key)
+    token = create_media_token(f"{prefix}/", timedelta(seconds=settings.HLS_DELIVERY_TOKEN_SECONDS))
+    return f"{settings.PUBLIC_API_URL}{settings.API_V1_STR}/stream/{token}/{name}"
+
+
+class StreamService:
+    def __init__(self):
+        self.minio = get_minio_service()
+
+    def playlist(self, token: str, name: str) -> tuple[str, str, int]:
+        """
+        Плейлист name из каталога токена с подписанными сегментами: (текст, ETag, max-age).
+        max-age — не больше HLS_DELIVERY_MAX_AGE и не больше, чем осталось жить подписям.
+        """
+        prefix = decode_media_token(token)
+        if not name.endswith(".m3u8") or posixpath.normpath(name) != name or name.startswith(("/", "..")):
+            raise HTTPException(status_code=404, detail="Playlist not found")
+        try:
+            signed = self.minio.signed_hls_playlist(
+                f"{prefix}{name}",
+                bucket=settings.AWS_S3_BUCKET_NAME,
+                expires_seconds=3600,
+                keep_playlists=True,
+            )
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchBucket"):
+                raise HTTPException(status_code=404, detail="Playlist not found")
+            raise HTTPException(status_code=502, detail="Storage error")
+        # текст не меняется в пределах окна подписи (см. hls_playlist.rendered) — ETag стабилен
+        etag = '"' + hashlib.md5(signed.text.encode("utf-8")).hexdigest() + '"'
+        max_age = max(0, min(settings.HLS_DELIVERY_MAX_AGE, int(signed.seconds_left())))
+        return signed.text, etag, max_age
@@ -0,0 +1,159 @@
+import uuid
+from datetime import datetime, timedelta, UTC
+
+from sqlalchemy import and_, func, or_, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import session_scope
+from app.models import TranscodeJob, TranscodeJobStatus
+
+
+class TranscodeItemGone(Exception):
+    """Строку удалили, пока шло кодирование: задача завершается, повторять её незачем."""
+
+
+def _lease_until():
+    return func.now() + timedelta(seconds=settings.TRANSCODE_LEASE_SECONDS)
+
+
+def _new_job(kind: str, item_id: str, source_key: str) -> TranscodeJob:
+    return TranscodeJob(
+        kind=kind,
+        item_id=str(item_id),
+        source_key=source_key,
+        max_attempts=settings.TRANSCODE_MAX_ATTEMPTS,
+    )
+
+
+class TranscodeJobRepository:
+    def enqueue(self, kind: str, item_id: str, source_key: str) -> TranscodeJob:
+        with session_scope() as session:
+            job = _new_job(kind, item_id, source_key)
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            return job
+
+    def lease(self, owner: str, limit: int) -> list[TranscodeJob]:
+        """
+        Забирает до limit готовых задач: pending с наступившим run_after и running
+        с истёкшей арендой (воркер умер посреди работы). SKIP LOCKED — несколько
+        воркеров не получат одну и ту же задачу.
+        """
+        with session_scope() as session:
+            candidates = (
+                select(TranscodeJob.id)
+                .where(
+                    or_(
+                        and_(TranscodeJob.status == TranscodeJobStatus.PENDING, TranscodeJob.run_after <= func.now()),
+                        and_(
+                            TranscodeJob.status == TranscodeJobStatus.RUNNING,
+                            TranscodeJob.lease_expires_at < func.now(),
+                            TranscodeJob.attempts < TranscodeJob.max_attempts,
+                        ),
+                    )
+                )
+                .order_by(TranscodeJob.run_after)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            stmt = (
+                update(TranscodeJob)
+                .where(TranscodeJob.id.in_(candidates.scalar_subquery()))
+                .values(
+                    status=TranscodeJobStatus.RUNNING,
+                    lease_owner=owner,
+                    lease_expires_at=_lease_until(),
+                    attempts=TranscodeJob.attempts + 1,
+                    updated_at=func.now(),
+                )
+                .returning(TranscodeJob)
+            )
+            jobs = list(session.execute(stmt).scalars())
+            for job in jobs:
+                session.expunge(job)
+            session.commit()
+            return jobs
+
+    def heartbeat(self, owner: str, ids: list[uuid.UUID]) -> None:
+        if not ids:
+            return
+        with session_scope() as session:
+            session.execute(
+                update(TranscodeJob)
+                .where(TranscodeJob.id.in_(ids), TranscodeJob.lease_owner == owner)
+                .values(lease_expires_at=_lease_until(), updated_at=func.now())
+            )
+            session.commit()
+
+    def complete(self, id: uuid.UUID) -> None:
+        with session_scope() as session:
+            session.execute(
+                update(TranscodeJob)
+                .where(TranscodeJob.id == id)
+                .values(status=TranscodeJobStatus.DONE, lease_owner=None, lease_expires_at=None, last_error=None)
+            )
+            session.commit()
+
+    def fail(self, id: uuid.UUID, error: str) -> bool:
+        """Возвращает True, если задача запланирована на повтор (экспоненциальная задержка)."""
+        with session_scope() as session:
+            job = session.get(TranscodeJob, id)
+            if not job:
+                return False
+            job.last_error = error[-2000:]
+            job.lease_owner = None
+            job.lease_expires_at = None
+            retry = job.attempts < job.max_attempts
+            if retry:
+                delay = settings.TRANSCODE_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+                job.status = TranscodeJobStatus.PENDING
+                job.run_after = datetime.now(UTC) + timedelta(seconds=delay)
+            else:
+                job.status = TranscodeJobStatus.FAILED
+            session.add(job)
+            session.commit()
+            return retry
+
+    def fail_exhausted(self) -> list[TranscodeJob]:
+        """Задачи с истёкшей арендой, у которых кончились попытки (воркер падал на каждой)."""
+        with session_scope() as session:
+            stmt = (
+                update(TranscodeJob)
+                .where(
+                    TranscodeJob.status == TranscodeJobStatus.RUNNING,
+                    TranscodeJob.lease_expires_at < func.now(),
+                    TranscodeJob.attempts >= TranscodeJob.max_attempts,
+                )
+                .values(status=TranscodeJobStatus.FAILED, lease_owner=None, last_error="lease expired")
+                .returning(TranscodeJob)
+            )
+            jobs = list(session.execute(stmt).scalars())
+            for job in jobs:
+                session.expunge(job)
+            session.commit()
+            return jobs
+
+    def active_item_ids(self, kind: str) -> set[str]:
+        with session_scope(read_only=True) as session:
+            stmt = select(TranscodeJob.item_id).where(
+                TranscodeJob.kind == kind,
+                TranscodeJob.status.in_([TranscodeJobStatus.PENDING, TranscodeJobStatus.RUNNING]),
+            )
+            return set(session.exec(stmt).all())
+
+
+class AsyncTranscodeJobRepository:
+    """Постановка задач на AsyncSession запроса — для async def-маршрутов."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def enqueue(self, kind: str, item_id: str, source_key: str) -> TranscodeJob:
+        job = _new_job(kind, item_id, source_key)
+        self.session.add(job)
+        await self.session.commit()
+        await self.session.refresh(job)
+        return job
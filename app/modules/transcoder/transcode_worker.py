@@ -0,0 +1,201 @@
+"""
+Transcode-воркер: отдельный процесс (`python -m app.cli transcode-worker`), который
+забирает задачи из transcode_job и гоняет ffmpeg в пуле процессов, не занимая
+uvicorn. Задача арендуется на TRANSCODE_LEASE_SECONDS и продлевается heartbeat'ом;
+если воркер умер, аренда истекает и задачу подбирает другой (или этот же после рестарта).
+"""
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.logger import logger
+from app.models import Ad, AdStatus, Music, MusicStatus, TranscodeJob, Video, VideoStatus
+from app.modules.transcoder.transcode_job_repository import TranscodeItemGone, TranscodeJobRepository
+
+
+def _run_video(item_id: str, source_key: str) -> None:
+    from app.modules.videos.video_service import VideoService
+
+    with Session(engine) as session:
+        VideoService(session).transcode_job(item_id, source_key)
+
+
+def _run_music(item_id: str, source_key: str) -> None:
+    from app.modules.music.music_service import MusicService
+
+    MusicService().transcodeMusic(item_id, source_key)
+
+
+def _run_ad(item_id: str, source_key: str) -> None:
+    from app.modules.ads.ads_service import AdService
+
+    AdService().transcodeAd(item_id, source_key)
+
+
+def _object_key(url_or_key: str) -> str:
+    """Музыка и реклама хранят публичный URL исходника — достаём из него ключ объекта."""
+    marker = f"/{settings.AWS_S3_BUCKET_NAME}/"
+    if marker in url_or_key:
+        return url_or_key.split(marker, 1)[1]
+    return url_or_key.lstrip("/")
+
+
+@dataclass(frozen=True)
+class _Kind:
+    run: Callable[[str, str], None]
+    model: Any
+    processing: Any
+    active: Any
+    failed: Any
+    source: Callable[[Any], str]     # ключ исходника у строки, застрявшей в PROCESSING
+
+
+KINDS: dict[str, _Kind] = {
+    "video": _Kind(_run_video, Video, VideoStatus.PROCESSING, VideoStatus.ACTIVE, VideoStatus.FAILED, lambda row: row.video),
+    "music": _Kind(
+        _run_music, Music, MusicStatus.PROCESSING, MusicStatus.ACTIVE, MusicStatus.FAILED,
+        lambda row: _object_key(row.music_url),
+    ),
+    "ad": _Kind(_run_ad, Ad, AdStatus.PROCESSING, AdStatus.ACTIVE, AdStatus.FAILED, lambda row: _object_key(row.video_url)),
+}
+
+
+def run_job(kind: str, item_id: str, source_key: str) -> float:
+    """
+    Выполняется в дочернем процессе пула. Возвращает длительность в секундах.
+    Исключение возвращается в родителя через pickle, а не всякое переживает распаковку
+    (у HTTPException args пустые — пул ломается целиком, со всеми соседними задачами),
+    поэтому наружу уходит только RuntimeError с текстом ошибки. Удалённая за время
+    кодирования строка — не ошибка: задача завершается без повтора.
+    """
+    started = time.perf_counter()
+    try:
+        KINDS[kind].run(item_id, source_key)
+    except TranscodeItemGone as e:
+        logger.info("transcode %s %s: %s, nothing to publish", kind, item_id, e)
+    except Exception as e:
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+    return time.perf_counter() - started
+
+
+def _set_item_status(kind: str, item_id: str, status: Any) -> None:
+    model = KINDS[kind].model
+    with Session(engine) as session:
+        session.execute(update(model).where(model.id == item_id).values(status=status))
+        session.commit()
+
+
+def mark_item_failed(kind: str, item_id: str) -> None:
+    _set_item_status(kind, item_id, KINDS[kind].failed)
+
+
+class TranscodeWorker:
+    def __init__(self, processes: int | None = None):
+        self.processes = processes or settings.TRANSCODE_WORKERS or os.cpu_count() or 1
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.repo = TranscodeJobRepository()
+        self._stop = threading.Event()
+        self._running: dict[Future, TranscodeJob] = {}
+
+    def stop(self, *_args) -> None:
+        logger.info("transcode worker %s: stopping after %d running jobs", self.owner, len(self._running))
+        self._stop.set()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # spawn, а не fork: дочерние процессы не наследуют соединения пула SQLAlchemy и потоки
+        return ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+
+    def recover(self) -> int:
+        """
+        Строки, застрявшие в PROCESSING без живой задачи (их BackgroundTask пропал при
+        рестарте или они старше очереди), снова ставятся в очередь; если вместо исходника
+        там уже плейлист, HLS опубликован и строка просто переводится в ACTIVE.
+        Задачи, чья аренда истекла без попыток в запасе, закрываются как FAILED.
+        """
+        for job in self.repo.fail_exhausted():
+            logger.warning("transcode job %s (%s %s) failed: lease expired", job.id, job.kind, job.item_id)
+            mark_item_failed(job.kind, job.item_id)
+
+        enqueued = 0
+        for kind, spec in KINDS.items():
+            active = self.repo.active_item_ids(kind)
+            with Session(engine) as session:
+                stmt = select(spec.model).where(spec.model.status == spec.processing, spec.model.deleted_at.is_(None))
+                rows = session.exec(stmt).all()
+            for row in rows:
+                if str(row.id) in active:
+                    continue
+                source_key = spec.source(row)
+                if source_key.endswith(".m3u8"):
+                    _set_item_status(kind, str(row.id), spec.active)
+                    continue
+                self.repo.enqueue(kind, str(row.id), source_key)
+                enqueued += 1
+        if enqueued:
+            logger.info("transcode worker %s: re-enqueued %d orphaned PROCESSING rows", self.owner, enqueued)
+        return enqueued
+
+    def _finish(self, job: TranscodeJob, future: Future) -> None:
+        try:
+            seconds = future.result()
+        except Exception as e:
+            retry = self.repo.fail(job.id, repr(e))
+            logger.error(
+                "transcode job %s (%s %s) attempt %d failed: %s%s",
+                job.id, job.kind, job.item_id, job.attempts, e, ", will retry" if retry else "",
+            )
+            if not retry:
+                mark_item_failed(job.kind, job.item_id)
+            return
+        self.repo.complete(job.id)
+        logger.info("transcode job %s (%s %s) done in %.1fs", job.id, job.kind, job.item_id, seconds)
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info("transcode worker %s: %d processes", self.owner, self.processes)
+        self.recover()
+
+        pool = self._new_pool()
+        last_beat = time.monotonic()
+        try:
+            while not self._stop.is_set() or self._running:
+                free = self.processes - len(self._running)
+                if free > 0 and not self._stop.is_set():
+                    for job in self.repo.lease(self.owner, free):
+                        self._running[pool.submit(run_job, job.kind, job.item_id, job.source_key)] = job
+
+                if self._running:
+                    done, _ = wait(list(self._running), timeout=settings.TRANSCODE_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                else:
+                    self._stop.wait(settings.TRANSCODE_POLL_SECONDS)
+                    done = set()
+
+                broken = False
+                for future in done:
+                    broken = broken or isinstance(future.exception(), BrokenProcessPool)
+                    self._finish(self._running.pop(future), future)
+                if broken:
+                    # дочерний процесс убит (OOM и т.п.) — пул непригоден, поднимаем новый
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self._new_pool()
+
+                if time.monotonic() - last_beat >= settings.TRANSCODE_HEARTBEAT_SECONDS:
+                    self.repo.heartbeat(self.owner, [job.id for job in self._running.values()])
+                    for job in self.repo.fail_exhausted():
+                        mark_item_failed(job.kind, job.item_id)
+                    last_beat = time.monotonic()
+        finally:
+            pool.shutdown(wait=True)
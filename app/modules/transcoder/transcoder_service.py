@@ -1,11 +1,102 @@
+import json
 import subprocess
+import time
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable, Optional
+from app.core.config import settings
 from app.core.logger import logger
 
 
+@dataclass(frozen=True)
+class Rendition:
+    """Ступень ABR-лестницы: имя варианта (оно же %v в именах файлов), высота кадра, битрейты в kbps."""
+    name: str
+    height: int
+    video_kbps: int
+    audio_kbps: int
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    height: Optional[int]
+    has_audio: bool
+
+
+def parse_ladder(spec: str) -> list[Rendition]:
+    """'240p:240:400:64,480p:480:1200:96' -> [Rendition, ...] по возрастанию высоты."""
+    rungs = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, height, video_kbps, audio_kbps = item.split(":")
+        rungs.append(Rendition(name, int(height), int(video_kbps), int(audio_kbps)))
+    return sorted(rungs, key=lambda r: r.height)
+
+
+def probe(input_path: str) -> MediaInfo:
+    res = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "stream=codec_type,height,disposition", "-of", "json", str(input_path)],
+        capture_output=True,
+        check=True,
+    )
+    streams = json.loads(res.stdout or b"{}").get("streams", [])
+    # обложка (attached_pic) — это тоже video-поток, но кодировать её в лестницу не нужно
+    videos = [s for s in streams if s.get("codec_type") == "video" and not s.get("disposition", {}).get("attached_pic")]
+    return MediaInfo(
+        height=videos[0].get("height") if videos else None,
+        has_audio=any(s.get("codec_type") == "audio" for s in streams),
+    )
+
+
+def _finished_segments(out_dir: Path, seen: set[Path]) -> list[Path]:
+    """
+    Сегменты, которые ffmpeg уже закрыл: с -hls_flags temp_file он пишет в *.tmp
+    и переименовывает только готовый файл. Плейлисты и init-сегмент fMP4 не отдаём —
+    они публикуются в конце.
+    """
+    ready = []
+    for p in sorted(out_dir.rglob("*")):
+        if p in seen or not p.is_file() or p.suffix not in (".ts", ".m4s"):
+            continue
+        seen.add(p)
+        ready.append(p)
+    return ready
+
+
 class TranscoderService:
-    def transcodeToHls(self, input_path: str, output_path: str) -> bool:
-        """Run ffmpeg to generate HLS without invoking a shell."""
+    def _run(self, cmd: list[str], out_dir: Path, on_segment: Optional[Callable[[Path], None]]) -> bool:
+        """Запускает ffmpeg; с on_segment опрашивает out_dir и отдаёт колбэку каждый закрытый сегмент."""
+        if on_segment is None:
+            res = subprocess.run(cmd, check=False)
+            return res.returncode == 0
+
+        proc = subprocess.Popen(cmd)
+        seen: set[Path] = set()
+        try:
+            while proc.poll() is None:
+                for segment in _finished_segments(out_dir, seen):
+                    on_segment(segment)
+                time.sleep(settings.HLS_STREAM_POLL_SECONDS)
+            if proc.returncode != 0:
+                return False
+            for segment in _finished_segments(out_dir, seen):
+                on_segment(segment)
+            return True
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
+    def transcodeToHls(
+        self,
+        input_path: str,
+        output_path: str,
+        on_segment: Optional[Callable[[Path], None]] = None,
+    ) -> bool:
+        """
+        Run ffmpeg to generate HLS without invoking a shell.
+        С on_segment каталог вывода опрашивается во время кодирования и колбэк
+        получает каждый закрытый сегмент (см. HlsPublisher.segment_ready).
+        """
         try:
             out_path = Path(output_path)
             out_path.parent.mkdir(parents=True, exist_ok=True)
@@ -26,13 +117,144 @@ class TranscoderService:
                 "10",
                 "-hls_list_size",
                 "0",
+                "-hls_flags",
+                "temp_file",
                 "-f",
                 "hls",
                 str(out_path),
             ]
-            res = subprocess.run(cmd, check=False)
+            return self._run(cmd, out_path.parent, on_segment)
+        except Exception as e:
+            logger.error("Transcoding error: %s", e)
+            return False
 
-            return res.returncode == 0
+    def transcodeToHlsLadder(
+        self,
+        input_path: str,
+        output_path: str,
+        on_segment: Optional[Callable[[Path], None]] = None,
+        ladder: Optional[list[Rendition]] = None,
+    ) -> bool:
+        """
+        ABR: один проход ffmpeg, видео раздваивается split-фильтром и масштабируется
+        под каждую ступень HLS_LADDER (выше исходника не поднимаемся), плюс
+        audio-only вариант. output_path — мастер-плейлист, рядом лежат
+        index_<ступень>.m3u8 и <ступень>_NNNNN.ts. Ключевые кадры принудительно
+        ставятся на границах сегментов, чтобы плеер мог переключаться между вариантами.
+        Без видеопотока откатываемся на transcodeToHls.
+        """
+        try:
+            out_path = Path(output_path)
+            out_dir = out_path.parent
+            out_dir.mkdir(parents=True, exist_ok=True)
+
+            info = probe(input_path)
+            if info.height is None:
+                return self.transcodeToHls(input_path, output_path, on_segment)
+
+            ladder = ladder or parse_ladder(settings.HLS_LADDER)
+            rungs = [r for r in ladder if r.height <= info.height]
+            if not rungs:
+                # исходник ниже самой маленькой ступени — один вариант в исходном размере
+                low = ladder[0]
+                rungs = [Rendition(f"{info.height}p", info.height, low.video_kbps, low.audio_kbps)]
+            segment_seconds = settings.HLS_SEGMENT_SECONDS
+
+            split = f"[0:v]split={len(rungs)}" + "".join(f"[v{i}]" for i in range(len(rungs)))
+            scales = [f"[v{i}]scale=-2:{r.height}[v{i}out]" for i, r in enumerate(rungs)]
+            cmd = ["ffmpeg", "-i", str(input_path), "-filter_complex", ";".join([split, *scales])]
+
+            stream_map = []
+            for i, r in enumerate(rungs):
+                cmd += [
+                    "-map", f"[v{i}out]",
+                    f"-c:v:{i}", "libx264",
+                    f"-b:v:{i}", f"{r.video_kbps}k",
+                    f"-maxrate:v:{i}", f"{r.video_kbps * 107 // 100}k",
+                    f"-bufsize:v:{i}", f"{r.video_kbps * 3 // 2}k",
+                ]
+                if info.has_audio:
+                    cmd += ["-map", "0:a:0", f"-c:a:{i}", "aac", f"-b:a:{i}", f"{r.audio_kbps}k", f"-ac:a:{i}", "2"]
+                    stream_map.append(f"v:{i},a:{i},name:{r.name}")
+                else:
+                    stream_map.append(f"v:{i},name:{r.name}")
+
+            if info.has_audio and settings.HLS_AUDIO_ONLY_KBPS:
+                n = len(rungs)
+                cmd += ["-map", "0:a:0", f"-c:a:{n}", "aac", f"-b:a:{n}", f"{settings.HLS_AUDIO_ONLY_KBPS}k", f"-ac:a:{n}", "2"]
+                stream_map.append(f"a:{n},name:audio")
+
+            cmd += [
+                "-preset", "veryfast",
+                "-sc_threshold", "0",
+                "-force_key_frames", f"expr:gte(t,n_forced*{segment_seconds})",
+                "-f", "hls",
+                "-start_number", "0",
+                "-hls_time", str(segment_seconds),
+                "-hls_list_size", "0",
+                "-hls_playlist_type", "vod",
+                "-hls_flags", "temp_file+independent_segments",
+                "-hls_segment_filename", str(out_dir / "%v_%05d.ts"),
+                "-master_pl_name", out_path.name,
+                "-var_stream_map", " ".join(stream_map),
+                str(out_dir / "index_%v.m3u8"),
+            ]
+            return self._run(cmd, out_dir, on_segment)
+        except Exception as e:
+            logger.error("Transcoding error: %s", e)
+            return False
+
+    def transcodeAudioToHls(
+        self,
+        input_path: str,
+        output_path: str,
+        on_segment: Optional[Callable[[Path], None]] = None,
+        bitrates: Optional[list[int]] = None,
+    ) -> bool:
+        """
+        Аудио-профиль для музыки: -vn (обложка не перекодируется в видеопоток),
+        AAC или Opus (MUSIC_HLS_CODEC), fMP4-сегменты. При нескольких битрейтах
+        (MUSIC_HLS_BITRATES) output_path становится мастер-плейлистом над
+        index_<kbps>k.m3u8, как в transcodeToHlsLadder.
+        """
+        try:
+            out_path = Path(output_path)
+            out_dir = out_path.parent
+            out_dir.mkdir(parents=True, exist_ok=True)
+
+            bitrates = bitrates or [int(b) for b in settings.MUSIC_HLS_BITRATES.split(",") if b.strip()]
+            codec = "libopus" if settings.MUSIC_HLS_CODEC == "opus" else "aac"
+
+            cmd = ["ffmpeg", "-i", str(input_path), "-vn"]
+            for i, kbps in enumerate(bitrates):
+                cmd += ["-map", "0:a:0", f"-c:a:{i}", codec, f"-b:a:{i}", f"{kbps}k", f"-ac:a:{i}", "2"]
+            if codec == "libopus":
+                # Opus в fMP4 у части сборок ffmpeg всё ещё помечен как экспериментальный
+                cmd += ["-strict", "-2"]
+            cmd += [
+                "-f", "hls",
+                "-start_number", "0",
+                "-hls_time", str(settings.MUSIC_HLS_SEGMENT_SECONDS),
+                "-hls_list_size", "0",
+                "-hls_playlist_type", "vod",
+                "-hls_segment_type", "fmp4",
+                "-hls_flags", "temp_file+independent_segments",
+            ]
+            if len(bitrates) == 1:
+                cmd += [
+                    "-hls_fmp4_init_filename", "init.mp4",
+                    "-hls_segment_filename", str(out_dir / "seg_%05d.m4s"),
+                    str(out_path),
+                ]
+            else:
+                cmd += [
+                    "-hls_fmp4_init_filename", "init_%v.mp4",
+                    "-hls_segment_filename", str(out_dir / "%v_%05d.m4s"),
+                    "-master_pl_name", out_path.name,
+                    "-var_stream_map", " ".join(f"a:{i},name:{kbps}k" for i, kbps in enumerate(bitrates)),
+                    str(out_dir / "index_%v.m3u8"),
+                ]
+            return self._run(cmd, out_dir, on_segment)
         except Exception as e:
             logger.error("Transcoding error: %s", e)
             return False
@@ -0,0 +1,52 @@
+# app/modules/uploads/upload_dto.py
+import uuid
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from app.models import UploadSessionStatus
+
+
+class UploadCreate(BaseModel):
+    kind: Literal["video", "music", "ad", "book", "image"]
+    filename: str = Field(min_length=1, examples=["movie.mp4"])
+    content_type: Optional[str] = Field(default=None, examples=["video/mp4"])
+
+
+class UploadOut(BaseModel):
+    id: uuid.UUID
+    kind: str
+    status: UploadSessionStatus
+    object_key: str
+    filename: str
+    content_type: Optional[str] = None
+    size: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class UploadPartOut(BaseModel):
+    part_number: int
+    etag: str
+    size: Optional[int] = None
+
+
+class UploadStatusOut(UploadOut):
+    part_size: int = Field(description="Рекомендуемый размер части (кроме последней)")
+    max_part_size: int
+    parts: list[UploadPartOut] = Field(default_factory=list, description="Уже загруженные части")
+
+
+class PresignedPost(BaseModel):
+    url: str
+    fields: dict[str, str] = Field(description="Поля формы; файл — последним полем file")
+
+
+class DirectUploadOut(UploadStatusOut):
+    put_url: str = Field(description="PUT тела файла с тем же Content-Type")
+    post: PresignedPost = Field(description="Альтернатива PUT: multipart/form-data POST, размер проверяет хранилище")
+    expires_in: int
+    max_size: int
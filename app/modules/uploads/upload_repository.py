@@ -0,0 +1,55 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, update
+from sqlmodel import and_, or_, select
+
+from app.core.db import session_scope
+from app.models import UploadSession, UploadSessionStatus
+
+
+class UploadSessionRepository:
+    def create(self, upload: UploadSession) -> UploadSession:
+        with session_scope() as session:
+            session.add(upload)
+            session.commit()
+            session.refresh(upload)
+            return upload
+
+    def get(self, id: uuid.UUID) -> Optional[UploadSession]:
+        with session_scope(read_only=True) as session:
+            return session.get(UploadSession, id)
+
+    def transition(
+        self,
+        id: uuid.UUID,
+        expected: UploadSessionStatus,
+        status: UploadSessionStatus,
+        kind: Optional[str] = None,
+        **values,
+    ) -> Optional[UploadSession]:
+        """
+        Атомарно переводит загрузку из expected в status (UPDATE ... WHERE status = expected):
+        два параллельных complete или create с одним upload_id не пройдут оба.
+        """
+        with session_scope() as session:
+            stmt = update(UploadSession).where(UploadSession.id == id, UploadSession.status == expected)
+            if kind is not None:
+                stmt = stmt.where(UploadSession.kind == kind)
+            stmt = stmt.values(status=status, **values).returning(UploadSession)
+            upload = session.execute(stmt).scalars().first()
+            if upload is not None:
+                session.expunge(upload)
+            session.commit()
+            return upload
+
+    def stale(self, older_than: datetime) -> list[UploadSession]:
+        """Начатые до older_than и не завершённые, а также завершённые до older_than и никем не забранные."""
+        with session_scope(read_only=True) as session:
+            stmt = select(UploadSession).where(or_(
+                and_(UploadSession.status == UploadSessionStatus.ACTIVE, UploadSession.created_at < older_than),
+                and_(UploadSession.status == UploadSessionStatus.COMPLETED,
+                     func.coalesce(UploadSession.updated_at, UploadSession.created_at) < older_than),
+            ))
+            return list(session.exec(stmt).all())
@@ -0,0 +1,70 @@
+import uuid
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Request
+
+from app.core.config import settings
+from app.modules.auth.auth_router import admin_guard
+from app.modules.uploads.upload_dto import DirectUploadOut, UploadCreate, UploadOut, UploadPartOut, UploadStatusOut
+from app.modules.uploads.upload_service import MAX_PARTS, UploadService
+
+service = UploadService()
+
+router = APIRouter()
+
+
+@router.post("", response_model=UploadStatusOut)
+def initiate_upload(body: UploadCreate, user=Depends(admin_guard)):
+    return service.initiate(
+        kind=body.kind,
+        filename=body.filename,
+        content_type=body.content_type,
+        created_by=uuid.UUID(user["id"]),
+    )
+
+
+@router.post("/presign", response_model=DirectUploadOut)
+def presign_upload(body: UploadCreate, user=Depends(admin_guard)):
+    """Загрузка из браузера прямо в MinIO; после неё — finalize в модуле (videos, music, ads, books)."""
+    return service.presign(
+        kind=body.kind,
+        filename=body.filename,
+        content_type=body.content_type,
+        created_by=uuid.UUID(user["id"]),
+    )
+
+
+@router.put("/{upload_id}/parts/{part_number}", response_model=UploadPartOut, dependencies=[Depends(admin_guard)])
+async def upload_part(
+    upload_id: uuid.UUID,
+    part_number: Annotated[int, Path(ge=1, le=MAX_PARTS)],
+    request: Request,
+):
+    """Тело запроса — сырые байты части. Части можно слать параллельно и повторять."""
+    declared = request.headers.get("content-length")
+    if declared is not None and not (declared.isascii() and declared.isdigit()):
+        raise HTTPException(400, "Invalid Content-Length header")
+    if declared and int(declared) > settings.UPLOAD_MAX_PART_SIZE:
+        raise HTTPException(413, f"Part is larger than {settings.UPLOAD_MAX_PART_SIZE} bytes")
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > settings.UPLOAD_MAX_PART_SIZE:
+            raise HTTPException(413, f"Part is larger than {settings.UPLOAD_MAX_PART_SIZE} bytes")
+        chunks.append(chunk)
+    return await service.upload_part(upload_id, part_number, b"".join(chunks))
+
+
+@router.get("/{upload_id}", response_model=UploadStatusOut, dependencies=[Depends(admin_guard)])
+def get_upload(upload_id: uuid.UUID):
+    return service.status(upload_id)
+
+
+@router.post("/{upload_id}/complete", response_model=UploadOut, dependencies=[Depends(admin_guard)])
+def complete_upload(upload_id: uuid.UUID):
+    return service.complete(upload_id)
+
+
+@router.delete("/{upload_id}", response_model=UploadOut, dependencies=[Depends(admin_guard)])
+def abort_upload(upload_id: uuid.UUID):
+    return service.abort(upload_id)
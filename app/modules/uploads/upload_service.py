@@ -0,0 +1,340 @@
+import io
+import os
+import subprocess
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, UTC
+from typing import Iterator
+
+from fastapi import HTTPException
+from minio.error import S3Error
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.db import in_transaction
+from app.core.logger import logger
+from app.core.s3 import AsyncMinioService, get_minio_service
+from app.models import UploadSession, UploadSessionStatus
+from app.modules.transcoder.transcoder_service import probe
+from app.modules.uploads.upload_repository import UploadSessionRepository
+from app.utils.utils_media import is_image_stream
+
+MAX_PARTS = 10000  # предел S3 multipart
+MAX_BYTES = {"image": 20 * 1024 ** 2, "book": 512 * 1024 ** 2}  # остальное — DIRECT_UPLOAD_MAX_BYTES
+
+
+def _is_video(filename: str, content_type: str | None) -> bool:
+    return (content_type or "").lower().startswith("video/")
+
+
+def _is_audio(filename: str, content_type: str | None) -> bool:
+    ct = (content_type or "").lower()
+    return ct.startswith("audio/") or ct == "video/webm"
+
+
+def _is_book(filename: str, content_type: str | None) -> bool:
+    ct = (content_type or "").lower()
+    ext = os.path.splitext(filename)[1].lower()
+    return ct in {"application/pdf", "application/epub+zip"} or ext in {".pdf", ".epub"}
+
+
+def _is_image(filename: str, content_type: str | None) -> bool:
+    return (content_type or "").lower().startswith("image/")
+
+
+KIND_RULES = {
+    "video": (_is_video, "file must be a video/*"),
+    "ad": (_is_video, "file must be a video/*"),
+    "music": (_is_audio, "file must be an audio/*"),
+    "book": (_is_book, "file must be PDF or EPUB"),
+    "image": (_is_image, "file must be an image/*"),
+}
+
+
+def _max_bytes(kind: str) -> int:
+    return MAX_BYTES.get(kind, settings.DIRECT_UPLOAD_MAX_BYTES)
+
+
+def _parse_id(upload_id: str | uuid.UUID, field: str = "upload_id") -> uuid.UUID:
+    try:
+        return uuid.UUID(str(upload_id))
+    except ValueError:
+        raise HTTPException(422, f"{field} must be a valid UUID")
+
+
+class UploadService:
+    """
+    Возобновляемая загрузка: initiate → части (в любом порядке, параллельно) → complete.
+    Части лежат в S3 multipart upload, поэтому после обрыва клиент спрашивает
+    GET /uploads/{id}, какие части уже есть, и догружает остальные.
+    Прямая загрузка: presign → браузер кладёт файл в MinIO сам → finalize в модуле.
+    """
+
+    def __init__(self):
+        self.minio = get_minio_service()
+        self.storage = AsyncMinioService(self.minio)
+        self.repo = UploadSessionRepository()
+        self.bucket = settings.AWS_S3_BUCKET_NAME
+
+    def _ensure(self, upload_id: uuid.UUID, status: UploadSessionStatus | None = None) -> UploadSession:
+        upload = self.repo.get(upload_id)
+        if not upload:
+            raise HTTPException(404, "Upload not found")
+        if status is not None and upload.status != status:
+            raise HTTPException(409, f"Upload is {upload.status.value}")
+        return upload
+
+    def _new_key(self, kind: str, filename: str, content_type: str | None) -> tuple[uuid.UUID, str]:
+        check, message = KIND_RULES[kind]
+        if not check(filename, content_type):
+            raise HTTPException(400, message)
+        upload_id = uuid.uuid4()
+        ext = os.path.splitext(filename)[1].lower()
+        return upload_id, f"uploads/{kind}/{upload_id}/source{ext}"
+
+    def initiate(self, *, kind: str, filename: str, content_type: str | None, created_by: uuid.UUID) -> dict:
+        upload_id, object_key = self._new_key(kind, filename, content_type)
+        try:
+            s3_upload_id = self.minio.create_multipart_upload(object_key, self.bucket, content_type)
+        except S3Error as e:
+            logger.error("initiate upload error: %s", e)
+            raise HTTPException(502, "Storage error")
+        upload = self.repo.create(
+            UploadSession(
+                id=upload_id,
+                kind=kind,
+                object_key=object_key,
+                s3_upload_id=s3_upload_id,
+                filename=filename,
+                content_type=content_type,
+                created_by=created_by,
+            )
+        )
+        return self._describe(upload, parts=[])
+
+    def presign(self, *, kind: str, filename: str, content_type: str | None, created_by: uuid.UUID) -> dict:
+        """Прямая загрузка из браузера: presigned PUT и POST-policy (размер и Content-Type проверяет MinIO)."""
+        content_type = content_type or "application/octet-stream"
+        upload_id, object_key = self._new_key(kind, filename, content_type)
+        expires = settings.DIRECT_UPLOAD_EXPIRES_SECONDS
+        self.minio.ensure_bucket(self.bucket)
+        upload = self.repo.create(
+            UploadSession(
+                id=upload_id,
+                kind=kind,
+                object_key=object_key,
+                filename=filename,
+                content_type=content_type,
+                created_by=created_by,
+            )
+        )
+        return {
+            **self._describe(upload, parts=[]),
+            "put_url": self.minio.presign_put(object_key, self.bucket, expires),
+            "post": self.minio.presign_post(object_key, self.bucket, content_type, _max_bytes(kind), expires),
+            "expires_in": expires,
+            "max_size": _max_bytes(kind),
+        }
+
+    async def upload_part(self, upload_id: uuid.UUID, part_number: int, data: bytes) -> dict:
+        if not 1 <= part_number <= MAX_PARTS:
+            raise HTTPException(422, f"part_number must be 1..{MAX_PARTS}")
+        if not data:
+            raise HTTPException(400, "Empty part")
+        upload = await run_in_threadpool(self._ensure, upload_id, UploadSessionStatus.ACTIVE)
+        if upload.s3_upload_id is None:
+            raise HTTPException(409, "Direct upload has no parts")
+        try:
+            etag = await self.storage.upload_part(upload.object_key, self.bucket, upload.s3_upload_id, part_number, data)
+        except S3Error as e:
+            logger.error("upload part %s/%d error: %s", upload_id, part_number, e)
+            raise HTTPException(502, "Storage error")
+        return {"part_number": part_number, "etag": etag, "size": len(data)}
+
+    def status(self, upload_id: uuid.UUID) -> dict:
+        upload = self._ensure(upload_id)
+        parts = []
+        if upload.status == UploadSessionStatus.ACTIVE and upload.s3_upload_id:
+            parts = self.minio.list_parts(upload.object_key, self.bucket, upload.s3_upload_id)
+        return self._describe(upload, parts)
+
+    def complete(self, upload_id: uuid.UUID) -> UploadSession:
+        upload = self._ensure(upload_id, UploadSessionStatus.ACTIVE)
+        if upload.s3_upload_id is None:
+            return self._complete_direct(upload)
+        # список частей берём у S3, а не у клиента: он мог потерять ответы на часть PUT'ов
+        parts = self.minio.list_parts(upload.object_key, self.bucket, upload.s3_upload_id)
+        if not parts:
+            raise HTTPException(400, "No parts uploaded")
+        numbers = sorted(p.part_number for p in parts)
+        if numbers != list(range(1, len(numbers) + 1)):
+            missing = sorted(set(range(1, numbers[-1] + 1)) - set(numbers))
+            raise HTTPException(400, f"Missing parts: {missing[:20]}")
+        try:
+            self.minio.complete_multipart_upload(upload.object_key, self.bucket, upload.s3_upload_id, parts)
+        except S3Error as e:
+            # например, EntityTooSmall: часть, кроме последней, меньше 5 MiB
+            logger.error("complete upload %s error: %s", upload_id, e)
+            raise HTTPException(400, f"Cannot complete upload: {e.code}")
+        completed = self.repo.transition(
+            upload_id,
+            UploadSessionStatus.ACTIVE,
+            UploadSessionStatus.COMPLETED,
+            size=sum(p.size or 0 for p in parts),
+        )
+        if not completed:
+            raise HTTPException(409, "Upload is no longer active")
+        return completed
+
+    def _complete_direct(self, upload: UploadSession) -> UploadSession:
+        try:
+            size = self.minio.client.stat_object(self.bucket, upload.object_key).size
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                raise HTTPException(400, "File has not been uploaded yet")
+            raise HTTPException(502, "Storage error")
+        completed = self.repo.transition(upload.id, UploadSessionStatus.ACTIVE, UploadSessionStatus.COMPLETED, size=size)
+        if not completed:
+            raise HTTPException(409, "Upload is no longer active")
+        return completed
+
+    def _discard(self, upload: UploadSession) -> bool:
+        """Закрывает завершённую загрузку и удаляет объект; False — её уже забрали или закрыли."""
+        if not self.repo.transition(upload.id, UploadSessionStatus.COMPLETED, UploadSessionStatus.ABORTED):
+            return False
+        try:
+            self.minio.delete_object(upload.object_key, self.bucket)
+        except S3Error as e:
+            logger.warning("delete upload %s: %s", upload.id, e)
+        return True
+
+    def _reject(self, upload: UploadSession, reason: str) -> None:
+        """Файл не прошёл проверку: удаляем объект, загрузку закрываем."""
+        self._discard(upload)
+        raise HTTPException(400, reason)
+
+    def _validate(self, upload: UploadSession) -> None:
+        """Содержимое, а не только заявленный Content-Type: magic bytes или ffprobe по ссылке на MinIO."""
+        if upload.size is not None and upload.size > _max_bytes(upload.kind):
+            self._reject(upload, f"File is larger than {_max_bytes(upload.kind)} bytes")
+        if upload.kind == "image":
+            head = self._read_head(upload)
+            if not is_image_stream(io.BytesIO(head), upload.content_type):
+                self._reject(upload, "File is not a jpg/png/webp/gif image")
+        elif upload.kind == "book":
+            head = self._read_head(upload)
+            if not head.startswith((b"%PDF-", b"PK\x03\x04")):
+                self._reject(upload, "File is not a PDF or EPUB")
+        else:
+            try:
+                info = probe(self.minio.internal_url(upload.object_key, self.bucket))
+            except (subprocess.CalledProcessError, ValueError) as e:
+                logger.info("ffprobe rejected upload %s: %s", upload.id, e)
+                self._reject(upload, "File is not a readable media file")
+            if upload.kind == "music" and not info.has_audio:
+                self._reject(upload, "File has no audio stream")
+            if upload.kind in ("video", "ad") and info.height is None:
+                self._reject(upload, "File has no video stream")
+
+    def _read_head(self, upload: UploadSession) -> bytes:
+        try:
+            return self.minio.read_head(upload.object_key, self.bucket)
+        except S3Error as e:
+            logger.error("read upload head %s error: %s", upload.id, e)
+            raise HTTPException(502, "Storage error")
+
+    def prepare(self, upload_id: str | uuid.UUID, kind: str, field: str = "upload_id") -> UploadSession:
+        """
+        Для finalize/create-эндпоинтов модулей: завершает загрузку (если браузер только
+        что залил файл по presigned-ссылке) и проверяет содержимое, но не забирает её —
+        это делает claim, когда проверены все загрузки запроса.
+        """
+        upload = self._ensure(_parse_id(upload_id, field))
+        if upload.kind != kind:
+            raise HTTPException(400, f"{field} is not a {kind} upload")
+        if upload.status == UploadSessionStatus.ACTIVE:
+            upload = self.complete(upload.id)
+        if upload.status != UploadSessionStatus.COMPLETED:
+            raise HTTPException(400, f"{field} is not a completed {kind} upload")
+        self._validate(upload)
+        return upload
+
+    @contextmanager
+    def claim(self, *prepared: tuple[UploadSession, str]) -> Iterator[list[UploadSession]]:
+        """
+        Забирает подготовленные (prepare) загрузки вместе — (загрузка, имя поля) — на время
+        создания строки. Если забрать какую-то не вышло или блок упал, уже забранные
+        возвращаются в COMPLETED: тот же upload_id можно отправить снова, не загружая заново.
+        Внутри app.core.db.transaction() их возвращает откат транзакции.
+        """
+        consumed: list[UploadSession] = []
+        try:
+            for upload, field in prepared:
+                consumed.append(self.consume(upload.id, upload.kind, field))
+            yield consumed
+        except BaseException:
+            if not in_transaction():
+                for upload in consumed:
+                    self.release(upload)
+            raise
+
+    def abort(self, upload_id: uuid.UUID) -> UploadSession:
+        upload = self._ensure(upload_id, UploadSessionStatus.ACTIVE)
+        aborted = self.repo.transition(upload_id, UploadSessionStatus.ACTIVE, UploadSessionStatus.ABORTED)
+        if not aborted:
+            raise HTTPException(409, "Upload is no longer active")
+        try:
+            if upload.s3_upload_id:
+                self.minio.abort_multipart_upload(upload.object_key, self.bucket, upload.s3_upload_id)
+            else:
+                self.minio.delete_object(upload.object_key, self.bucket)
+        except S3Error as e:
+            logger.warning("abort upload %s: %s", upload_id, e)
+        return aborted
+
+    def consume(self, upload_id: str | uuid.UUID, kind: str, field: str = "upload_id") -> UploadSession:
+        """Завершённая загрузка нужного типа, один раз (без проверки содержимого — см. prepare и claim)."""
+        upload = self.repo.transition(
+            _parse_id(upload_id, field), UploadSessionStatus.COMPLETED, UploadSessionStatus.CONSUMED, kind=kind
+        )
+        if not upload:
+            raise HTTPException(400, f"{field} is not a completed {kind} upload")
+        return upload
+
+    def release(self, upload: UploadSession) -> None:
+        """Обратно в COMPLETED: строку из загрузки создать не удалось."""
+        if not self.repo.transition(upload.id, UploadSessionStatus.CONSUMED, UploadSessionStatus.COMPLETED):
+            logger.warning("release upload %s: not consumed any more", upload.id)
+
+    def abort_stale(self) -> int:
+        """
+        Прерывает загрузки, не завершённые за UPLOAD_SESSION_TTL_HOURS, и завершённые,
+        которые за это время никто не забрал (части и объекты в MinIO удаляются).
+        """
+        cutoff = datetime.now(UTC) - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+        aborted = 0
+        for upload in self.repo.stale(cutoff):
+            if upload.status == UploadSessionStatus.COMPLETED:
+                aborted += self._discard(upload)
+                continue
+            try:
+                self.abort(upload.id)
+                aborted += 1
+            except HTTPException:
+                continue
+        return aborted
+
+    def _describe(self, upload: UploadSession, parts) -> dict:
+        return {
+            "id": upload.id,
+            "kind": upload.kind,
+            "status": upload.status,
+            "object_key": upload.object_key,
+            "filename": upload.filename,
+            "content_type": upload.content_type,
+            "size": upload.size,
+            "created_at": upload.created_at,
+            "part_size": settings.S3_PART_SIZE,
+            "max_part_size": settings.UPLOAD_MAX_PART_SIZE,
+            "parts": [{"part_number": p.part_number, "etag": p.etag, "size": p.size} for p in parts],
+        }
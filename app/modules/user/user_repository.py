@@ -1,38 +1,48 @@
 from typing import Optional
-from sqlmodel import Session, select
-from app.core.db import engine
+from sqlmodel import select
+from app.core.db import session_scope
+from app.core.pagination import Cursor, keyset
 from app.models import User
 from app.schemas import UserPublic, UpdateUser
 
+
+def _select_all(skip: int | None, limit: int | None, cursor: Cursor | None = None):
+    stmt = keyset(select(User), User, cursor)
+    if skip:
+        stmt = stmt.offset(skip)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
 class UserRepository:
     def create(self, data: User) -> UserPublic:
-        with Session(engine) as session:
+        with session_scope() as session:
             session.add(data)
             session.commit()
             session.refresh(data)
             return UserPublic.model_validate(data)
 
     def find_by_id(self, id: str) -> Optional[UserPublic]:
-        with Session(engine) as session:
+        with session_scope(read_only=True) as session:
             result = session.exec(select(User).where(User.id == id)).first()
             return UserPublic.model_validate(result) if result else None
 
     def find_by_phone(self, phone: str) -> Optional[User]:
-        with Session(engine) as session:
+        with session_scope() as session:
             return session.exec(select(User).where(User.phone == phone)).first()
 
-    def find_all(self, skip: int | None = None, limit: int | None = None) -> list[UserPublic]:
-        with Session(engine) as session:
-            stmt = select(User)
-            if skip:
-                stmt = stmt.offset(skip)
-            if limit:
-                stmt = stmt.limit(limit)
-            results = session.exec(stmt).all()
+    def find_all(self, skip: int | None = None, limit: int | None = None, cursor: Cursor | None = None) -> list[UserPublic]:
+        with session_scope(read_only=True) as session:
+            results = session.exec(_select_all(skip, limit, cursor)).all()
             return [UserPublic.model_validate(u) for u in results]
 
+    def export_query(self):
+        """Тот же запрос, что у find_all, без limit/offset — для app.core.export."""
+        return _select_all(None, None)
+
     def update_by_id(self, id: str, data: UpdateUser) -> Optional[UserPublic]:
-        with Session(engine) as session:
+        with session_scope() as session:
             user = session.exec(select(User).where(User.id == id)).first()
             if not user:
                 return None
@@ -45,7 +55,7 @@ class UserRepository:
             return UserPublic.model_validate(user)
 
     def delete_by_id(self, id: str) -> Optional[UserPublic]:
-        with Session(engine) as session:
+        with session_scope() as session:
             user = session.exec(select(User).where(User.id == id)).first()
             if not user:
                 return None
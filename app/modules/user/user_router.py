@@ -1,8 +1,10 @@
 from typing import Annotated, Optional
 import uuid
 from pydantic import Field
-from fastapi import APIRouter, Depends, Path, Body
+from fastapi import APIRouter, Depends, Path, Body, Response
 
+from app.api.deps import CursorDep, ExportFormatDep, LimitDep, get_unit_of_work
+from app.core.pagination import set_next_cursor
 from app.modules.user.user_service import UserService
 from app.schemas import CreateUser, UpdateUser, UserPublic
 from app.modules.auth.auth_router import admin_guard
@@ -13,8 +15,17 @@ service = UserService()
 user_router = APIRouter(
     prefix="/users",
     tags=["users"],
+    dependencies=[Depends(get_unit_of_work)],
 )
 
+@user_router.get("/export")
+def export_users(
+    fmt: ExportFormatDep = "ndjson",
+    _=Depends(admin_guard)
+):
+    """Все пользователи потоком (NDJSON или CSV), от новых к старым."""
+    return service.export(fmt)
+
 @user_router.get("/{id}", response_model=UserPublic | None)
 def get_user_by_id(
     id: Annotated[str, Path(description="User id")],
@@ -24,11 +35,15 @@ def get_user_by_id(
 
 @user_router.get("/", response_model=list[UserPublic])
 def get_users(
+    response: Response,
+    cursor: CursorDep,
+    limit: LimitDep,
     skip: Optional[int] = None,
-    limit: Optional[int] = None,
     _=Depends(admin_guard)
 ):
-    return service.findAll(skip=skip, limit=limit)
+    users = service.findAll(skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, users, limit)
+    return users
 
 @user_router.post("/", response_model=UserPublic)
 def create_user(
@@ -1,6 +1,8 @@
 import uuid
 from fastapi import HTTPException
 from app.core.logger import logger
+from app.core.export import ExportFormat, stream_export
+from app.core.pagination import Cursor
 from app.core.security import get_hashed_password
 
 from app.models import User
@@ -48,13 +50,17 @@ class UserService:
             logger.error("findById error: %s", e)
             raise HTTPException(status_code=500)
 
-    def findAll(self, skip: int | None = None, limit: int | None = None) -> list[UserPublic]:
+    def findAll(self, skip: int | None = None, limit: int | None = None, cursor: Cursor | None = None) -> list[UserPublic]:
         try:
-            return self.repo.find_all(skip, limit)
+            return self.repo.find_all(skip, limit, cursor)
         except Exception as e:
             logger.error("findAll error: %s", e)
             raise HTTPException(status_code=500)
 
+    def export(self, fmt: ExportFormat):
+        # через UserPublic: хеши паролей в выгрузку не попадают
+        return stream_export(self.repo.export_query(), UserPublic, fmt, "users")
+
     def updateById(self, id: str, data: UpdateUser) -> UserPublic:
         try:
             user = self.repo.update_by_id(id, data)
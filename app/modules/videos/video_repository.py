@@ -3,6 +3,8 @@ from __future__ import annotations
 from typing import Iterable, Optional
 from sqlmodel import Session, select
 
+from app.core.fts import text_match, text_rank
+from app.core.pagination import Cursor, keyset
 from app.models import Video, VideoStatus
 from enum import Enum
 
@@ -26,14 +28,15 @@ class VideoRepository:
         q: Optional[str],
         limit: int,
         offset: int,
+        cursor: Optional[Cursor] = None,
     ) -> Iterable[Video]:
         stmt = select(Video).where(Video.deleted_at.is_(None))
         if status:
             stmt = stmt.where(Video.status == status)
         if q:
-            like = f"%{q}%"
-            stmt = stmt.where((Video.title.like(like)) | (Video.description.like(like)))
-        stmt = stmt.order_by(Video.created_at.desc()).limit(limit).offset(offset)
+            stmt = stmt.where(text_match(Video, q, Video.title, Video.description))
+            stmt = stmt.order_by(text_rank(Video, q, Video.title, Video.description).desc())
+        stmt = keyset(stmt, Video, cursor).limit(limit).offset(offset)
         return self.session.exec(stmt).all()
 
     def save(self, v: Video) -> Video:
@@ -1,31 +1,36 @@
 from __future__ import annotations
 from typing import List, Optional
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, BackgroundTasks
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Response, UploadFile
 from sqlmodel import Session
 
+from app.api.deps import CursorDep, LimitDep, ReadSessionDep, StorageDep
+from app.core.pagination import set_next_cursor
 from app.core.db import get_session
 from app.models import VideoStatus
 from app.modules.auth.auth_router import admin_guard, any_user_guard
 from app.modules.videos.video_service import VideoService
 from app.utils.utils_media import is_image_stream
-from app.schemas import VideoOut
+from app.schemas import VideoFinalize, VideoOut
 
 router = APIRouter()
 
-def svc(session: Session = Depends(get_session)) -> VideoService:
-    return VideoService(session)
+def svc(storage: StorageDep, session: Session = Depends(get_session)) -> VideoService:
+    return VideoService(session, storage)
+
+def read_svc(storage: StorageDep, session: ReadSessionDep) -> VideoService:
+    return VideoService(session, storage)
 
 @router.post("", response_model=VideoOut, dependencies=[Depends(admin_guard)])
 async def create_video(
     title: str = Form(...),
     description: str = Form(...),
     preview: UploadFile = File(..., description="preview image"),
-    file: UploadFile = File(..., description="video file"),
+    file: Optional[UploadFile] = File(None, description="video file (or upload_id)"),
     genre_id: Optional[str] = Form(None, description="genre UUID"),
+    upload_id: Optional[str] = Form(None, description="completed resumable upload (POST /uploads)"),
     service: VideoService = Depends(svc),
-    background_tasks: BackgroundTasks = None,  # просто параметр, НЕ Depends
 ):
-    if not (file.content_type or "").startswith("video/"):
+    if file is not None and not (file.content_type or "").startswith("video/"):
         raise HTTPException(400, "file must be a video/*")
     if not is_image_stream(preview.file, preview.content_type):
         raise HTTPException(400, "preview must be a real image (jpg/png/webp/gif)")
@@ -36,23 +41,39 @@ async def create_video(
         preview_upload=preview,
         video_upload=file,
         genre_id=genre_id,
-        background_tasks=background_tasks,
+        upload_id=upload_id,
     )
 
+@router.post("/finalize", response_model=VideoOut, dependencies=[Depends(admin_guard)])
+def finalize_video(
+    data: VideoFinalize,
+    service: VideoService = Depends(svc),
+):
+    """Создать видео из файлов, загруженных напрямую в хранилище (POST /uploads/presign)."""
+    return service.finalize(data)
+
 @router.get("", response_model=List[VideoOut], dependencies=[Depends(any_user_guard)])
 def list_videos(
+    response: Response,
+    cursor: CursorDep,
+    limit: LimitDep,
     status: Optional[VideoStatus] = Query(default=None),
     q: Optional[str] = Query(default=None, description="substring in title/description"),
-    limit: int = 50,
     offset: int = 0,
-    service: VideoService = Depends(svc),
+    service: VideoService = Depends(read_svc),
 ):
-    return service.list(status=status, q=q, limit=limit, offset=offset)
+    # с q порядок — по релевантности, курсор (created_at, id) к нему не подходит
+    if cursor and q:
+        raise HTTPException(400, "cursor cannot be combined with q")
+    videos = service.list(status=status, q=q, limit=limit, offset=offset, cursor=cursor)
+    if not q:
+        set_next_cursor(response, videos, limit)
+    return videos
 
 @router.get("/{vid}", response_model=VideoOut, dependencies=[Depends(any_user_guard)])
 def get_video(
     vid: str,
-    service: VideoService = Depends(svc),
+    service: VideoService = Depends(read_svc),
 ):
     return service.get(vid)
 
@@ -60,7 +81,7 @@ def get_video(
 @router.get("/{vid}/play", dependencies=[Depends(any_user_guard)])
 def play_video(
     vid: str,
-    service: VideoService = Depends(svc),
+    service: VideoService = Depends(read_svc),
 ):
     return service.play_links(vid)
 
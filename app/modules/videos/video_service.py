@@ -4,16 +4,24 @@ import os
 import uuid
 import tempfile
 from datetime import datetime, UTC
-from typing import Optional, IO
+from typing import Optional
 
-from fastapi import HTTPException, UploadFile, BackgroundTasks
+from fastapi import HTTPException, UploadFile
 from sqlmodel import Session
 
 from app.core.config import settings
-from app.core.s3 import MinioService
+from app.core.db import transaction
+from app.core.pagination import Cursor
+from app.core.s3 import MinioService, get_minio_service
 from app.models import Video, VideoStatus
+from app.schemas import VideoFinalize
 from app.modules.videos.video_repository import VideoRepository
 from app.modules.videos.videos_transcode_service import VideosTranscodeService
+from app.modules.transcoder.transcode_job_repository import TranscodeItemGone, TranscodeJobRepository
+from app.modules.media.media_blob_service import MediaBlobService
+from app.modules.search.search_index import search_index
+from app.modules.stream.stream_service import playlist_url
+from app.modules.uploads.upload_service import UploadService
 
 
 def _guess_ct(name: str, fallback: Optional[str] = None) -> str:
@@ -29,12 +37,14 @@ def _bucket() -> str:
 
 
 class VideoService:
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, storage: Optional[MinioService] = None):
         self.repo = VideoRepository(session)
         self.session = session
-        self.s3 = MinioService()
+        self.s3 = storage or get_minio_service()
         self.bucket = _bucket()
         self.hls = VideosTranscodeService()
+        self.jobs = TranscodeJobRepository()
+        self.blobs = MediaBlobService(self.s3)
 
     # --- helpers ---
     def _ensure(self, vid: str) -> Video:
@@ -51,22 +61,6 @@ class VideoService:
         except ValueError:
             raise HTTPException(status_code=422, detail="genre_id must be a valid UUID")
 
-    def _copy_stream_to_tmp(self, stream: IO[bytes]) -> str:
-        """
-        Копирует поток (seek'нём в начало, если можно) в temp-файл. Возвращает путь.
-        """
-        try:
-            stream.seek(0)
-        except Exception:
-            pass
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            while True:
-                chunk = stream.read(1024 * 1024)
-                if not chunk:
-                    break
-                tmp.write(chunk)
-            return tmp.name
-
     def get(self, vid: str) -> Video:
         return self._ensure(vid)
 
@@ -76,86 +70,115 @@ class VideoService:
         title: str,
         description: str,
         preview_upload: UploadFile,
-        video_upload: UploadFile,
+        video_upload: Optional[UploadFile] = None,
         genre_id: Optional[str] = None,
-        background_tasks: Optional[BackgroundTasks] = None,
+        upload_id: Optional[str] = None,
     ) -> Video:
+        """Исходник — либо video_upload, либо завершённая resumable-загрузка upload_id (/uploads)."""
+        if (video_upload is None) == (upload_id is None):
+            raise HTTPException(400, "Provide either file or upload_id")
         vid = str(uuid.uuid4())
 
-        # ключи
+        # готовая resumable-загрузка проверяется до записи превью: неверный upload_id ничего не оставит в MinIO;
+        # забирается она вместе с созданием строки (claim ниже)
+        uploads = UploadService()
+        source = uploads.prepare(upload_id, "video") if upload_id is not None else None
+        source_key = source.object_key if source is not None else None
+        hls_key = None
+
+        # 1) Превью → MinIO (потоком, без temp-файла; одинаковые картинки хранятся один раз)
         preview_ext = os.path.splitext(preview_upload.filename or "")[1] or ".jpg"
-        source_ext = os.path.splitext(video_upload.filename or "")[1] or ".mp4"
-        preview_key = f"videos/{vid}/preview{preview_ext}"
-        source_key = f"videos/{vid}/source{source_ext}"
+        preview_key = self.blobs.store(
+            preview_upload.file, self.bucket, preview_ext,
+            content_type=_guess_ct(preview_upload.filename, preview_upload.content_type),
+        ).key
+
+        # 2) Исходник → MinIO (как source); на диск его скачает transcode-воркер
+        if source_key is None:
+            source_ext = os.path.splitext(video_upload.filename or "")[1] or ".mp4"
+            stored = self.blobs.store(
+                video_upload.file, self.bucket, source_ext,
+                content_type=_guess_ct(video_upload.filename, video_upload.content_type),
+            )
+            source_key, hls_key = stored.key, stored.rendition("video")
 
-        # 1) Превью → tmp → MinIO
-        tmp_prev_path = self._copy_stream_to_tmp(preview_upload.file)
-        try:
-            self.s3.client.fput_object(
-                bucket_name=self.bucket,
-                object_name=preview_key,
-                file_path=tmp_prev_path,
-                content_type=_guess_ct(preview_upload.filename, preview_upload.content_type),
+        with transaction() as tx, uploads.claim(*([(source, "upload_id")] if source is not None else [])):
+            v = self._register(
+                tx, vid, title, description, preview_key, source_key, self._uuid_or_none(genre_id), hls_key=hls_key
             )
-        finally:
-            try:
-                os.remove(tmp_prev_path)
-            except Exception:
-                pass
+        search_index.upsert("video", v.id, v.title, v.description)
+        return v
 
-        # 2) Исходник → tmp → MinIO (как source)
-        tmp_vid_path = self._copy_stream_to_tmp(video_upload.file)
-        self.s3.client.fput_object(
-            bucket_name=self.bucket,
-            object_name=source_key,
-            file_path=tmp_vid_path,
-            content_type=_guess_ct(video_upload.filename, video_upload.content_type),
-        )
+    def finalize(self, data: VideoFinalize) -> Video:
+        """Видео и превью уже лежат в MinIO (загружены из браузера по /uploads/presign)."""
+        uploads = UploadService()
+        # сначала проверяются обе загрузки: отклонённое превью не должно сжечь многогигабайтный исходник
+        source = uploads.prepare(data.upload_id, "video")
+        preview = uploads.prepare(data.preview_upload_id, "image", "preview_upload_id")
+        with transaction() as tx, uploads.claim((source, "upload_id"), (preview, "preview_upload_id")):
+            v = self._register(
+                tx, str(uuid.uuid4()), data.title, data.description, preview.object_key, source.object_key, data.genre_id
+            )
+        search_index.upsert("video", v.id, v.title, v.description)
+        return v
 
-        # 3) Создаём запись в статусе PROCESSING
+    def _register(
+        self,
+        tx: Session,
+        vid: str,
+        title: str,
+        description: str,
+        preview_key: str,
+        source_key: str,
+        genre_id: Optional[uuid.UUID],
+        hls_key: Optional[str] = None,
+    ) -> Video:
+        """Строка и задача transcode — в транзакции tx вызывающего, вместе с забранными загрузками."""
+        # 3) Создаём запись в статусе PROCESSING; если этот исходник уже кодировали — сразу ACTIVE
         v = Video(
             id=vid,
             title=title,
             description=description,
             preview_img=preview_key,
-            video=source_key,  # временно (до HLS)
-            status=VideoStatus.PROCESSING,
-            genre_id=self._uuid_or_none(genre_id),
+            video=hls_key or source_key,  # исходник — временно (до HLS)
+            status=VideoStatus.ACTIVE if hls_key else VideoStatus.PROCESSING,
+            genre_id=genre_id,
         )
-        v = self.repo.create(v)
+        v = VideoRepository(tx).create(v)
 
-        # 4) Фон: HLS → MinIO → обновление записи
-        if background_tasks is not None:
-            background_tasks.add_task(self._bg_transcode_and_update, vid, tmp_vid_path)
-        else:
-            self._bg_transcode_and_update(vid, tmp_vid_path)
+        # 4) Очередь: HLS делает transcode-воркер (python -m app.cli transcode-worker)
+        if not hls_key:
+            self.jobs.enqueue("video", vid, source_key)
 
         return v
 
-    def _bg_transcode_and_update(self, vid: str, tmp_src_path: str) -> None:
+    def transcode_job(self, vid: str, source_key: str) -> None:
+        """
+        Задача transcode-воркера: исходник из MinIO → HLS → MinIO, статус ACTIVE.
+        Ошибки пробрасываются — повтор или FAILED решает воркер.
+        """
+        fd, tmp_src_path = tempfile.mkstemp(prefix="video_src_")
+        os.close(fd)
         try:
-            master_key = self.hls.transcode_and_upload(vid=vid, src_path=tmp_src_path)
-            v = self._ensure(vid)
+            self.s3.client.fget_object(self.bucket, source_key, tmp_src_path)
+            master_key = self.hls.transcode_and_upload(vid=vid, src_path=tmp_src_path, source_key=source_key)
+            self.blobs.record_rendition(self.bucket, source_key, "video", master_key)
+            # не _ensure: HTTPException из дочернего процесса пула не распаковывается
+            v = self.repo.get(vid)
+            if not v or v.deleted_at:
+                raise TranscodeItemGone(f"video {vid} deleted")
             v.video = master_key
             v.status = VideoStatus.ACTIVE
             v.updated_at = datetime.now(UTC)
             self.repo.save(v)
-        except Exception:
-            try:
-                v = self._ensure(vid)
-                v.status = VideoStatus.FAILED
-                v.updated_at = datetime.now(UTC)
-                self.repo.save(v)
-            except Exception:
-                pass
         finally:
             try:
                 os.remove(tmp_src_path)
             except Exception:
                 pass
 
-    def list(self, status, q, limit: int, offset: int):
-        return self.repo.list(status=status, q=q, limit=limit, offset=offset)
+    def list(self, status, q, limit: int, offset: int, cursor: Optional[Cursor] = None):
+        return self.repo.list(status=status, q=q, limit=limit, offset=offset, cursor=cursor)
 
     def patch(
         self,
@@ -178,7 +201,9 @@ class VideoService:
             v.genre_id = self._uuid_or_none(genre_id)
 
         v.updated_at = datetime.now(UTC)
-        return self.repo.save(v)
+        v = self.repo.save(v)
+        search_index.upsert("video", v.id, v.title, v.description)
+        return v
 
     def replace_file(self, vid: str, *, fileobj, filename: str, content_type: Optional[str]) -> Video:
         v = self._ensure(vid)
@@ -189,25 +214,7 @@ class VideoService:
         new_key = f"videos/{vid}/source{ext}"
 
         # грузим новый исходник
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            while True:
-                chunk = fileobj.read(1024 * 1024)
-                if not chunk:
-                    break
-                tmp.write(chunk)
-            tmp_path = tmp.name
-        try:
-            self.s3.client.fput_object(
-                bucket_name=self.bucket,
-                object_name=new_key,
-                file_path=tmp_path,
-                content_type=_guess_ct(filename, content_type),
-            )
-        finally:
-            try:
-                os.remove(tmp_path)
-            except Exception:
-                pass
+        self.s3.put_stream(new_key, fileobj, self.bucket, content_type=_guess_ct(filename, content_type))
 
         v.video = new_key
         v.updated_at = datetime.now(UTC)
@@ -230,6 +237,7 @@ class VideoService:
         v.deleted_at = datetime.now(UTC)
         v.updated_at = v.deleted_at
         self.repo.save(v)
+        search_index.remove("video", vid)
         return {"deleted": vid}
 
     def play_links(self, vid: str) -> dict:
@@ -237,15 +245,11 @@ class VideoService:
         if v.status != VideoStatus.ACTIVE:
             raise HTTPException(404, "Video not ready")
 
-        try:
-            self.s3.client.stat_object(self.bucket, v.video)
-        except Exception:
-            raise HTTPException(410, "Video file missing from storage")
-
-        playlist = self.s3.presign_hls_playlist(v.video, bucket=self.bucket, expires_seconds=3600)
+        # v.video — мастер-плейлист ABR (у старых загрузок — единственный вариант);
+        # сам m3u8 с подписанными сегментами отдаёт /stream по playlist_url
         return {
             "video_url": self.s3.presign_get(v.video, bucket=self.bucket, expires_seconds=3600),
-            "playlist": playlist,
+            "playlist_url": playlist_url(v.video),
             "preview_url": self.s3.presign_get(v.preview_img, bucket=self.bucket, expires_seconds=3600),
             "status": v.status,
         }
@@ -2,23 +2,23 @@ from __future__ import annotations
 import os
 import shutil
 import tempfile
-from pathlib import Path
 from typing import List, Tuple
 
 from app.core.logger import logger
 from app.core.config import settings
-from app.core.s3 import MinioService
+from app.core.s3 import get_minio_service
+from app.modules.media.media_blob_service import rendition_prefix
 from app.modules.transcoder.transcoder_service import TranscoderService  # используем менторский
 
 class VideosTranscodeService:
     """
     Обёртка для HLS под /videos:
     - кладёт выход ffmpeg во временную папку
-    - загружает ВСЕ файлы HLS в MinIO под hls/videos/{vid}/...
+    - загружает ВСЕ файлы HLS в MinIO под hls/videos/{vid}/{хеш ключа исходника}/...
     - возвращает (master_key, uploaded_files_count)
     """
     def __init__(self):
-        self.minio = MinioService()
+        self.minio = get_minio_service()
         self.bucket = settings.AWS_S3_BUCKET_NAME
         self.t = TranscoderService()
 
@@ -35,50 +35,30 @@ class VideosTranscodeService:
             except Exception:
                 pass
 
-    def _upload_dir(self, local_dir: str, dest_prefix: str) -> int:
-        base = Path(local_dir)
-        count = 0
-        for p in base.glob("*"):
-            # загружаем только файлы верхнего уровня (m3u8 и ts)
-            if p.is_file():
-                key = f"{dest_prefix}{p.name}"
-                self.minio.client.fput_object(
-                    bucket_name=self.bucket,
-                    object_name=key,
-                    file_path=str(p),
-                    content_type=_guess_ct_by_name(p.name),
-                )
-                count += 1
-        return count
-
-    def transcode_and_upload(self, *, vid: str, src_path: str) -> str:
+    def transcode_and_upload(self, *, vid: str, src_path: str, source_key: str) -> str:
         """
-        Делает single-variant HLS (как в ads, без лестницы).
-        Возвращает ключ мастер-плейлиста в MinIO: hls/videos/{vid}/index.m3u8
+        Делает ABR-лестницу HLS (HLS_LADDER + audio-only) одним проходом ffmpeg.
+        Возвращает ключ мастер-плейлиста в MinIO: hls/videos/{vid}/{…}/index.m3u8
+        (каталог свой у каждого исходника — см. rendition_prefix).
         """
         out_dir = self._mk_tmpdir()
         master_local = os.path.join(out_dir, "index.m3u8")
 
+        dest_prefix = rendition_prefix(f"hls/videos/{vid}/", source_key)
+
         try:
-            ok = self.t.transcodeToHls(input_path=src_path, output_path=master_local)
-            if not ok:
-                raise RuntimeError("ffmpeg failed")
+            # сегменты уходят в MinIO по мере кодирования, index.m3u8 — последним
+            with self.minio.hls_publisher(out_dir, dest_prefix, self.bucket) as publisher:
+                ok = self.t.transcodeToHlsLadder(
+                    input_path=src_path, output_path=master_local, on_segment=publisher.segment_ready
+                )
+                if not ok:
+                    raise RuntimeError("ffmpeg failed")
 
-            dest_prefix = f"hls/videos/{vid}/"
-            uploaded = self._upload_dir(out_dir, dest_prefix)
-            if uploaded == 0:
-                raise RuntimeError("no files uploaded")
+                if publisher.finish().count == 0:
+                    raise RuntimeError("no files uploaded")
 
             master_key = f"{dest_prefix}index.m3u8"
             return master_key
         finally:
             self._cleanup(out_dir)
-
-    
-    
-def _guess_ct_by_name(name: str) -> str:
-    import mimetypes
-    return mimetypes.guess_type(name)[0] or "application/octet-stream"
-
-
-
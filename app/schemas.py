@@ -7,7 +7,7 @@ from typing import Optional, List
 from pydantic import BaseModel, Field
 
 # единственный источник enum'ов
-from app.models import VideoStatus, AdStatus, GenreType
+from app.models import VideoStatus, AdStatus, GenreType, MusicStatus
 
 PHONE_RE = r"^\+7\d{10}$"
 
@@ -29,6 +29,7 @@ class UserPublic(BaseModel):
     fullname: str
     phone: str
     role: str
+    created_at: datetime
 
     class Config:
         from_attributes = True
@@ -55,6 +56,15 @@ class CreateMusic(BaseModel):
     duration: int
     genre_id: Optional[uuid.UUID] = None
 
+class MusicFinalize(BaseModel):
+    """Трек, загруженный из браузера напрямую в MinIO (POST /uploads/presign)."""
+    playlist_id: uuid.UUID
+    title: str
+    description: str
+    upload_id: uuid.UUID
+    preview_upload_id: uuid.UUID
+    genre_id: Optional[uuid.UUID] = None
+
 class UpdateMusic(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -63,6 +73,7 @@ class UpdateMusic(BaseModel):
     duration: Optional[int] = None
     genre_id: Optional[uuid.UUID] = None
     playlist_id: Optional[uuid.UUID] = None
+    status: Optional[MusicStatus] = None
 
 class MusicPublic(BaseModel):
     id: uuid.UUID
@@ -93,6 +104,19 @@ class PlaylistPublic(BaseModel):
     class Config:
         from_attributes = True
 
+class PlaylistExport(BaseModel):
+    """Строка /playlists/export: без вложенных треков (они — в /musics/export, по playlist_id)."""
+    id: uuid.UUID
+    title: str
+    description: str
+    preview_img: str
+    created_at: datetime
+    updated_at: datetime
+    deleted_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 
 # ───────────── Genres ─────────────
 class GenreBase(BaseModel):
@@ -125,6 +149,10 @@ class GenrePublic(BaseModel):
 class CreateAd(BaseModel):
     title: str
 
+class AdFinalize(BaseModel):
+    title: str
+    upload_id: uuid.UUID
+
 class UpdateAd(BaseModel):
     title: Optional[str] = None
     status: Optional[AdStatus] = None
@@ -148,6 +176,13 @@ class VideoCreate(BaseModel):
     title: str
     description: str
 
+class VideoFinalize(BaseModel):
+    title: str
+    description: str
+    upload_id: uuid.UUID
+    preview_upload_id: uuid.UUID
+    genre_id: Optional[uuid.UUID] = None
+
 class VideoUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -177,6 +212,10 @@ class BookCreate(BaseModel):
     genre: Optional[str] = None
     published_year: Optional[int] = Field(default=None, ge=0, le=2100)
 
+class BookFinalize(BookCreate):
+    upload_id: uuid.UUID
+    cover_upload_id: Optional[uuid.UUID] = None
+
 class BookUpdate(BaseModel):
     title: Optional[str] = None
     author: Optional[str] = None
@@ -0,0 +1,81 @@
+# app/utils/bench_api_load.py
+"""
+Нагрузочный замер GET-эндпоинтов: запросов в секунду и задержки p50/p99.
+
+    python -m app.utils.bench_api_load --token $TOKEN --seconds 30 --concurrency 64 \
+        http://localhost:8000/api/v1/music/musics/ http://localhost:8000/api/v1/ads/ads/
+
+Сравнение sync и async доступа к БД — на одном воркере uvicorn
+(`uvicorn app.main:app --workers 1`), чтобы упереться в event loop и threadpool,
+а не в число процессов: замер на коммите до перевода маршрутов на AsyncSessionDep
+и после, при одинаковых --concurrency и DB_POOL_SIZE. Sync-маршруты ограничены
+threadpool'ом Starlette (40 потоков), async — только пулом соединений.
+"""
+import argparse
+import itertools
+import statistics
+import threading
+import time
+
+import requests
+
+
+def _worker(urls, headers: dict, deadline: float, latencies: list, errors: list, lock: threading.Lock) -> None:
+    http = requests.Session()
+    mine, failed = [], 0
+    for url in itertools.cycle(urls):
+        if time.perf_counter() >= deadline:
+            break
+        started = time.perf_counter()
+        try:
+            resp = http.get(url, headers=headers, timeout=30)
+            ok = resp.status_code < 400
+        except requests.RequestException:
+            ok = False
+        if ok:
+            mine.append(time.perf_counter() - started)
+        else:
+            failed += 1
+    with lock:
+        latencies.extend(mine)
+        errors.append(failed)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Requests/sec and p50/p99 latency of GET endpoints")
+    parser.add_argument("urls", nargs="+")
+    parser.add_argument("--token", default=None, help="Bearer token (эндпоинты под any_user_guard)")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args(argv)
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    latencies: list[float] = []
+    errors: list[int] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=_worker, args=(args.urls, headers, deadline, latencies, errors, lock))
+        for _ in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    if len(latencies) < 2:
+        print(f"not enough successful requests ({len(latencies)}), {sum(errors)} errors")
+        return 1
+    cuts = statistics.quantiles(latencies, n=100)
+    print(f"{'requests':>8} | {'errors':>6} | {'req/s':>8} | {'p50, ms':>8} | {'p99, ms':>8}")
+    print(
+        f"{len(latencies):>8} | {sum(errors):>6} | {len(latencies) / seconds:>8.1f} | "
+        f"{cuts[49] * 1000:>8.2f} | {cuts[98] * 1000:>8.2f}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
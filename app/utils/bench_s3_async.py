@@ -0,0 +1,91 @@
+# app/utils/bench_s3_async.py
+"""
+Нагрузочный тест загрузок из async-кода: N параллельных загрузок в MinIO и
+одновременно «лёгкие запросы» в том же event loop (тик раз в 10 мс).
+
+    python -m app.utils.bench_s3_async --uploads 8 --size-mb 32
+
+Режимы:
+  blocking — как раньше в async def-сервисах: MinioService.upload_file прямо в корутине;
+  async    — AsyncMinioService (отдельный пул потоков).
+Для каждого печатается пропускная способность загрузок, сколько тиков успел
+обработать loop и задержка тика (p50/p99/max). Объекты пишутся под bench/ и удаляются.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.s3 import AsyncMinioService, MinioService
+
+TICK_SECONDS = 0.01
+
+
+async def _ticker(stop: asyncio.Event, lags: list[float]) -> None:
+    """Имитация остальных запросов воркера: сколько они ждут свою очередь в loop."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append((time.perf_counter() - started - TICK_SECONDS) * 1000)
+
+
+async def _run(mode: str, src_path: str, uploads: int, bucket: str) -> list[str]:
+    sync = MinioService()
+    storage = AsyncMinioService(sync)
+    keys = [f"bench/{uuid.uuid4()}" for _ in range(uploads)]
+
+    async def upload(key: str) -> None:
+        if mode == "blocking":
+            sync.upload_file(key, src_path, bucket)
+        else:
+            await storage.upload_file(key, src_path, bucket)
+
+    stop = asyncio.Event()
+    lags: list[float] = []
+    ticker = asyncio.create_task(_ticker(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(upload(key) for key in keys))
+    seconds = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    size_mib = os.path.getsize(src_path) * uploads / 2**20
+    lags.sort()
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))] if lags else 0.0
+    print(
+        f"{mode:>8} | {seconds:>7.2f} | {size_mib / seconds:>7.1f} | {len(lags):>6} | "
+        f"{statistics.median(lags) if lags else 0.0:>8.1f} | {p99:>8.1f} | {max(lags, default=0.0):>8.1f}"
+    )
+    return keys
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark blocking vs async S3 uploads from an event loop")
+    parser.add_argument("--uploads", type=int, default=8, help="Concurrent uploads")
+    parser.add_argument("--size-mb", type=int, default=32, help="Size of each object")
+    parser.add_argument("--bucket", default=settings.AWS_S3_BUCKET_NAME)
+    args = parser.parse_args(argv)
+
+    fd, src_path = tempfile.mkstemp(prefix="bench_s3_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(2**20))
+
+        print(f"{'mode':>8} | {'wall, s':>7} | {'MiB/s':>7} | {'ticks':>6} | {'lag p50':>8} | {'lag p99':>8} | {'lag max':>8}")
+        minio = MinioService()
+        for mode in ("blocking", "async"):
+            keys = asyncio.run(_run(mode, src_path, args.uploads, args.bucket))
+            for key in keys:
+                minio.delete_object(key, args.bucket)
+    finally:
+        os.remove(src_path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
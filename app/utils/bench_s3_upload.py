@@ -0,0 +1,60 @@
+# app/utils/bench_s3_upload.py
+"""
+Загрузки в секунду для мелких объектов (обложки, превью) с проверкой бакета
+перед каждой загрузкой и без неё.
+
+    python -m app.utils.bench_s3_upload --uploads 500 --size-kb 64 --concurrency 8
+
+Режимы:
+  per-upload — как раньше: bucket_exists перед каждым put (лишний HTTP round trip);
+  memoised   — бакет проверен один раз (ensure_bucket в lifespan), загрузка — только PUT.
+Объекты пишутся под bench/ и удаляются.
+"""
+import argparse
+import io
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+from app.core.s3 import get_minio_service
+
+
+def _run(mode: str, payload: bytes, uploads: int, concurrency: int, bucket: str) -> list[str]:
+    minio = get_minio_service()
+    minio.ensure_bucket(bucket)
+    keys = [f"bench/{uuid.uuid4()}" for _ in range(uploads)]
+
+    def upload(key: str) -> None:
+        if mode == "per-upload":
+            minio.client.bucket_exists(bucket)
+        minio.put_stream(key, io.BytesIO(payload), bucket, "application/octet-stream")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(upload, keys))
+    seconds = time.perf_counter() - started
+    print(f"{mode:>10} | {uploads:>7} | {seconds:>7.2f} | {uploads / seconds:>9.1f} | {seconds / uploads * 1000:>8.2f}")
+    return keys
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark uploads/sec with and without a per-upload bucket check")
+    parser.add_argument("--uploads", type=int, default=500)
+    parser.add_argument("--size-kb", type=int, default=64, help="Size of each object")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--bucket", default=settings.AWS_S3_BUCKET_NAME)
+    args = parser.parse_args(argv)
+
+    payload = os.urandom(args.size_kb * 1024)
+    minio = get_minio_service()
+    print(f"{'mode':>10} | {'uploads':>7} | {'wall, s':>7} | {'uploads/s':>9} | {'ms/upl':>8}")
+    for mode in ("per-upload", "memoised"):
+        for key in _run(mode, payload, args.uploads, args.concurrency, args.bucket):
+            minio.delete_object(key, args.bucket)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,89 @@
+# app/utils/bench_text_search.py
+"""
+Бенчмарк q=-фильтра: время запроса от числа строк до и после GIN-индекса (gin_trgm_ops).
+
+    python -m app.utils.bench_text_search --rows 10000,100000,300000 --query "ночной город"
+
+Работает во временной таблице (TEMP, живёт до конца соединения), боевые таблицы не трогает.
+Нужен pg_trgm в базе (миграция 009_trigram_indexes).
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.core.db import engine
+
+WORDS = (
+    "ночной город дорога лето зима песня любовь море ветер дождь солнце звезда "
+    "night city road summer winter song love sea wind rain sun star dance radio"
+).split()
+
+# тот же вид условия и сортировки, что строит app.core.fts.trigram_match / trigram_rank
+QUERY = text(
+    """
+    SELECT id FROM bench_text
+    WHERE title ILIKE :like OR title %> :q OR description ILIKE :like OR description %> :q
+    ORDER BY greatest(word_similarity(:q, title), word_similarity(:q, description)) DESC
+    LIMIT 20
+    """
+)
+
+
+def _fill(conn, rows: int) -> None:
+    conn.execute(text("DROP TABLE IF EXISTS bench_text"))
+    conn.execute(text("CREATE TEMP TABLE bench_text (id serial PRIMARY KEY, title text, description text)"))
+    # подзапросы ссылаются на g, иначе Postgres вычислит их один раз (InitPlan) на все строки
+    words = "ARRAY[" + ",".join(f"'{w}'" for w in WORDS) + "]"
+    conn.execute(
+        text(
+            f"""
+            INSERT INTO bench_text (title, description)
+            SELECT
+                (SELECT string_agg(w[1 + floor(random() * {len(WORDS)})::int], ' ') FROM generate_series(1, 3) WHERE g > 0),
+                (SELECT string_agg(w[1 + floor(random() * {len(WORDS)})::int], ' ') FROM generate_series(1, 25) WHERE g > 0)
+            FROM generate_series(1, :rows) AS g, (SELECT {words} AS w) words
+            """
+        ),
+        {"rows": rows},
+    )
+    conn.execute(text("ANALYZE bench_text"))
+
+
+def _measure(conn, q: str, repeat: int) -> tuple[float, str]:
+    params = {"q": q, "like": f"%{q}%"}
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(QUERY, params).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    plan = conn.execute(text("EXPLAIN " + QUERY.text), params).scalars().all()
+    scan = next((line.strip() for line in plan if "Scan" in line), plan[0].strip())
+    return statistics.median(timings), scan
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark trigram-indexed q= filtering")
+    parser.add_argument("--rows", default="10000,100000,300000", help="Comma-separated table sizes")
+    parser.add_argument("--query", default="ночной город")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>10} | {'seq scan, ms':>12} | {'gin trgm, ms':>12} | plan after index")
+    with engine.connect() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for rows in (int(r) for r in args.rows.split(",")):
+            _fill(conn, rows)
+            before, _ = _measure(conn, args.query, args.repeat)
+            conn.execute(text("CREATE INDEX ON bench_text USING gin (title gin_trgm_ops)"))
+            conn.execute(text("CREATE INDEX ON bench_text USING gin (description gin_trgm_ops)"))
+            conn.execute(text("ANALYZE bench_text"))
+            after, scan = _measure(conn, args.query, args.repeat)
+            print(f"{rows:>10} | {before:>12.1f} | {after:>12.1f} | {scan}")
+        conn.rollback()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -140,7 +140,6 @@ function Card({
   const [playUrl, setPlayUrl] = useState<string | null>(null);
   const [musicUrl, setMusicUrl] = useState<string | null>(null);
   const [bookUrl, setBookUrl] = useState<string | null>(null);
-  const [playlistUrl, setPlaylistUrl] = useState<string | null>(null);
   const [previewUrl, setPreviewUrl] = useState<string | null>(null);
   const [open, setOpen] = useState(false);
   const [playlistItems, setPlaylistItems] = useState<any[] | null>(null);
@@ -180,14 +179,8 @@ function Card({
       videoPlay(token, item.id)
         .then((res) => {
           if (ignore) return;
-          if (res.playlist) {
-            const blob = new Blob([res.playlist], { type: "application/vnd.apple.mpegurl" });
-            const url = URL.createObjectURL(blob);
-            setPlaylistUrl(url);
-            setPlayUrl(url);
-          } else {
-            setPlayUrl(res.video_url);
-          }
+          // playlist_url — m3u8 с уже подписанными ссылками на сегменты (/stream)
+          setPlayUrl(res.playlist_url || res.video_url);
         })
         .catch(() => {});
     }
@@ -195,14 +188,7 @@ function Card({
       musicLinks(token, item.id)
         .then((res) => {
           if (ignore) return;
-          if (res.playlist) {
-            const blob = new Blob([res.playlist], { type: "application/vnd.apple.mpegurl" });
-            const url = URL.createObjectURL(blob);
-            setPlaylistUrl(url);
-            setMusicUrl(url);
-          } else {
-            setMusicUrl(res.music_url);
-          }
+          setMusicUrl(res.playlist_url || res.music_url);
         })
         .catch(() => {});
     }
@@ -229,9 +215,8 @@ function Card({
     }
     return () => {
       ignore = true;
-      if (playlistUrl) URL.revokeObjectURL(playlistUrl);
     };
-  }, [type, open, playUrl, musicUrl, bookUrl, playlistUrl, previewUrl, token, item.id, preview, playlistItems, role]);
+  }, [type, open, playUrl, musicUrl, bookUrl, previewUrl, token, item.id, preview, playlistItems, role]);
 
   return (
     <div className="card" style={{ display: "flex", flexDirection: "column", gap: 8 }}>
@@ -292,7 +277,6 @@ function PlaylistTrack({ item, token, role }: { item: any; token: string; role:
   const [open, setOpen] = useState(false);
   const [previewUrl, setPreviewUrl] = useState<string | null>(null);
   const [musicUrl, setMusicUrl] = useState<string | null>(null);
-  const [playlistUrl, setPlaylistUrl] = useState<string | null>(null);
 
   useEffect(() => {
     let ignore = false;
@@ -311,22 +295,14 @@ function PlaylistTrack({ item, token, role }: { item: any; token: string; role:
       musicLinks(token, item.id)
         .then((res) => {
           if (ignore) return;
-          if (res.playlist) {
-            const blob = new Blob([res.playlist], { type: "application/vnd.apple.mpegurl" });
-            const url = URL.createObjectURL(blob);
-            setPlaylistUrl(url);
-            setMusicUrl(url);
-          } else {
-            setMusicUrl(res.music_url);
-          }
+          setMusicUrl(res.playlist_url || res.music_url);
         })
         .catch(() => {});
     }
     return () => {
       ignore = true;
-      if (playlistUrl) URL.revokeObjectURL(playlistUrl);
     };
-  }, [open, musicUrl, playlistUrl, previewUrl, token, item.id, item.preview_img]);
+  }, [open, musicUrl, previewUrl, token, item.id, item.preview_img]);
 
   return (
     <div style={{ border: "1px solid #eef2f7", borderRadius: 8, padding: 10, display: "grid", gap: 8 }}>
@@ -0,0 +1,87 @@
+# tests/test_hls_playlist.py
+import re
+import time
+from datetime import timedelta
+
+import pytest
+
+from app.core import hls_playlist, s3
+from app.core.config import settings
+from app.core.s3 import MinioService, presign_cache, presign_reuse_seconds
+
+EXPIRES = 3600
+PLAYLIST = "#EXTM3U\n#EXT-X-MAP:URI=\"init.mp4\"\n#EXTINF:6,\nseg0.m4s\n#EXTINF:6,\nseg1.m4s\n#EXT-X-ENDLIST\n"
+_EXP = re.compile(r"exp=(\d+(?:\.\d+)?)")
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakePresignClient:
+    """Подпись с моментом истечения прямо в URL."""
+
+    def __init__(self, clock: Clock):
+        self.clock = clock
+
+    def presigned_get_object(self, bucket: str, object_name: str, expires: timedelta) -> str:
+        return f"https://s3/{bucket}/{object_name}?exp={self.clock() + expires.total_seconds()}"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    reuse = presign_reuse_seconds(EXPIRES)
+    clock = Clock(reuse * 1000.0)  # начало окна
+    monkeypatch.setattr(time, "time", clock)
+    monkeypatch.setattr(time, "monotonic", clock)
+    monkeypatch.setattr(s3, "get_presign_client", lambda: FakePresignClient(clock))
+    monkeypatch.setattr(hls_playlist, "redis_client", None)
+    hls_playlist._parsed_cache.clear()
+    hls_playlist._rendered_cache.clear()
+    presign_cache.clear()
+    yield clock
+    hls_playlist._parsed_cache.clear()
+    hls_playlist._rendered_cache.clear()
+    presign_cache.clear()
+
+
+def _signatures_left(text: str, now: float) -> list[float]:
+    return [float(exp) - now for exp in _EXP.findall(text)]
+
+
+def test_cached_playlist_never_serves_signatures_older_than_the_window(clock, monkeypatch):
+    minio = MinioService(client=object())
+    monkeypatch.setattr(minio, "_read_text", lambda object_name, bucket: PLAYLIST)
+    reuse = presign_reuse_seconds(EXPIRES)
+    window_start = clock.now
+
+    # ссылки на сегменты подписаны ещё в прошлом окне и лежат в presign_cache
+    clock.now = window_start - 100
+    for name in ("init.mp4", "seg0.m4s", "seg1.m4s"):
+        minio.presign_get(f"hls/{name}", bucket="b", expires_seconds=EXPIRES)
+
+    # первый запрос плейлиста — в конце окна; дальше он отдаётся из кеша до границы окна и после неё
+    for offset in (reuse - 101, reuse - 1, reuse + 1, 2 * reuse - 1):
+        clock.now = window_start + offset
+        signed = minio.signed_hls_playlist("hls/index.m3u8", bucket="b", expires_seconds=EXPIRES)
+        left = _signatures_left(signed.text, clock.now)
+        assert len(left) == 3
+        assert min(left) >= EXPIRES - reuse
+        assert signed.seconds_left() == pytest.approx(min(left))
+
+
+def test_playlist_is_reused_within_window_and_resigned_after_it(clock, monkeypatch):
+    minio = MinioService(client=object())
+    monkeypatch.setattr(minio, "_read_text", lambda object_name, bucket: PLAYLIST)
+    reuse = presign_reuse_seconds(EXPIRES)
+    window_start = clock.now
+
+    first = minio.presign_hls_playlist("hls/index.m3u8", bucket="b", expires_seconds=EXPIRES)
+    clock.now = window_start + min(reuse, settings.HLS_PLAYLIST_CACHE_SECONDS) - 1
+    assert minio.presign_hls_playlist("hls/index.m3u8", bucket="b", expires_seconds=EXPIRES) == first
+    clock.now = window_start + reuse + 1
+    assert minio.presign_hls_playlist("hls/index.m3u8", bucket="b", expires_seconds=EXPIRES) != first
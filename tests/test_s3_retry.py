@@ -0,0 +1,48 @@
+# tests/test_s3_retry.py
+import pytest
+from urllib3.exceptions import ProtocolError
+
+from app.core import s3
+from app.core.s3 import MinioService
+
+
+class FlakyClient:
+    """fput_object падает первые failures раз, потом проходит."""
+
+    def __init__(self, failures: int, error: Exception):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def fput_object(self, bucket_name, object_name, file_path, content_type=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return None
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(s3.time, "sleep", lambda seconds: None)
+
+
+def test_put_with_retry_retries_dropped_connection(tmp_path):
+    segment = tmp_path / "seg0.ts"
+    segment.write_bytes(b"x" * 188)
+    client = FlakyClient(1, ProtocolError("Connection aborted.", ConnectionResetError(104, "reset")))
+
+    uploaded = MinioService(client=client)._put_with_retry("b", "hls/seg0.ts", segment, retries=3)
+
+    assert client.calls == 2
+    assert uploaded.attempts == 2
+    assert uploaded.size == 188
+
+
+def test_put_with_retry_gives_up_after_last_attempt(tmp_path):
+    segment = tmp_path / "seg0.ts"
+    segment.write_bytes(b"x")
+    client = FlakyClient(5, ProtocolError("Connection aborted."))
+
+    with pytest.raises(ProtocolError):
+        MinioService(client=client)._put_with_retry("b", "hls/seg0.ts", segment, retries=3)
+    assert client.calls == 3
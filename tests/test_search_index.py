@@ -0,0 +1,92 @@
+# tests/test_search_index.py
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from app.modules.search import search_index as search_index_module
+from app.modules.search.search_index import SearchIndex
+
+DOCS = {
+    "1": ("Night train", "a slow train through the mountains"),
+    "2": ("Mountain song", "folk song about mountains and rivers"),
+    "3": ("River jazz", "late night jazz by the river"),
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path))
+    index._ready = True
+    index._last_check = time.monotonic()  # без похода в БД
+    return index
+
+
+def _sklearn_scores(docs: dict[str, tuple[str, str]], query: str) -> dict[str, float]:
+    ids = list(docs)
+    vectorizer = TfidfVectorizer(stop_words="english")
+    matrix = vectorizer.fit_transform([f"{t}. {d}" for t, d in docs.values()])
+    scores = (matrix @ vectorizer.transform([query]).T).toarray().ravel()
+    return {ids[i]: float(s) for i, s in enumerate(scores) if s > 0}
+
+
+def test_removed_terms_leave_vocabulary_and_scores_match_sklearn(index):
+    for doc_id, (title, description) in DOCS.items():
+        index.upsert("music", doc_id, title, description)
+    index.remove("music", "1")
+    index.upsert("music", "2", "Mountain song", "folk song")
+
+    assert "train" not in index._vocab
+    assert "rivers" not in index._vocab
+    remaining = {"2": ("Mountain song", "folk song"), "3": DOCS["3"]}
+    for query in ("night train river", "mountain rivers jazz"):
+        hits = {h.id: h.score for h in index.search(query, None)}
+        expected = _sklearn_scores(remaining, query)
+        assert hits.keys() == expected.keys()
+        for doc_id, score in expected.items():
+            assert hits[doc_id] == pytest.approx(score, rel=1e-5)
+
+    # освободившиеся столбцы переиспользуются новыми терминами
+    width = len(index._df)
+    index.upsert("music", "4", "Train", "trains")
+    assert len(index._df) == width
+
+
+def test_snapshot_roundtrip_keeps_pruned_vocabulary(index, tmp_path):
+    for doc_id, (title, description) in DOCS.items():
+        index.upsert("music", doc_id, title, description)
+    index.remove("music", "1")
+    index.save()
+
+    loaded = SearchIndex(str(tmp_path))
+    assert loaded.load()
+    assert loaded._vocab == index._vocab
+    assert np.array_equal(loaded._df, index._df)
+
+
+def test_full_sync_replays_changes_made_during_rebuild(index, monkeypatch):
+    class FakeSession:
+        def __init__(self, engine):
+            pass
+
+        def exec(self, stmt):
+            if stmt.column_descriptions[0]["entity"].__tablename__ != "music":
+                return
+            yield 1, "Night train", "old description", None
+            # пока идёт пересборка, сервис успевает обновить одну запись и удалить другую
+            index.upsert("music", "1", "Night train", "fresh description")
+            index.remove("music", "2")
+            yield 2, "Mountain song", "folk song", None
+
+    @contextmanager
+    def session(engine):
+        yield FakeSession(engine)
+
+    monkeypatch.setattr(search_index_module, "Session", session)
+    index.sync(full=True)
+
+    assert set(index._docs) == {("music", "1")}
+    assert index._docs[("music", "1")].description == "fresh description"
+    assert index._pending is None